@@ -0,0 +1,27 @@
+from typing import Optional
+
+from app.domain.entities import Email, EmailAnalysis
+from app.domain.ports import TokenizerPort
+from app.application.telemetry import StageTimer, stage
+
+
+def analyze_email(tokenizer: TokenizerPort, email: Email, timer: Optional[StageTimer] = None) -> EmailAnalysis:
+    """
+    Monta o contexto de análise do e-mail uma única vez:
+    - detecta o idioma (subject + corpo pré-processado)
+    - tokeniza usando o idioma já detectado
+    - anexos (quando houver) são tokenizados à parte, no mesmo idioma do corpo
+    O resultado é repassado aos classificadores, que não detectam de novo.
+    Com `timer`, mede as etapas "tokenize" (pré-processamento + tokens) e "lang".
+    """
+    with stage(timer, "tokenize"):
+        pre = tokenizer.preprocess(email.body)
+    with stage(timer, "lang"):
+        lang = tokenizer.detect_lang((email.subject or "") + "\n" + pre)
+    with stage(timer, "tokenize"):
+        attachment_tokens = []
+        for att in email.attachments or []:
+            if att.text:
+                attachment_tokens.extend(tokenizer.tokenize(tokenizer.preprocess(att.text), lang=lang))
+        tokens = tokenizer.tokenize(pre, lang=lang)
+    return EmailAnalysis(lang=lang, tokens=tokens, attachment_tokens=attachment_tokens)
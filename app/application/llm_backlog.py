@@ -0,0 +1,191 @@
+"""
+Modo backlog (ex.: caixa recém-conectada com milhares de não lidos):
+e-mails que escalariam ao LLM viram linhas de um JSONL da Batch API em vez de uma chamada
+cada; o job fica no banco e, quando o provedor conclui, os resultados são aplicados em lote.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.domain.entities import Category, ClassificationResult, Email, LlmBatchJob
+from app.domain.ports import BatchJobRepositoryPort, BatchProviderPort
+
+CHAT_COMPLETIONS = "/v1/chat/completions"
+
+
+def _result_to_dict(r: ClassificationResult) -> dict:
+    return {
+        "category": r.category.value,
+        "reason": r.reason,
+        "suggested_reply": r.suggested_reply,
+        "used_model": r.used_model,
+        "extra": r.extra,
+    }
+
+
+def _result_from_dict(d: dict) -> ClassificationResult:
+    return ClassificationResult(
+        category=Category(d["category"]),
+        reason=d["reason"],
+        suggested_reply=d.get("suggested_reply") or "",
+        used_model=d.get("used_model"),
+        extra=d.get("extra"),
+    )
+
+
+def _uid_order(msg_id: str) -> Tuple[int, str]:
+    return (int(msg_id), "") if msg_id.isdigit() else (-1, msg_id)
+
+
+class LlmBacklog:
+    """
+    - `applies_to(n)`: ciclo com ao menos `min_messages` mensagens entra no modo backlog
+    - `defer(...)`: guarda o request do e-mail escalado (o rule-based já rodou)
+    - `submit(...)`: grava os JSONL (até `max_items_per_job` por job), envia e salva os jobs
+    - `poll(...)`: jobs concluídos → resultados por e-mail (rule-based onde a resposta falhou)
+    `classifier` é o SmartClassifier (decide o escalonamento e mescla o resultado do LLM).
+    """
+
+    def __init__(
+        self,
+        classifier,
+        provider: BatchProviderPort,
+        jobs: BatchJobRepositoryPort,
+        work_dir: str,
+        min_messages: int = 500,
+        max_items_per_job: int = 5000,
+        poll_interval_s: float = 60,
+    ):
+        self.classifier = classifier
+        self.provider = provider
+        self.jobs = jobs
+        self.work_dir = work_dir
+        self.min_messages = min_messages
+        self.max_items_per_job = max(1, max_items_per_job)
+        self.poll_interval_s = poll_interval_s
+        self._buffers: Dict[str, List[Tuple[dict, dict]]] = {}
+        self._last_poll: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        os.makedirs(work_dir, exist_ok=True)
+
+    def applies_to(self, cycle_size: Optional[int]) -> bool:
+        return cycle_size is not None and cycle_size >= self.min_messages
+
+    def pending_ids(self, mailbox_key: str) -> Set[str]:
+        """Mensagens que já estão num job aberto (não devem entrar de novo)."""
+        return {item["msg_id"] for job in self.jobs.list_open(mailbox_key) for item in job.items}
+
+    def defer(self, mailbox_key: str, msg_id: str, email: Email, rb: ClassificationResult):
+        body, context = self.classifier.llm.offline_request(email, rb)
+        item = {
+            "custom_id": str(msg_id),
+            "msg_id": str(msg_id),
+            "subject": email.subject,
+            "sender": email.sender,
+            "body_excerpt": (email.body or "")[:200],
+            "rb": _result_to_dict(rb),
+            "context": context,
+        }
+        with self._lock:
+            self._buffers.setdefault(mailbox_key, []).append((item, body))
+
+    def submit(self, mailbox_key: str, uidvalidity: Optional[int] = None) -> List[LlmBatchJob]:
+        with self._lock:
+            buffered = self._buffers.pop(mailbox_key, [])
+        # workers de classificação adiam fora de ordem; o job segue a ordem dos UIDs
+        buffered.sort(key=lambda entry: _uid_order(entry[0]["msg_id"]))
+        jobs = []
+        for start in range(0, len(buffered), self.max_items_per_job):
+            chunk = buffered[start:start + self.max_items_per_job]
+            job_id = uuid.uuid4().hex
+            path = os.path.join(self.work_dir, f"{job_id}.jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for item, body in chunk:
+                    line = {"custom_id": item["custom_id"], "method": "POST", "url": CHAT_COMPLETIONS, "body": body}
+                    f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+            job = LlmBatchJob(
+                id=job_id,
+                mailbox_key=mailbox_key,
+                provider=self.provider.name,
+                provider_job_id="",
+                items=[item for item, _ in chunk],
+                uidvalidity=uidvalidity,
+                input_path=path,
+            )
+            try:
+                job.provider_job_id = self.provider.submit(path)
+                print(f"[DEBUG] Lote offline {job.provider_job_id} enviado: {len(chunk)} e-mail(s) de {mailbox_key}")
+            except Exception as e:
+                # o job fica registrado: no próximo poll os e-mails recebem o resultado rule-based
+                print(f"[ERROR] Falha ao enviar lote offline de {mailbox_key}: {e}")
+                job.status, job.error = "failed", str(e)
+            jobs.append(self.jobs.save(job))
+        return jobs
+
+    def poll(
+        self, mailbox_key: str, force: bool = False
+    ) -> List[Tuple[LlmBatchJob, List[Tuple[dict, ClassificationResult]]]]:
+        """Jobs finalizados (concluídos ou falhos) com o resultado de cada item."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_poll.get(mailbox_key)
+            if not force and last is not None and now - last < self.poll_interval_s:
+                return []
+            self._last_poll[mailbox_key] = now
+
+        finished = []
+        for job in self.jobs.list_open(mailbox_key):
+            if job.status == "submitted":
+                try:
+                    status = self.provider.status(job.provider_job_id)
+                except Exception as e:
+                    print(f"[WARN] Falha ao consultar lote offline {job.provider_job_id}: {e}")
+                    continue
+                if status == "in_progress":
+                    continue
+                job.status = status
+                if status == "failed":
+                    job.error = job.error or "lote falhou no provedor"
+                self.jobs.save(job)
+            try:
+                finished.append((job, self._job_results(job)))
+            except Exception as e:
+                # job continua "completed": tenta baixar de novo no próximo poll
+                print(f"[ERROR] Falha ao baixar resultados do lote {job.provider_job_id}: {e}")
+        return finished
+
+    def _job_results(self, job: LlmBatchJob) -> List[Tuple[dict, ClassificationResult]]:
+        responses: Dict[str, dict] = {}
+        if job.status == "completed":
+            responses = {line.get("custom_id"): line for line in self.provider.results(job.provider_job_id)}
+
+        out = []
+        for item in job.items:
+            rb = _result_from_dict(item["rb"])
+            line = responses.get(item["custom_id"]) or {}
+            response = line.get("response") or {}
+            result = None
+            if response.get("status_code") == 200 and isinstance(response.get("body"), dict):
+                result = self.classifier.llm.result_from_offline(response["body"], rb, item["context"])
+            if result is None:
+                # sem resposta válida: fica o rule-based, com o motivo registrado
+                error = (line.get("error") or {}).get("message") or job.error or "resposta ausente ou inválida"
+                rb.extra = {**(rb.extra or {}), "llm_offline_error": error}
+                result = rb
+            out.append((item, self.classifier.merge(rb, result)))
+        return out
+
+    def mark_applied(self, job: LlmBatchJob):
+        job.status = "applied"
+        job.applied_at = datetime.utcnow()
+        self.jobs.save(job)
+        if job.input_path:
+            try:
+                os.unlink(job.input_path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,105 @@
+"""
+Medição de uma classificação:
+- `StageTimer`: tempo por etapa (ms) + total de relógio, para `extra["timings_ms"]` e `latency_ms`
+- `PriceTable`: custo em USD a partir do `usage` do LLM, com preços por modelo (por 1M tokens)
+"""
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, Optional, Tuple
+
+from app.domain.entities import ClassificationResult
+
+# USD por 1M tokens (entrada, saída); sobrescritos/estendidos por LLM_PRICES
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+
+class StageTimer:
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - t) * 1000)
+
+    def add(self, name: str, ms: float):
+        self.stages[name] = round(self.stages.get(name, 0.0) + ms, 3)
+
+    def total_ms(self) -> int:
+        return int(round((time.perf_counter() - self._t0) * 1000))
+
+
+def stage(timer: Optional[StageTimer], name: str):
+    """`with stage(timer, "x"):` que não mede nada quando não há timer."""
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+def record_classify(timer: Optional[StageTimer], result: ClassificationResult, elapsed_ms: float) -> dict:
+    """
+    Registra o tempo do classificador e devolve o `extra` sem "stage_ms".
+    SmartClassifier separa rule-based/LLM em "stage_ms"; os demais contam inteiros na sua etapa.
+    """
+    extra = dict(result.extra or {})
+    split = extra.pop("stage_ms", None) or {"llm" if extra.get("llm") else "rule_based": elapsed_ms}
+    if timer is not None:
+        for name, ms in split.items():
+            timer.add(name, ms)
+    return extra
+
+
+def provider_for(result: ClassificationResult) -> str:
+    return "openai" if (result.extra or {}).get("llm") else "local"
+
+
+class PriceTable:
+    """
+    Preço por modelo; nomes com sufixo de versão ("gpt-4o-mini-2024-07-18") caem no prefixo mais longo.
+    `batch_factor` se aplica a respostas da Batch API (backlog offline).
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float]]] = None, batch_factor: float = 0.5):
+        self.prices = {**DEFAULT_PRICES, **(prices or {})}
+        self.batch_factor = batch_factor
+        self._by_length = sorted(self.prices, key=len, reverse=True)
+
+    @classmethod
+    def from_json(cls, raw: Optional[dict], batch_factor: float = 0.5) -> "PriceTable":
+        """{"modelo": {"input": x, "output": y}} ou {"modelo": [x, y]} (USD por 1M tokens)."""
+        prices = {}
+        for model, p in (raw or {}).items():
+            prices[model] = (float(p["input"]), float(p["output"])) if isinstance(p, dict) else (float(p[0]), float(p[1]))
+        return cls(prices, batch_factor)
+
+    def price(self, model: Optional[str]) -> Optional[Tuple[float, float]]:
+        if not model:
+            return None
+        if model in self.prices:
+            return self.prices[model]
+        for name in self._by_length:
+            if model.startswith(name + "-"):
+                return self.prices[name]
+        return None
+
+    def cost_usd(self, result: ClassificationResult) -> Optional[float]:
+        """0.0 sem chamada paga (rule-based, triagem, cache); None se o modelo não tem preço."""
+        if provider_for(result) == "local" or result.total_tokens is None:
+            return 0.0
+        price = self.price(result.used_model)
+        if price is None:
+            return None
+        prompt = result.prompt_tokens or 0
+        completion = result.completion_tokens or 0
+        cost = (prompt * price[0] + completion * price[1]) / 1_000_000
+        if (result.extra or {}).get("llm_offline"):
+            cost *= self.batch_factor
+        return round(cost, 8)
@@ -0,0 +1,218 @@
+"""
+Uploads sem ler o arquivo inteiro de uma vez:
+- `SpooledUpload`: bytes em memória até `spool_bytes`, depois arquivo temporário em disco;
+  limite de tamanho aplicado durante a leitura e sha256 calculado no caminho
+- `spool_multipart`: corpo multipart lido em streaming direto para o `SpooledUpload` (uma cópia só)
+- `detect_kind`: tipo pelo conteúdo (magic bytes), com a extensão só como desempate
+"""
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+from typing import AsyncIterable, BinaryIO, Iterator, Optional, Tuple, Union
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.domain.errors import BadRequest, PayloadTooLarge
+
+ENVELOPE_BYTES = 64 * 1024  # folga para boundaries, cabeçalhos das partes e campos pequenos
+_HEAD_BYTES = 4096
+_EML_HEADERS = re.compile(
+    rb"^(received|return-path|from|to|subject|date|message-id|mime-version|delivered-to|"
+    rb"x-[a-z0-9-]+|dkim-signature|arc-[a-z-]+|authentication-results|reply-to|content-type):",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def limit_message(max_bytes: int) -> str:
+    size = f"{max_bytes // (1024 * 1024)} MB" if max_bytes >= 1024 * 1024 else f"{max_bytes // 1024} KB"
+    return f"Arquivo acima do limite de {size}."
+
+
+class SpooledUpload:
+    def __init__(self, max_bytes: Optional[int] = None, spool_bytes: int = 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._mem: Optional[bytearray] = bytearray()
+        self._file: Optional[BinaryIO] = None
+        self.path: Optional[str] = None  # preenchido quando vai para disco
+        self.head = b""
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "SpooledUpload":
+        up = cls(spool_bytes=len(raw) + 1)
+        up.write(raw)
+        return up
+
+    @classmethod
+    def wrap(cls, raw: Union[bytes, "SpooledUpload"]) -> "SpooledUpload":
+        return raw if isinstance(raw, SpooledUpload) else cls.from_bytes(raw)
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise PayloadTooLarge(limit_message(self.max_bytes))
+        self._hash.update(chunk)
+        if len(self.head) < _HEAD_BYTES:
+            self.head += chunk[: _HEAD_BYTES - len(self.head)]
+        if self._file is None and self.size > self.spool_bytes:
+            fd, self.path = tempfile.mkstemp(prefix="upload-", suffix=".bin")
+            self._file = os.fdopen(fd, "w+b")
+            self._file.write(self._mem)
+            self._mem = None
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._mem += chunk
+
+    def finish(self) -> "SpooledUpload":
+        if self._file is not None:
+            self._file.flush()
+        return self
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def open(self) -> BinaryIO:
+        """Leitor novo posicionado no início (não compartilha posição com outros leitores)."""
+        if self.path:
+            return open(self.path, "rb")
+        return BytesIO(self._mem)
+
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """Conteúdo inteiro sem cópia: memoryview do buffer ou mmap do arquivo temporário."""
+        if not self.path:
+            with memoryview(self._mem) as mv:
+                yield mv
+            return
+        if self.size == 0:
+            yield memoryview(b"")
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as mv:
+                yield mv
+
+    def read_bytes(self) -> bytes:
+        with self.view() as mv:
+            return bytes(mv)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+        self._mem = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def spool_multipart(
+    chunks: AsyncIterable[bytes],
+    content_type: str,
+    max_bytes: int,
+    spool_bytes: int,
+    field: str = "file",
+) -> Tuple[Optional[str], SpooledUpload]:
+    """
+    Lê o corpo multipart bloco a bloco e grava só a parte `field` (com filename) no SpooledUpload.
+    O limite vale enquanto o corpo chega (com ou sem Content-Length): o arquivo até `max_bytes`
+    e o corpo inteiro até `max_bytes` + envelope. Devolve (filename, upload); filename None sem o campo.
+    """
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise BadRequest("multipart/form-data sem boundary.")
+
+    upload = SpooledUpload(max_bytes=max_bytes, spool_bytes=spool_bytes)
+    part = {"header": b"", "value": b"", "disposition": b"", "target": False}
+    found = {"filename": None, "files": 0}
+
+    def on_header_field(data, start, end):
+        part["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        if part["header"].lower() == b"content-disposition":
+            part["disposition"] = part["value"]
+        part["header"] = part["value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["disposition"])
+        part["disposition"] = b""
+        part["target"] = False
+        if b"filename" not in options:
+            return  # campo de texto: ignorado
+        found["files"] += 1
+        if found["files"] > 1:
+            raise BadRequest("Envie um único arquivo.")
+        if options.get(b"name", b"").decode("utf-8", "replace") == field:
+            part["target"] = True
+            found["filename"] = options[b"filename"].decode("utf-8", "replace")
+
+    def on_part_data(data, start, end):
+        if part["target"]:
+            upload.write(data[start:end])
+
+    parser = MultipartParser(boundary, {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    received = 0
+    try:
+        async for chunk in chunks:
+            received += len(chunk)
+            if received > max_bytes + ENVELOPE_BYTES:
+                raise PayloadTooLarge(limit_message(max_bytes))
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError as e:
+        upload.close()
+        raise BadRequest(f"multipart/form-data inválido: {e}")
+    except BaseException:
+        upload.close()
+        raise
+    return found["filename"], upload.finish()
+
+
+def detect_kind(head: bytes, filename: Optional[str] = None) -> str:
+    """'pdf' | 'eml' | 'txt' pelo conteúdo; a extensão só decide entre e-mail e texto puro."""
+    ext = os.path.splitext((filename or "").lower())[1]
+    if head.lstrip(b"\xef\xbb\xbf \t\r\n")[:5] == b"%PDF-":
+        return "pdf"
+    if ext == ".pdf":
+        raise BadRequest("O arquivo não é um PDF válido.")
+    if b"\x00" in head[:1024]:
+        raise BadRequest("Tipo de arquivo não suportado (binário). Envie .pdf, .txt ou .eml.")
+    if ext == ".eml":
+        return "eml"
+    if ext == ".txt":
+        return "txt"
+    # sem extensão conhecida: cabeçalhos RFC 5322 no início → e-mail
+    first = head.lstrip()[:1024]
+    if _EML_HEADERS.match(first) and len(_EML_HEADERS.findall(first)) >= 2:
+        return "eml"
+    if ext:
+        raise BadRequest("Supported files: .pdf, .txt ou .eml")
+    return "txt"
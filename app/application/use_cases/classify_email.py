@@ -29,32 +29,91 @@ class FileFacade:
         raise BadRequest("Supported files: .pdf or .txt")
     
 
+import json
+import time
+from dataclasses import asdict
 from datetime import datetime
-from typing import Optional
-from app.domain.entities import Email, ClassificationResult
+from typing import Optional, Union
+from app.domain.entities import Email, ClassificationResult, ExtractedDocument, AttachmentText
 from app.domain.errors import BadRequest
-from app.domain.ports import TokenizerPort, ClassifierPort, ReplySuggesterPort, ProfilePort, LogRepositoryPort
-from app.domain.entities import ClassificationLog
+from app.domain.ports import (
+    TokenizerPort, ClassifierPort, ReplySuggesterPort, ProfilePort, LogRepositoryPort, KeywordIndexPort,
+)
+from app.domain.entities import ClassificationLog, EmailAnalysis
+from app.application.analysis import analyze_email
+from app.application.uploads import SpooledUpload, detect_kind
+from app.application.telemetry import PriceTable, StageTimer, provider_for, record_classify, stage
+
+
+def _extract_document(extractor, upload: SpooledUpload) -> ExtractedDocument:
+    if hasattr(extractor, "extract_document"):
+        return extractor.extract_document(upload)
+    return ExtractedDocument(text=extractor.extract(upload))
+
+
+def _document_from_json(raw: str) -> ExtractedDocument:
+    data = json.loads(raw)
+    return ExtractedDocument(
+        text=data["text"],
+        attachments=[AttachmentText(**a) for a in data.get("attachments") or []],
+    )
 
 
 class FileFacade:
-    """Converte upload (.pdf/.txt/.eml) para texto bruto."""
-    def __init__(self, pdf_extractor, txt_extractor, eml_extractor=None):
+    """
+    Converte upload (.pdf/.txt/.eml) para texto bruto.
+    Com `cache`, o texto é reaproveitado por conteúdo (sha256 dos bytes + versão do extrator).
+    """
+    def __init__(self, pdf_extractor, txt_extractor, eml_extractor=None, cache=None):
         self._pdf = pdf_extractor
         self._txt = txt_extractor
         self._eml = eml_extractor
+        self._cache = cache
 
-    def from_upload(self, filename: str, raw: bytes) -> str:
-        name = (filename or "").lower()
-        if name.endswith(".pdf"):
-            return self._pdf.extract(raw)
-        if name.endswith(".txt"):
-            return self._txt.extract(raw)
-        if name.endswith(".eml"):
+    def _extractor_for(self, filename: str, upload: SpooledUpload):
+        # tipo pelo conteúdo (magic bytes); extensão só desempata e-mail x texto
+        kind = detect_kind(upload.head, filename)
+        if kind == "pdf":
+            return self._pdf
+        if kind == "eml":
             if not self._eml:
                 raise BadRequest("EML extractor não configurado.")
-            return self._eml.extract(raw)
-        raise BadRequest("Supported files: .pdf, .txt ou .eml")
+            return self._eml
+        return self._txt
+
+    def from_upload(self, filename: str, raw: Union[bytes, SpooledUpload]) -> str:
+        return self.from_document(filename, raw).text
+
+    def from_document(self, filename: str, raw: Union[bytes, SpooledUpload]) -> ExtractedDocument:
+        """Texto principal + texto dos anexos (separados), quando o extrator suporta."""
+        upload = SpooledUpload.wrap(raw)
+        extractor = self._extractor_for(filename, upload)
+        if not self._cache:
+            return _extract_document(extractor, upload)
+
+        key = self._cache.key_for_digest(upload.sha256, getattr(extractor, "cache_version", type(extractor).__name__))
+        cached = self._cache.get(key)
+        if cached is not None:
+            return _document_from_json(cached)
+        doc = _extract_document(extractor, upload)  # erros (BadRequest) não são cacheados
+        self._cache.put(key, json.dumps(asdict(doc), ensure_ascii=False))
+        return doc
+
+    def cache_stats(self) -> Optional[dict]:
+        return self._cache.stats() if self._cache else None
+
+    def close(self):
+        """Libera recursos dos extratores (ex.: pool de processos do PDF)."""
+        for ext in (self._pdf, self._txt, self._eml):
+            if hasattr(ext, "close"):
+                ext.close()
+
+    def triage(self, filename: str, raw: Union[bytes, SpooledUpload]) -> Optional[ClassificationResult]:
+        """Pré-triagem por cabeçalhos (só e-mail); None quando não é conclusiva."""
+        upload = SpooledUpload.wrap(raw)
+        if self._eml and hasattr(self._eml, "triage") and self._extractor_for(filename, upload) is self._eml:
+            return self._eml.triage(upload)
+        return None
 
 
 class ClassifyEmailUseCase:
@@ -66,6 +125,7 @@ class ClassifyEmailUseCase:
         responder: ReplySuggesterPort,
         profiles: ProfilePort,
         log_repo: LogRepositoryPort,
+        prices: Optional[PriceTable] = None,
     ):
         self.file_facade = file_facade
         self.tokenizer = tokenizer
@@ -73,49 +133,61 @@ class ClassifyEmailUseCase:
         self.responder = responder
         self.profiles = profiles
         self.log_repo = log_repo
+        self.prices = prices or PriceTable()
 
-    # >>> FALTAVA ESTE MÉTODO <<<
-    def _expand_priority(self, profile: dict) -> list[str]:
-        """
-        Expande keywords + sinônimos do profile para melhorar o sinal:
-        - normaliza tudo para lowercase
-        - combina priority_keywords e keyword_synonyms (se existirem)
-        """
-        base = (profile.get("priority_keywords") or [])
-        syns = (profile.get("keyword_synonyms") or {})
-        expanded = set(map(str.lower, base))
-        for k, arr in syns.items():
-            expanded.add(str(k).lower())
-            for s in arr:
-                expanded.add(str(s).lower())
-        return list(expanded)
+    # --- etapas do pipeline (reaproveitadas pela variante assíncrona) ---
 
-    def _classify_and_log(
-        self,
-        email: Email,
-        profile_id: str,
-        source: str,
-        file_name: Optional[str] = None,
-    ) -> ClassificationResult:
+    def _resolve_profile(self, profile_id: str) -> tuple[dict, Optional[KeywordIndexPort]]:
         profile = self.profiles.get_profile(profile_id)
         if not profile:
             raise BadRequest(f"Perfil '{profile_id}' não encontrado")
+        return profile, self.profiles.get_keyword_index(profile_id)
 
-        pre = self.tokenizer.preprocess(email.body)
-        tokens = self.tokenizer.tokenize(pre)
+    def _analyze(self, email: Email, timer: Optional[StageTimer] = None) -> EmailAnalysis:
+        # idioma + tokens calculados uma vez e compartilhados com os classificadores
+        return analyze_email(self.tokenizer, email, timer)
 
-        # usa o profile expandido (keywords + sinônimos)
+    def _classify(
+        self,
+        email: Email,
+        profile: dict,
+        priority: Optional[KeywordIndexPort],
+        analysis: EmailAnalysis,
+        timer: Optional[StageTimer] = None,
+    ) -> ClassificationResult:
+        # usa o índice compilado do profile (keywords + sinônimos, inclusive multi-palavra)
+        t0 = time.perf_counter()
         result = self.classifier.classify(
             email,
-            tokens,
+            analysis.tokens,
             mood=profile.get("mood"),
-            priority=self._expand_priority(profile),
+            priority=priority,
+            analysis=analysis,
         )
+        extra = record_classify(timer, result, (time.perf_counter() - t0) * 1000)
 
-        reply = self.responder.suggest(result, email)
-        final_result = type(result)(**{**result.__dict__, "suggested_reply": reply})
+        with stage(timer, "responder"):
+            reply = self.responder.suggest(result, email)
+        if email.attachments:
+            extra = {**extra, "attachments": [
+                {"filename": a.filename, "chars": len(a.text), "error": a.error} for a in email.attachments
+            ]}
+        return type(result)(**{**result.__dict__, "suggested_reply": reply, "extra": extra})
 
-        log = ClassificationLog(
+    def _build_log(
+        self,
+        email: Email,
+        result: ClassificationResult,
+        profile_id: str,
+        source: str,
+        file_name: Optional[str] = None,
+        timer: Optional[StageTimer] = None,
+    ) -> ClassificationLog:
+        extra = result.extra
+        if timer is not None:
+            # o log leva as etapas até aqui; "persist" só entra no resultado devolvido
+            extra = {**(extra or {}), "timings_ms": dict(timer.stages)}
+        return ClassificationLog(
             id=None,
             created_at=datetime.utcnow(),
             source=source,
@@ -124,22 +196,61 @@ class ClassifyEmailUseCase:
             sender=email.sender,
             file_name=file_name,
             profile_id=profile_id,
-            category=final_result.category.value,
-            reason=final_result.reason,
-            suggested_reply=final_result.suggested_reply,
-            used_model=final_result.used_model,
-            provider="openai",  # pode parametrizar
-            prompt_tokens=final_result.prompt_tokens,
-            completion_tokens=final_result.completion_tokens,
-            total_tokens=final_result.total_tokens,
-            cost_usd=0.0,
-            latency_ms=None,
+            category=result.category.value,
+            reason=result.reason,
+            suggested_reply=result.suggested_reply,
+            used_model=result.used_model,
+            provider=provider_for(result),
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            total_tokens=result.total_tokens,
+            cost_usd=self.prices.cost_usd(result),
+            latency_ms=timer.total_ms() if timer is not None else None,
             status="ok",
             error=None,
-            extra=final_result.extra,
+            extra=extra,
         )
-        self.log_repo.save(log)
-        return final_result
+
+    @staticmethod
+    def _with_timings(result: ClassificationResult, timer: StageTimer) -> ClassificationResult:
+        return type(result)(**{**result.__dict__, "extra": {**(result.extra or {}), "timings_ms": dict(timer.stages)}})
+
+    def _email_from_upload(
+        self,
+        filename: str,
+        raw: Union[bytes, SpooledUpload],
+        subject: Optional[str] = None,
+        sender: Optional[str] = None,
+        timer: Optional[StageTimer] = None,
+    ) -> Email:
+        # cabeçalhos conclusivos dispensam a extração do corpo
+        upload = SpooledUpload.wrap(raw)
+        with stage(timer, "extract"):
+            triage = self.file_facade.triage(filename, upload)
+            if triage:
+                return Email(subject=subject, body="", sender=sender, triage=triage)
+            doc = self.file_facade.from_document(filename, upload)
+        return Email(subject=subject, body=doc.text, sender=sender, attachments=doc.attachments or None)
+
+    def _classify_and_log(
+        self,
+        email: Email,
+        profile_id: str,
+        source: str,
+        file_name: Optional[str] = None,
+        timer: Optional[StageTimer] = None,
+    ) -> ClassificationResult:
+        timer = timer or StageTimer()
+        profile, priority = self._resolve_profile(profile_id)
+        if email.triage:
+            result = email.triage  # pré-triagem por cabeçalhos: sem análise nem classificador
+        else:
+            analysis = self._analyze(email, timer)
+            result = self._classify(email, profile, priority, analysis, timer)
+        log = self._build_log(email, result, profile_id, source, file_name, timer)
+        with timer.stage("persist"):
+            self.log_repo.save(log)
+        return self._with_timings(result, timer)
 
     def execute_from_text(
         self,
@@ -158,13 +269,13 @@ class ClassifyEmailUseCase:
     def execute_from_file(
         self,
         filename: str,
-        raw: bytes,
+        raw: Union[bytes, SpooledUpload],
         profile_id: Optional[str] = None,
         subject: Optional[str] = None,
         sender: Optional[str] = None,
     ) -> ClassificationResult:
         if not profile_id:
             profile_id = "default"
-        text = self.file_facade.from_upload(filename, raw)
-        email = Email(subject=subject, body=text, sender=sender)
-        return self._classify_and_log(email, profile_id, source="file", file_name=filename)
+        timer = StageTimer()
+        email = self._email_from_upload(filename, raw, subject, sender, timer)
+        return self._classify_and_log(email, profile_id, source="file", file_name=filename, timer=timer)
@@ -0,0 +1,172 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple, Union
+
+from app.domain.entities import Email, ClassificationResult
+from app.domain.errors import Overloaded
+from app.application.use_cases.classify_email import ClassifyEmailUseCase
+from app.application.telemetry import StageTimer
+
+
+class AsyncClassifyEmailUseCase:
+    """
+    Variante assíncrona do ClassifyEmailUseCase para o event loop do FastAPI.
+    - extração/tokenização (CPU) vão para um executor limitado
+    - classificação (pode chamar o LLM) roda num executor de I/O com `max_in_flight` workers
+    - gravação do log roda num executor de 1 worker (sessão do repositório não é thread-safe)
+    - admissão: no máximo `max_in_flight` em execução + `max_queue` aguardando;
+      acima disso levanta Overloaded (503) em vez de acumular latência.
+    """
+
+    def __init__(
+        self,
+        use_case: ClassifyEmailUseCase,
+        max_in_flight: int = 8,
+        max_queue: int = 32,
+        cpu_workers: int = 2,
+    ):
+        self.uc = use_case
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._cpu = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="classify-cpu")
+        self._io = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="classify-io")
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classify-db")
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._waiting = 0
+        self._in_flight = 0
+
+    def check_capacity(self):
+        """Levanta Overloaded se não há vaga em execução nem na fila."""
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            raise Overloaded("Servidor ocupado, tente novamente em instantes.")
+
+    @asynccontextmanager
+    async def _admit(self):
+        self.check_capacity()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    async def _run(self, executor, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def _classify_and_log(
+        self,
+        email: Email,
+        profile_id: str,
+        source: str,
+        file_name: Optional[str] = None,
+        timer: Optional[StageTimer] = None,
+    ) -> ClassificationResult:
+        # etapas medidas dentro dos executores; o total inclui a espera por eles
+        timer = timer or StageTimer()
+        profile, priority = self.uc._resolve_profile(profile_id)
+        if email.triage:
+            result = email.triage  # pré-triagem por cabeçalhos: sem análise nem classificador
+        else:
+            analysis = await self._run(self._cpu, self.uc._analyze, email, timer)
+            result = await self._run(self._io, self.uc._classify, email, profile, priority, analysis, timer)
+        log = self.uc._build_log(email, result, profile_id, source, file_name, timer)
+        with timer.stage("persist"):
+            await self._run(self._db, self.uc.log_repo.save, log)
+        return self.uc._with_timings(result, timer)
+
+    async def execute_from_text(
+        self,
+        subject: str,
+        body: str,
+        sender: Optional[str] = None,
+        profile_id: Optional[str] = None,
+        source: str = "json",
+        file_name: Optional[str] = None,
+    ) -> ClassificationResult:
+        async with self._admit():
+            email = Email(subject=subject, body=body, sender=sender)
+            return await self._classify_and_log(email, profile_id or "default", source, file_name)
+
+    async def execute_from_file(
+        self,
+        filename: str,
+        raw: bytes,
+        profile_id: Optional[str] = None,
+        subject: Optional[str] = None,
+        sender: Optional[str] = None,
+    ) -> ClassificationResult:
+        async with self._admit():
+            timer = StageTimer()
+            email = await self._run(self._cpu, self.uc._email_from_upload, filename, raw, subject, sender, timer)
+            return await self._classify_and_log(email, profile_id or "default", "file", filename, timer)
+
+    async def execute_batch(
+        self,
+        items: List[Tuple[Email, Optional[str]]],
+        source: str = "batch",
+        flush_every: int = 50,
+    ) -> AsyncIterator[Tuple[int, Union[ClassificationResult, Exception]]]:
+        """
+        Classifica um lote e entrega (índice, resultado|erro) na ordem em que ficam prontos.
+        - o lote ocupa uma única vaga de admissão
+        - perfil + índice compilado são resolvidos uma vez por profile_id no lote
+        - logs são gravados em grupos de `flush_every` numa única transação
+          (sem etapa "persist" por item: a gravação é do grupo)
+        """
+        async with self._admit():
+            profiles = {}
+            pending_logs = []
+            batch_slots = asyncio.Semaphore(self.max_in_flight)
+
+            async def one(i: int, email: Email, profile_id: str):
+                async with batch_slots:
+                    try:
+                        if profile_id not in profiles:
+                            profiles[profile_id] = self.uc._resolve_profile(profile_id)
+                        profile, priority = profiles[profile_id]
+                        timer = StageTimer()
+                        analysis = await self._run(self._cpu, self.uc._analyze, email, timer)
+                        result = await self._run(
+                            self._io, self.uc._classify, email, profile, priority, analysis, timer
+                        )
+                        log = self.uc._build_log(email, result, profile_id, source, timer=timer)
+                        return i, self.uc._with_timings(result, timer), log
+                    except Exception as e:
+                        return i, e, None
+
+            tasks = [
+                asyncio.create_task(one(i, email, profile_id or "default"))
+                for i, (email, profile_id) in enumerate(items)
+            ]
+            try:
+                for fut in asyncio.as_completed(tasks):
+                    i, result, log = await fut
+                    if log is not None:
+                        pending_logs.append(log)
+                    if len(pending_logs) >= flush_every:
+                        logs, pending_logs = pending_logs, []
+                        await self._run(self._db, self.uc.log_repo.save_many, logs)
+                    yield i, result
+            finally:
+                for t in tasks:
+                    t.cancel()
+                if pending_logs:
+                    await self._run(self._db, self.uc.log_repo.save_many, pending_logs)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self):
+        for ex in (self._cpu, self._io, self._db):
+            ex.shutdown(wait=True)
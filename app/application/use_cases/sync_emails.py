@@ -1,8 +1,65 @@
-from app.domain.ports import EmailSourcePort, ClassifierPort, LogRepositoryPort
-from app.domain.entities import Category, ClassificationLog
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.domain.ports import EmailSourcePort, ClassifierPort, LogRepositoryPort, CheckpointRepositoryPort
+from app.domain.entities import Category, ClassificationLog, MailboxCheckpoint
+from app.application.analysis import analyze_email
+from app.application.telemetry import PriceTable, StageTimer, provider_for, record_classify
+
+_DONE = object()
+_DEFERRED = object()  # escalado e enviado ao lote offline do LLM
+
+
+class _UidProgress:
+    """
+    Maior UID concluído sem buracos entre os UIDs buscados no ciclo.
+    Como a classificação é paralela, um UID só avança o checkpoint quando todos os menores terminaram.
+    """
+
+    def __init__(self, uids: Iterable[int], floor: int, ceiling: int):
+        self.uids = sorted(uids)
+        self.floor = floor          # checkpoint de partida
+        self.ceiling = ceiling      # UIDNEXT - 1 no SELECT: vale se o ciclo terminar inteiro
+        self.done: set = set()
+        self._lock = threading.Lock()
+
+    def mark(self, uid) -> None:
+        with self._lock:
+            self.done.add(int(uid))
+
+    def complete(self) -> bool:
+        with self._lock:
+            return len(self.done) >= len(self.uids)
+
+    def last_uid(self) -> int:
+        with self._lock:
+            last = self.floor
+            for uid in self.uids:
+                if uid not in self.done:
+                    return last
+                last = uid
+            return max(last, self.ceiling)
 
 
 class SyncEmailsUseCase:
+    """
+    Sincronização em pipeline: fetch → classify (N workers) → persist → move,
+    com filas limitadas entre os estágios (backpressure até o fetch).
+    - stop_event: o fetch para, itens ainda não classificados são descartados
+      (continuam não lidos na caixa) e o que já foi classificado é gravado e movido
+    - stats(): profundidade de cada fila e contadores por estágio
+    - com `checkpoints` (e fonte com mailbox_state/search_since/fetch_uids) a sincronização é
+      incremental: guarda UIDVALIDITY + último UID processado (+ HIGHESTMODSEQ) por caixa e
+      cada ciclo busca só `UID n+1:*`, lidos ou não. Sem checkpoint válido, parte dos não lidos.
+      UID que falha (classificar, gravar ou mover) segura o checkpoint e volta no ciclo seguinte,
+      até `max_attempts` falhas; aí é dado como concluído. Concluídos acima do checkpoint não são
+      buscados de novo e log já gravado não é regravado quando só o move falhou.
+    - com `backlog` (LlmBacklog), ciclos grandes não chamam o LLM por e-mail: os escalados vão
+      para um job da Batch API e são gravados/movidos em lote quando o job termina
+    """
+
     def __init__(
         self,
         email_source: EmailSourcePort,
@@ -10,66 +67,450 @@ class SyncEmailsUseCase:
         repo: LogRepositoryPort,
         profile_id: str,
         tokenizer,
+        classify_workers: int = 4,
+        queue_size: int = 32,
+        persist_batch: int = 50,
+        move_batch_size: int = 100,
+        checkpoints: Optional[CheckpointRepositoryPort] = None,
+        checkpoint_key: Optional[str] = None,
+        backlog=None,
+        prices: Optional[PriceTable] = None,
+        max_attempts: int = 3,
     ):
         self.email_source = email_source
         self.classifier = classifier
         self.repo = repo
         self.profile_id = profile_id
         self.tokenizer = tokenizer
+        self.classify_workers = max(1, classify_workers)
+        self.queue_size = queue_size
+        self.persist_batch = persist_batch
+        self.move_batch_size = move_batch_size
+        self.checkpoints = checkpoints
+        self.checkpoint_key = checkpoint_key
+        self.backlog = backlog
+        self.prices = prices or PriceTable()
+        self.max_attempts = max(1, max_attempts)
+        self._backlog_key = checkpoint_key or profile_id
+        self._deferring = False
+        self._progress: Optional[_UidProgress] = None
+        self._state = None
+        self._queues = {name: queue.Queue(maxsize=queue_size) for name in ("classify", "persist", "move")}
+        self._counters = {
+            "fetched": 0, "classified": 0, "persisted": 0, "moved": 0, "dropped": 0, "deferred": 0, "backlog_applied": 0,
+            "gave_up": 0,
+        }
+        self._lock = threading.Lock()
+        # estado entre ciclos (modo incremental, por UID)
+        self._attempts: Dict[int, int] = {}   # falhas até agora
+        self._logged: Set[int] = set()        # log gravado, move pendente
+        self._completed: Set[int] = set()     # concluídos acima do checkpoint
+        self._retry_lock = threading.Lock()
 
-    def run(self, stop_event=None):
+    def run(self, stop_event=None) -> int:
+        """Processa os não lidos; retorna quantos e-mails foram classificados."""
         print("[DEBUG] Iniciando SyncEmailsUseCase.run()")
+        stop_event = stop_event or threading.Event()
+        self._queues = {name: queue.Queue(maxsize=self.queue_size) for name in ("classify", "persist", "move")}
+        before = self._counters["classified"]
+        errors: List[BaseException] = []
+        if self.backlog is not None:
+            try:
+                self._apply_backlog()
+            except Exception as e:
+                print(f"[ERROR] Falha ao aplicar lotes offline do LLM: {e}")
+        self._deferring = False
+
+        # a busca roda na própria thread que chamou run(): por ciclo são classify_workers + 2 threads novas
+        threads = [
+            threading.Thread(target=self._classify_stage, args=(stop_event,), name=f"sync-classify-{i}")
+            for i in range(self.classify_workers)
+        ]
+        threads.append(threading.Thread(target=self._persist_stage, name="sync-persist"))
+        threads.append(threading.Thread(target=self._move_stage, name="sync-move"))
+        for t in threads:
+            t.start()
+        self._fetch_stage(stop_event, errors)
+        for t in threads:
+            t.join()
+
+        if self._deferring:
+            self._submit_backlog()
+        self._save_checkpoint(final=True)
+        if stop_event.is_set():
+            print("[DEBUG] Interrompendo processamento por stop_event")
+        print("[DEBUG] Fim de SyncEmailsUseCase.run()")
+        if errors:
+            raise errors[0]
+        return self._counters["classified"] - before
+
+    def stats(self) -> dict:
+        return {
+            "queues": {name: q.qsize() for name, q in self._queues.items()},
+            "queue_size": self.queue_size,
+            "classify_workers": self.classify_workers,
+            **self._counters,
+        }
 
-        for msg_id, email in self.email_source.fetch_unread():
-            if stop_event and stop_event.is_set():
-                print("[DEBUG] Interrompendo processamento por stop_event")
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counters[name] += n
+
+    # --- estágios ---
+
+    def _fetch_stage(self, stop_event, errors: list):
+        q = self._queues["classify"]
+        try:
+            for msg_id, email in self._fetch():
+                if stop_event.is_set():
+                    break
+                self._count("fetched")
+                q.put((msg_id, email))
+        except BaseException as e:
+            print(f"[ERROR] Falha ao buscar e-mails: {e}")
+            errors.append(e)
+        finally:
+            for _ in range(self.classify_workers):
+                q.put(_DONE)
+
+    def _classify_stage(self, stop_event):
+        src, dst = self._queues["classify"], self._queues["persist"]
+        while True:
+            item = src.get()
+            if item is _DONE:
+                dst.put(_DONE)
                 return
+            if stop_event.is_set():
+                self._count("dropped")
+                continue
 
+            msg_id, email = item
             print(f"[DEBUG] Processando email {msg_id} - Assunto: {email.subject}")
-
-            result = self._classify_email(msg_id, email)
+            timer = StageTimer()
+            result = self._classify_email(msg_id, email, timer)
+            if result is _DEFERRED:
+                # só conta como concluído depois que o job for gravado (_submit_backlog)
+                self._count("deferred")
+                continue
             if not result:
+                # falha de classificação segura o checkpoint: a mensagem volta no próximo ciclo
+                self._fail([msg_id], "classificar")
                 continue
+            self._count("classified")
 
-            folder = "Produtivos" if result.category == Category.PRODUCTIVE else "Improdutivos"
-            result.extra = {**(result.extra or {}), "profile_id": self.profile_id, "moved_to": folder}
+            folder, log = self._log_for(result, email.subject, email.sender, (email.body or "")[:200], timer)
+            dst.put((msg_id, log, folder))
 
-            log = ClassificationLog(
-                profile_id=self.profile_id,
-                category=result.category,
-                reason=result.reason,
-                suggested_reply=result.suggested_reply,
-                subject=email.subject,
-                sender=email.sender,
-                body_excerpt=(email.body or "")[:200],
-                extra=result.extra,
-            )
+    def _persist_stage(self):
+        src, dst = self._queues["persist"], self._queues["move"]
+        pending_done = self.classify_workers
+        while pending_done:
+            batch = []
+            item = src.get()
+            # agrupa o que já estiver na fila numa única transação
+            while True:
+                if item is _DONE:
+                    pending_done -= 1
+                else:
+                    batch.append(item)
+                if not pending_done or len(batch) >= self.persist_batch:
+                    break
+                try:
+                    item = src.get_nowait()
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+            # log já gravado num ciclo anterior (só o move falhou) não é gravado de novo
+            logged = self._already_logged(batch)
+            to_save = [item for item in batch if item[0] not in logged]
+            # lote que não foi gravado não é movido: fica na caixa e segura o checkpoint
+            if to_save and not self._save_logs(to_save):
+                self._fail([msg_id for msg_id, _, _ in to_save], "gravar")
+                to_save = []
+            saved = {msg_id for msg_id, _, _ in to_save}
+            self._remember_logged(list(saved))
+            for msg_id, _, folder in batch:
+                if msg_id in saved or msg_id in logged:
+                    dst.put((msg_id, folder))
+        dst.put(_DONE)
 
-            self._save_log(msg_id, log)
-            self._move_email(msg_id, folder)
+    def _move_stage(self):
+        src = self._queues["move"]
+        done = False
+        while not done:
+            # agrupa por pasta o que já estiver na fila: um move por pasta, não por mensagem
+            groups: Dict[str, List[str]] = {}
+            item, queued = src.get(), 0
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                msg_id, folder = item
+                groups.setdefault(folder, []).append(msg_id)
+                queued += 1
+                if queued >= self.move_batch_size:
+                    break
+                try:
+                    item = src.get_nowait()
+                except queue.Empty:
+                    break
+            for folder, ids in groups.items():
+                # só gravado + movido conta como concluído para o checkpoint
+                moved = self._move_emails(ids, folder)
+                self._count("moved", len(moved))
+                self._finish(moved)
+                self._fail([msg_id for msg_id in ids if msg_id not in moved], "mover")
+            self._save_checkpoint()
 
-        print("[DEBUG] Fim de SyncEmailsUseCase.run()")
+    def _log_for(self, result, subject, sender, body_excerpt, timer: Optional[StageTimer] = None):
+        folder = "Produtivos" if result.category == Category.PRODUCTIVE else "Improdutivos"
+        result.extra = {**(result.extra or {}), "profile_id": self.profile_id, "moved_to": folder}
+        if timer is not None:
+            # "persist" fica de fora: a gravação é feita em lote no estágio seguinte
+            result.extra["timings_ms"] = dict(timer.stages)
+        log = ClassificationLog(
+            profile_id=self.profile_id,
+            category=result.category,
+            reason=result.reason,
+            suggested_reply=result.suggested_reply,
+            subject=subject,
+            sender=sender,
+            body_excerpt=body_excerpt,
+            used_model=result.used_model,
+            provider=provider_for(result),
+            prompt_tokens=result.prompt_tokens,
+            completion_tokens=result.completion_tokens,
+            total_tokens=result.total_tokens,
+            cost_usd=self.prices.cost_usd(result),
+            latency_ms=timer.total_ms() if timer is not None else None,
+            extra=result.extra,
+        )
+        return folder, log
+
+    # --- backlog offline do LLM ---
+
+    def _backlog_uids(self, uids: List[int]) -> List[int]:
+        """Liga o modo backlog para ciclos grandes e tira os UIDs que já estão num job aberto."""
+        pending = self.backlog.pending_ids(self._backlog_key)
+        uids = [u for u in uids if str(u) not in pending]
+        self._deferring = self.backlog.applies_to(len(uids)) and hasattr(self.classifier, "should_escalate")
+        if self._deferring:
+            print(f"[DEBUG] Modo backlog: {len(uids)} mensagem(ns); escalados vão para lote offline do LLM")
+        return uids
+
+    def _submit_backlog(self):
+        """Grava os jobs dos adiados; até lá eles seguram o checkpoint (o buffer vive só em memória)."""
+        try:
+            jobs = self.backlog.submit(self._backlog_key, self._uidvalidity())
+        except Exception as e:
+            # sem job gravado: as mensagens voltam no próximo ciclo
+            print(f"[ERROR] Falha ao registrar lote offline do LLM: {e}")
+            return
+        self._finish([item["msg_id"] for job in jobs for item in job.items])
+
+    def _apply_backlog(self):
+        """Jobs offline concluídos: grava os logs e move as mensagens em lote."""
+        for job, results in self.backlog.poll(self._backlog_key):
+            batch = []
+            for item, result in results:
+                folder, log = self._log_for(result, item["subject"], item["sender"], item["body_excerpt"])
+                batch.append((item["msg_id"], log, folder))
+            if not self._save_logs(batch):
+                continue  # job segue aberto: aplica de novo no próximo poll
+
+            if self._same_uidvalidity(job.uidvalidity):
+                groups: Dict[str, List[str]] = {}
+                for msg_id, _, folder in batch:
+                    groups.setdefault(folder, []).append(msg_id)
+                for folder, ids in groups.items():
+                    for start in range(0, len(ids), self.move_batch_size):
+                        self._count("moved", len(self._move_emails(ids[start:start + self.move_batch_size], folder)))
+            else:
+                print(f"[WARN] UIDVALIDITY mudou desde o lote {job.id}: logs gravados, mensagens não movidas")
+            self.backlog.mark_applied(job)
+            self._count("backlog_applied", len(batch))
+            print(f"[DEBUG] Lote offline {job.provider_job_id or job.id} aplicado: {len(batch)} e-mail(s)")
+
+    def _uidvalidity(self) -> Optional[int]:
+        if not hasattr(self.email_source, "mailbox_state"):
+            return None
+        return self.email_source.mailbox_state().uidvalidity
+
+    def _same_uidvalidity(self, uidvalidity: Optional[int]) -> bool:
+        """UIDs do job ainda valem na caixa? (sem como saber, assume que sim)"""
+        if uidvalidity is None:
+            return True
+        try:
+            current = self._uidvalidity()
+        except Exception as e:
+            print(f"[WARN] Falha ao ler o estado da caixa: {e}")
+            return False
+        return current is None or current == uidvalidity
+
+    # --- checkpoint incremental ---
+
+    def _fetch(self):
+        src = self.email_source
+        self._progress = None
+        if self.checkpoints is None or not hasattr(src, "mailbox_state"):
+            if self.backlog is not None and hasattr(src, "search_unseen"):
+                return src.fetch_uids(self._backlog_uids(src.search_unseen()))
+            return src.fetch_unread()
+
+        state = src.mailbox_state()
+        cp = self.checkpoints.get(self.checkpoint_key)
+        if cp is None or cp.uidvalidity != state.uidvalidity:
+            if cp is not None:
+                print(f"[WARN] UIDVALIDITY mudou ({cp.uidvalidity} → {state.uidvalidity}), recomeçando pelos não lidos")
+            with self._retry_lock:
+                self._attempts.clear()
+                self._logged.clear()
+                self._completed.clear()
+            uids = src.search_unseen()
+            floor = min(uids) - 1 if uids else state.uidnext - 1
+        elif cp.highest_modseq is not None and cp.highest_modseq == state.highest_modseq:
+            uids, floor = [], cp.last_uid  # CONDSTORE: nada mudou na caixa desde o último ciclo
+        else:
+            uids = src.search_since(cp.last_uid)
+            floor = cp.last_uid
+
+        uids = self._skip_completed(uids, floor)
+        if self.backlog is not None:
+            uids = self._backlog_uids(uids)
+        print(f"[DEBUG] Sincronização incremental: {len(uids)} mensagem(ns) após UID {floor}")
+        self._state = state
+        self._saved_last = None
+        self._progress = _UidProgress(uids, floor, state.uidnext - 1)
+        return src.fetch_uids(uids)
+
+    def _mark_done(self, msg_ids: List[str]):
+        if self._progress is not None:
+            for msg_id in msg_ids:
+                self._progress.mark(msg_id)
 
-    def _classify_email(self, msg_id, email):
+    # --- tentativas por UID (só no modo incremental: fora dele os ids não são estáveis) ---
+
+    def _skip_completed(self, uids: List[int], floor: int) -> List[int]:
+        """Tira os UIDs já concluídos (ex.: Gmail, onde o move só rotula e a mensagem fica na INBOX)."""
+        with self._retry_lock:
+            self._completed = {u for u in self._completed if u > floor}
+            self._logged = {u for u in self._logged if u > floor}
+            self._attempts = {u: n for u, n in self._attempts.items() if u > floor}
+            return [u for u in uids if u not in self._completed]
+
+    def _already_logged(self, batch: list) -> Set[str]:
+        if self._progress is None:
+            return set()
+        with self._retry_lock:
+            return {msg_id for msg_id, _, _ in batch if int(msg_id) in self._logged}
+
+    def _remember_logged(self, msg_ids: List[str]):
+        if self._progress is None:
+            return
+        with self._retry_lock:
+            self._logged.update(int(m) for m in msg_ids)
+
+    def _finish(self, msg_ids: List[str]):
+        """Concluído: avança o checkpoint e não volta a ser buscado."""
+        self._mark_done(msg_ids)
+        if self._progress is None:
+            return
+        with self._retry_lock:
+            for msg_id in msg_ids:
+                uid = int(msg_id)
+                self._completed.add(uid)
+                self._logged.discard(uid)
+                self._attempts.pop(uid, None)
+
+    def _fail(self, msg_ids: List[str], stage: str):
+        """Conta a falha; na `max_attempts`-ésima o UID é dado como concluído para destravar o checkpoint."""
+        if self._progress is None or not msg_ids:
+            return
+        give_up = []
+        with self._retry_lock:
+            for msg_id in msg_ids:
+                uid = int(msg_id)
+                self._attempts[uid] = self._attempts.get(uid, 0) + 1
+                if self._attempts[uid] >= self.max_attempts:
+                    give_up.append(msg_id)
+        if give_up:
+            print(f"[ERROR] Desistindo de {give_up} após {self.max_attempts} falha(s) ao {stage}")
+            self._count("gave_up", len(give_up))
+            self._finish(give_up)
+
+    def _save_checkpoint(self, final: bool = False):
+        progress = self._progress
+        if progress is None:
+            return
+        last = progress.last_uid()
+        # HIGHESTMODSEQ só vale como "nada a fazer" se o ciclo terminou inteiro
+        modseq = self._state.highest_modseq if final and progress.complete() else None
+        if last == self._saved_last and not final:
+            return
         try:
-            tokens = self.tokenizer.tokenize(email.body or "")
-            result = self.classifier.classify(email, tokens=tokens)
+            self.checkpoints.save(MailboxCheckpoint(
+                mailbox_key=self.checkpoint_key,
+                uidvalidity=self._state.uidvalidity,
+                last_uid=last,
+                highest_modseq=modseq,
+            ))
+            self._saved_last = last
+        except Exception as e:
+            print(f"[ERROR] Falha ao salvar checkpoint de {self.checkpoint_key}: {e}")
+
+    # --- operações ---
+
+    def _classify_email(self, msg_id, email, timer: Optional[StageTimer] = None):
+        if email.triage:
+            # pré-triagem por cabeçalhos já decidiu: sem tokenização nem classificadores
+            print(f"[DEBUG] Pré-triagem por cabeçalhos: {email.triage.reason}")
+            return email.triage
+        try:
+            analysis = analyze_email(self.tokenizer, email, timer)
+            t0 = time.perf_counter()
+            if self._deferring:
+                rb = self.classifier.rule_based.classify(email, analysis.tokens, analysis=analysis)
+                if not self.classifier.should_escalate(rb):
+                    rb.extra = record_classify(timer, rb, (time.perf_counter() - t0) * 1000)
+                    return rb
+                self.backlog.defer(self._backlog_key, msg_id, email, rb)
+                return _DEFERRED
+            result = self.classifier.classify(email, tokens=analysis.tokens, analysis=analysis)
+            result.extra = record_classify(timer, result, (time.perf_counter() - t0) * 1000)
             print(f"[DEBUG] Classificação: {result.category}")
             return result
         except Exception as e:
             print(f"[ERROR] Falha ao classificar {msg_id}: {e}")
             return None
 
-    def _save_log(self, msg_id, log: ClassificationLog):
+    def _save_logs(self, batch: list) -> bool:
+        try:
+            self.repo.save_many([log for _, log, _ in batch])
+            self._count("persisted", len(batch))
+            print(f"[DEBUG] {len(batch)} log(s) salvos no repositório")
+            return True
+        except Exception as e:
+            print(f"[ERROR] Falha ao salvar logs no repositório: {e}")
+            return False
+
+    def _move_emails(self, msg_ids: List[str], folder: str) -> List[str]:
+        """Move e devolve os ids que de fato foram movidos."""
+        if not hasattr(self.email_source, "move_batch"):
+            return [msg_id for msg_id in msg_ids if self._move_email(msg_id, folder)]
         try:
-            self.repo.save(log)
-            print(f"[DEBUG] Log salvo no repositório para {msg_id}")
+            self.email_source.move_batch(msg_ids, folder)
+            print(f"[DEBUG] {len(msg_ids)} email(s) movidos com sucesso para {folder}")
+            return list(msg_ids)
         except Exception as e:
-            print(f"[ERROR] Falha ao salvar log no repositório: {e}")
+            print(f"[WARN] Falha ao mover {msg_ids} para {folder}: {e}")
+            return []
 
-    def _move_email(self, msg_id, folder: str):
+    def _move_email(self, msg_id, folder: str) -> bool:
         try:
             self.email_source.move_to_folder(msg_id, folder)
             print(f"[DEBUG] Email {msg_id} movido com sucesso para {folder}")
+            return True
         except Exception as e:
             print(f"[WARN] Falha ao mover {msg_id} para {folder}: {e}")
+            return False
@@ -1,30 +1,94 @@
+import json
+import os
+
 from app.application.use_cases.classify_email import FileFacade, ClassifyEmailUseCase
+from app.application.use_cases.classify_email_async import AsyncClassifyEmailUseCase
 from app.infrastructure.extractors.pdf_extractor import PdfExtractor
 from app.infrastructure.extractors.txt_extractor import TxtExtractor
 from app.infrastructure.extractors.eml_extractor import EmlExtractor
+from app.infrastructure.extractors.extraction_cache import ExtractionCache
+from app.infrastructure.classifiers.llm_cache import LlmResultCache
+from app.infrastructure.classifiers.batch_providers import LocalFileBatchProvider, OpenAIBatchProvider
+from app.application.llm_backlog import LlmBacklog
+from app.application.telemetry import PriceTable
 from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
 from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
 from app.infrastructure.classifiers.openai_llm import OpenAIClassifier
 from app.infrastructure.classifiers.smart_classifier import SmartClassifier
 from app.infrastructure.responders.simple_templates import SimpleResponder
 from app.infrastructure.repositories.sql_log_repository import SqlLogRepository
+from app.infrastructure.repositories.group_commit_log_repository import GroupCommitLogRepository
+from app.infrastructure.repositories.sql_checkpoint_repository import SqlCheckpointRepository
+from app.infrastructure.repositories.sql_batch_job_repository import SqlBatchJobRepository
 from app.infrastructure.profiles.profile_json import JsonProfileAdapter
-from app.infrastructure.db import init_db, get_session
+from app.infrastructure.db import init_db, new_session
+from app.infrastructure.email_sources.imap_registry import ImapRegistry
 
 from app.config import settings
 
 
+_log_repo = None
+_imap_registry = None
+_llm_cache = None
+
+
+def build_log_repository():
+    """Repositório de logs compartilhado pelo processo (group commit em segundo plano)"""
+    global _log_repo
+    if _log_repo is None:
+        init_db()
+        if settings.LOG_WRITER_ENABLED:
+            _log_repo = GroupCommitLogRepository(
+                lambda: SqlLogRepository(session_factory=new_session),
+                max_batch=settings.LOG_WRITER_MAX_BATCH,
+                flush_interval=settings.LOG_WRITER_FLUSH_MS / 1000,
+                max_queue=settings.LOG_WRITER_MAX_QUEUE,
+            )
+        else:
+            # uma sessão por operação: seguro entre threads de request e o worker IMAP
+            _log_repo = SqlLogRepository(session_factory=new_session)
+    return _log_repo
+
+
+def build_extraction_cache():
+    """Cache de texto extraído de uploads (None quando desligado)"""
+    if not settings.EXTRACT_CACHE_ENABLED:
+        return None
+    return ExtractionCache(
+        max_memory_bytes=settings.EXTRACT_CACHE_MEMORY_MB * 1024 * 1024,
+        disk_dir=settings.EXTRACT_CACHE_DIR or None,
+        max_disk_bytes=settings.EXTRACT_CACHE_DISK_MB * 1024 * 1024,
+    )
+
+
 def build_use_case():
     """Constrói o caso de uso para classificação via API HTTP"""
-    init_db()
-    session = next(get_session())
-
-    log_repo = SqlLogRepository(session=session)
+    log_repo = build_log_repository()
 
+    pdf = PdfExtractor(
+        max_pages=settings.PDF_MAX_PAGES,
+        max_bytes=settings.PDF_MAX_BYTES,
+        max_chars=settings.MAX_BODY_CHARS,
+        timeout_s=settings.PDF_TIMEOUT_S,
+        workers=settings.PDF_POOL_WORKERS,
+    )
+    txt = TxtExtractor()
     facade = FileFacade(
-        pdf_extractor=PdfExtractor(),
-        txt_extractor=TxtExtractor(),
-        eml_extractor=EmlExtractor(),
+        pdf_extractor=pdf,
+        txt_extractor=txt,
+        eml_extractor=EmlExtractor(
+            header_triage=settings.HEADER_TRIAGE_ENABLED,
+            html_converter=settings.EML_HTML_CONVERTER,
+            html_max_chars=settings.EML_HTML_MAX_CHARS,
+            # anexos PDF/TXT reaproveitam os mesmos extratores (e o pool de processos do PDF)
+            pdf_extractor=pdf,
+            txt_extractor=txt,
+            attachments=settings.EML_ATTACHMENTS_ENABLED,
+            max_attachments=settings.EML_MAX_ATTACHMENTS,
+            max_attachment_bytes=settings.EML_MAX_ATTACHMENT_BYTES,
+            attachments_timeout_s=settings.EML_ATTACHMENTS_TIMEOUT_S,
+        ),
+        cache=build_extraction_cache(),
     )
 
     tokenizer = SimpleTokenizer(lang="auto")
@@ -39,14 +103,52 @@ def build_use_case():
         responder=responder,
         profiles=profiles,
         log_repo=log_repo,
+        prices=build_price_table(),
+    )
+
+
+def build_async_use_case(use_case: ClassifyEmailUseCase | None = None):
+    """Envolve o caso de uso em executores limitados para o event loop da API"""
+    return AsyncClassifyEmailUseCase(
+        use_case or build_use_case(),
+        max_in_flight=settings.CLASSIFY_MAX_IN_FLIGHT,
+        max_queue=settings.CLASSIFY_MAX_QUEUE,
+        cpu_workers=settings.CLASSIFY_CPU_WORKERS,
     )
 
 
-def build_classifier():
-    """Retorna o classificador (rule-based + opcional LLM)"""
+def build_price_table():
+    """Preços por modelo para cost_usd dos logs (padrões + LLM_PRICES)"""
+    try:
+        raw = json.loads(settings.LLM_PRICES) if settings.LLM_PRICES.strip() else None
+        return PriceTable.from_json(raw, batch_factor=settings.LLM_BATCH_PRICE_FACTOR)
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        print(f"[WARN] LLM_PRICES inválido, usando os preços padrão: {e}")
+        return PriceTable(batch_factor=settings.LLM_BATCH_PRICE_FACTOR)
+
+
+def build_llm_cache():
+    """Cache de respostas do LLM compartilhado entre API e IMAP (None quando desligado)"""
+    global _llm_cache
+    if _llm_cache is None and settings.LLM_CACHE_ENABLED:
+        _llm_cache = LlmResultCache(
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            db_path=settings.LLM_CACHE_DB or None,
+            ttl_s=settings.LLM_CACHE_TTL_S,
+        )
+    return _llm_cache
+
+
+def build_classifier(batch: bool = False):
+    """Retorna o classificador (rule-based + opcional LLM; `batch` junta escalonamentos em micro-lotes)"""
     rule = RuleBasedClassifier()
     if getattr(settings, "USE_OPENAI", False):
-        llm = OpenAIClassifier()
+        llm = OpenAIClassifier(
+            cache=build_llm_cache(),
+            batch_max_items=settings.LLM_BATCH_MAX_ITEMS if batch else 1,
+            batch_max_wait_ms=settings.LLM_BATCH_MAX_WAIT_MS,
+            batch_retries=settings.LLM_BATCH_RETRIES,
+        )
         min_conf = getattr(settings, "RB_MIN_CONF", 0.70)
         return SmartClassifier(rule_based=rule, llm=llm, min_conf=min_conf)
     return rule
@@ -54,10 +156,56 @@ def build_classifier():
 
 def build_imap_deps():
     """Fornece classifier e log_repo para o serviço IMAP"""
-    init_db()
-    session = next(get_session())
-    log_repo = SqlLogRepository(session=session)
+    log_repo = build_log_repository()
 
-    classifier = build_classifier()
+    classifier = build_classifier(batch=settings.LLM_BATCH_ENABLED)
 
     return classifier, log_repo
+
+
+def build_llm_backlog(classifier):
+    """Modo backlog do sync IMAP (Batch API); None se desligado ou sem LLM"""
+    if not settings.LLM_BACKLOG_ENABLED or not hasattr(classifier, "should_escalate") or classifier.llm is None:
+        return None
+    init_db()
+    if settings.LLM_BACKLOG_PROVIDER == "local":
+        # sem rede: o job completa quando o output.jsonl aparecer na pasta dele
+        provider = LocalFileBatchProvider(os.path.join(settings.LLM_BACKLOG_DIR, "local"))
+    else:
+        provider = OpenAIBatchProvider(classifier.llm.pool, settings.OPENAI_API_KEY)
+    return LlmBacklog(
+        classifier,
+        provider,
+        SqlBatchJobRepository(session_factory=new_session),
+        work_dir=settings.LLM_BACKLOG_DIR,
+        min_messages=settings.LLM_BACKLOG_MIN_MESSAGES,
+        max_items_per_job=settings.LLM_BACKLOG_MAX_ITEMS,
+        poll_interval_s=settings.LLM_BACKLOG_POLL_S,
+    )
+
+
+def sync_classify_workers() -> int:
+    """Workers de classificação do sync; com micro-lotes, ao menos um por item do lote (esperam I/O)"""
+    if settings.USE_OPENAI and settings.LLM_BATCH_ENABLED:
+        return max(settings.SYNC_CLASSIFY_WORKERS, settings.LLM_BATCH_MAX_ITEMS)
+    return settings.SYNC_CLASSIFY_WORKERS
+
+
+def build_checkpoint_repository():
+    """Checkpoints da sincronização incremental IMAP (None se desativada)"""
+    if not settings.IMAP_INCREMENTAL:
+        return None
+    init_db()
+    return SqlCheckpointRepository(session_factory=new_session)
+
+
+def build_imap_registry():
+    """Registro de caixas IMAP compartilhado pelo processo"""
+    global _imap_registry
+    if _imap_registry is None:
+        _imap_registry = ImapRegistry(
+            max_workers=settings.IMAP_MAX_WORKERS,
+            max_connections_per_account=settings.IMAP_MAX_CONN_PER_ACCOUNT,
+            classify_workers=sync_classify_workers(),
+        )
+    return _imap_registry
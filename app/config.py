@@ -21,4 +21,93 @@ class Settings(BaseModel):
     RB_MIN_CONF: float = float(os.getenv("RB_MIN_CONF", "0.70"))
     MAX_BODY_CHARS: int = int(os.getenv("MAX_BODY_CHARS", "8000"))
 
+    # execução assíncrona do /classify (limites de concorrência e fila)
+    CLASSIFY_MAX_IN_FLIGHT: int = int(os.getenv("CLASSIFY_MAX_IN_FLIGHT", "8"))
+    CLASSIFY_MAX_QUEUE: int = int(os.getenv("CLASSIFY_MAX_QUEUE", "32"))
+    CLASSIFY_CPU_WORKERS: int = int(os.getenv("CLASSIFY_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # POST /classify/batch: limite em itens por cliente e tamanho máximo do lote
+    CLASSIFY_BATCH_LIMIT: str = os.getenv("CLASSIFY_BATCH_LIMIT", "1000/minute")
+    CLASSIFY_BATCH_MAX_ITEMS: int = int(os.getenv("CLASSIFY_BATCH_MAX_ITEMS", "500"))
+
+    # gravação de logs em segundo plano (group commit)
+    LOG_WRITER_ENABLED: bool = os.getenv("LOG_WRITER_ENABLED", "true").strip().lower() == "true"
+    LOG_WRITER_MAX_BATCH: int = int(os.getenv("LOG_WRITER_MAX_BATCH", "100"))
+    LOG_WRITER_FLUSH_MS: int = int(os.getenv("LOG_WRITER_FLUSH_MS", "200"))
+    LOG_WRITER_MAX_QUEUE: int = int(os.getenv("LOG_WRITER_MAX_QUEUE", "10000"))
+
+    # IMAP: UIDs por FETCH em lote e limite de bytes baixados do corpo de cada mensagem
+    IMAP_FETCH_BATCH: int = int(os.getenv("IMAP_FETCH_BATCH", "100"))
+    IMAP_BODY_BYTE_CAP: int = int(os.getenv("IMAP_BODY_BYTE_CAP", str(64 * 1024)))
+
+    # IMAP IDLE (push): reemitido antes do timeout de ~29 min do servidor
+    IMAP_IDLE_ENABLED: bool = os.getenv("IMAP_IDLE_ENABLED", "true").strip().lower() == "true"
+    IMAP_IDLE_REFRESH_S: int = int(os.getenv("IMAP_IDLE_REFRESH_S", str(25 * 60)))
+
+    # várias caixas IMAP: pool compartilhado de sincronização e limite de conexões por conta
+    IMAP_MAX_WORKERS: int = int(os.getenv("IMAP_MAX_WORKERS", "8"))
+    IMAP_MAX_CONN_PER_ACCOUNT: int = int(os.getenv("IMAP_MAX_CONN_PER_ACCOUNT", "10"))
+
+    # pipeline da sincronização IMAP: workers do estágio de classificação e tamanho das filas
+    SYNC_CLASSIFY_WORKERS: int = int(os.getenv("SYNC_CLASSIFY_WORKERS", "4"))
+    SYNC_QUEUE_SIZE: int = int(os.getenv("SYNC_QUEUE_SIZE", "32"))
+    # falhas por UID (classificar, gravar ou mover) antes de desistir e liberar o checkpoint
+    SYNC_MAX_ATTEMPTS: int = int(os.getenv("SYNC_MAX_ATTEMPTS", "3"))
+
+    # sincronização IMAP incremental por checkpoint (UIDVALIDITY + último UID) em vez de só UNSEEN
+    IMAP_INCREMENTAL: bool = os.getenv("IMAP_INCREMENTAL", "true").strip().lower() == "true"
+
+    # pré-triagem por cabeçalhos (List-*, Precedence, Auto-Submitted, ESPs): improdutivo sem ler o corpo
+    HEADER_TRIAGE_ENABLED: bool = os.getenv("HEADER_TRIAGE_ENABLED", "true").strip().lower() == "true"
+
+    # extração de PDF em pool de processos: workers (0 = no próprio processo), páginas, bytes e tempo por documento
+    PDF_POOL_WORKERS: int = int(os.getenv("PDF_POOL_WORKERS", "2"))
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", "50"))
+    PDF_MAX_BYTES: int = int(os.getenv("PDF_MAX_BYTES", str(20 * 1024 * 1024)))
+    PDF_TIMEOUT_S: float = float(os.getenv("PDF_TIMEOUT_S", "15"))
+
+    # .eml: conversor HTML → texto ("fast" em uma passada, ou "bs4") e limite de caracteres por parte HTML
+    EML_HTML_CONVERTER: str = os.getenv("EML_HTML_CONVERTER", "fast")
+    EML_HTML_MAX_CHARS: int = int(os.getenv("EML_HTML_MAX_CHARS", os.getenv("MAX_BODY_CHARS", "8000")))
+
+    # cache de extração de uploads (sha256 + versão do extrator): LRU em memória + diretório opcional
+    EXTRACT_CACHE_ENABLED: bool = os.getenv("EXTRACT_CACHE_ENABLED", "true").strip().lower() == "true"
+    EXTRACT_CACHE_MEMORY_MB: int = int(os.getenv("EXTRACT_CACHE_MEMORY_MB", "64"))
+    EXTRACT_CACHE_DIR: str = os.getenv("EXTRACT_CACHE_DIR", "")  # vazio = só memória
+    EXTRACT_CACHE_DISK_MB: int = int(os.getenv("EXTRACT_CACHE_DISK_MB", "512"))
+
+    # uploads do /classify: tamanho máximo (checado durante a leitura) e quanto fica em memória antes do disco
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+    UPLOAD_SPOOL_BYTES: int = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+    # .eml: extração de anexos PDF/TXT em paralelo, com limites por e-mail (quantidade, bytes somados, tempo)
+    EML_ATTACHMENTS_ENABLED: bool = os.getenv("EML_ATTACHMENTS_ENABLED", "false").strip().lower() == "true"
+    EML_MAX_ATTACHMENTS: int = int(os.getenv("EML_MAX_ATTACHMENTS", "5"))
+    EML_MAX_ATTACHMENT_BYTES: int = int(os.getenv("EML_MAX_ATTACHMENT_BYTES", str(10 * 1024 * 1024)))
+    EML_ATTACHMENTS_TIMEOUT_S: float = float(os.getenv("EML_ATTACHMENTS_TIMEOUT_S", "20"))
+
+    # cache de respostas do LLM (entrada normalizada do prompt): LRU em memória + SQLite com TTL
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").strip().lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "4096"))
+    LLM_CACHE_DB: str = os.getenv("LLM_CACHE_DB", "llm_cache.db")  # vazio = só memória
+    LLM_CACHE_TTL_S: int = int(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+    # micro-lotes no sync IMAP: até N e-mails escalados num único request ao LLM (ou após T ms)
+    LLM_BATCH_ENABLED: bool = os.getenv("LLM_BATCH_ENABLED", "false").strip().lower() == "true"
+    LLM_BATCH_MAX_ITEMS: int = int(os.getenv("LLM_BATCH_MAX_ITEMS", "8"))
+    LLM_BATCH_MAX_WAIT_MS: int = int(os.getenv("LLM_BATCH_MAX_WAIT_MS", "200"))
+    LLM_BATCH_RETRIES: int = int(os.getenv("LLM_BATCH_RETRIES", "1"))
+
+    # backlog offline no sync IMAP: ciclos com >= N mensagens mandam os escalados para a Batch API
+    LLM_BACKLOG_ENABLED: bool = os.getenv("LLM_BACKLOG_ENABLED", "false").strip().lower() == "true"
+    LLM_BACKLOG_PROVIDER: str = os.getenv("LLM_BACKLOG_PROVIDER", "openai")  # openai | local
+    LLM_BACKLOG_MIN_MESSAGES: int = int(os.getenv("LLM_BACKLOG_MIN_MESSAGES", "500"))
+    LLM_BACKLOG_MAX_ITEMS: int = int(os.getenv("LLM_BACKLOG_MAX_ITEMS", "5000"))  # e-mails por job
+    LLM_BACKLOG_POLL_S: int = int(os.getenv("LLM_BACKLOG_POLL_S", "300"))
+    LLM_BACKLOG_DIR: str = os.getenv("LLM_BACKLOG_DIR", "llm_batches")
+
+    # custo nos logs: USD por 1M tokens, JSON {"modelo": {"input": x, "output": y}} somado aos padrões
+    LLM_PRICES: str = os.getenv("LLM_PRICES", "")
+    LLM_BATCH_PRICE_FACTOR: float = float(os.getenv("LLM_BATCH_PRICE_FACTOR", "0.5"))  # desconto da Batch API
+
 settings = Settings()
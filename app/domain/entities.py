@@ -1,17 +1,42 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime 
-from typing import Optional, Dict , Any
+from typing import Optional, Dict , Any, List
 
 class Category(str, Enum):
     PRODUCTIVE = "productive"
     UNPRODUCTIVE = "unproductive"
 
+@dataclass
+class AttachmentText:
+    """Texto extraído de um anexo (PDF/TXT) de um e-mail, separado do corpo."""
+    filename: Optional[str]
+    content_type: str
+    text: str = ""
+    error: Optional[str] = None  # motivo quando não foi extraído (limite, tempo, erro)
+
+@dataclass
+class ExtractedDocument:
+    """Saída de extração de um upload: texto principal + anexos (só .eml)."""
+    text: str
+    attachments: List[AttachmentText] = field(default_factory=list)
+
 @dataclass
 class Email:
     subject: Optional[str]
     body: str
     sender: Optional[str] = None
+    # resultado da pré-triagem por cabeçalhos (corpo não foi baixado/parseado)
+    triage: Optional["ClassificationResult"] = None
+    attachments: Optional[List[AttachmentText]] = None
+
+@dataclass
+class EmailAnalysis:
+    """Contexto de análise de um e-mail: idioma detectado uma única vez + tokens."""
+    lang: str
+    tokens: List[str]
+    # tokens do texto dos anexos, mantidos à parte para os classificadores ponderarem
+    attachment_tokens: List[str] = field(default_factory=list)
     
 @dataclass
 class ClassificationResult:
@@ -52,6 +77,45 @@ class ClassificationLog:
 
     extra: Optional[Dict[str, Any]] = None
     
+@dataclass
+class MailboxState:
+    """Estado da caixa no SELECT (para sincronização incremental)."""
+    uidvalidity: int
+    uidnext: int
+    highest_modseq: Optional[int] = None
+
+
+@dataclass
+class MailboxCheckpoint:
+    """Até onde a caixa já foi processada: UIDs <= last_uid estão feitos nesta UIDVALIDITY."""
+    mailbox_key: str
+    uidvalidity: int
+    last_uid: int
+    highest_modseq: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+
+@dataclass
+class LlmBatchJob:
+    """
+    Lote offline (Batch API) de e-mails escalados de uma caixa.
+    `items`: um por e-mail (custom_id, msg_id, metadados do log, resultado rule-based, contexto do prompt).
+    status: submitted → completed | failed (no provedor) → applied (logs gravados e e-mails movidos)
+    """
+    id: str
+    mailbox_key: str
+    provider: str
+    provider_job_id: str
+    status: str = "submitted"
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    uidvalidity: Optional[int] = None
+    input_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    applied_at: Optional[datetime] = None
+
+
 @dataclass
 class User:
     id: Optional[int]
@@ -1,2 +1,4 @@
 class UnsupportedFileType(Exception): ...
 class BadRequest(Exception): ...
+class PayloadTooLarge(BadRequest): ...
+class Overloaded(Exception): ...
@@ -1,12 +1,29 @@
-from typing import Protocol, List, Optional, Dict
-from .entities import Email, ClassificationResult
+from typing import Protocol, List, Optional, Dict, FrozenSet, Set, Iterable, Tuple, BinaryIO, ContextManager, Union
+from .entities import Email, ClassificationResult, EmailAnalysis, MailboxCheckpoint, LlmBatchJob
+
+class BinarySourcePort(Protocol):
+    """Arquivo enviado já recebido (memória ou temporário em disco), lido sem cópia inteira."""
+    size: int
+    path: Optional[str]
+    head: bytes
+    sha256: str
+
+    def open(self) -> BinaryIO: ...
+    def view(self) -> ContextManager[memoryview]: ...
 
 class TextExtractorPort(Protocol):
-    def extract(self, raw_bytes: bytes) -> str: ...
+    def extract(self, source: Union[bytes, BinarySourcePort]) -> str: ...
 
 class TokenizerPort(Protocol):
     def preprocess(self, text: str) -> str: ...
-    def tokenize(self, text: str) -> List[str]: ...
+    def detect_lang(self, text: str) -> str: ...
+    def tokenize(self, text: str, lang: Optional[str] = None) -> List[str]: ...
+
+class KeywordIndexPort(Protocol):
+    """Índice compilado de keywords+sinônimos de um perfil."""
+    terms: FrozenSet[str]
+
+    def match(self, text: str) -> Set[str]: ...
 
 class ClassifierPort(Protocol):
     def classify(
@@ -14,7 +31,20 @@ class ClassifierPort(Protocol):
         email: Email,
         tokens: List[str],
         mood: Optional[str] = None,
-        priority: Optional[list[str]] = None
+        priority: Optional[KeywordIndexPort] = None,
+        analysis: Optional[EmailAnalysis] = None,
+    ) -> ClassificationResult: ...
+
+class LlmClassifierPort(Protocol):
+    """Classificador de escalonamento: reaproveita o resultado rule-based já calculado."""
+    def classify(
+        self,
+        email: Email,
+        tokens: List[str],
+        mood: Optional[str] = None,
+        priority: Optional[KeywordIndexPort] = None,
+        analysis: Optional[EmailAnalysis] = None,
+        rule_result: Optional[ClassificationResult] = None,
     ) -> ClassificationResult: ...
 
 class ReplySuggesterPort(Protocol):
@@ -23,6 +53,9 @@ class ReplySuggesterPort(Protocol):
 class ProfilePort(Protocol):
     def get_profile(self, profile_id: str) -> Optional[Dict]:
         ...
+
+    def get_keyword_index(self, profile_id: str) -> Optional[KeywordIndexPort]:
+        ...
         
 from .entities import ClassificationLog
 
@@ -33,6 +66,10 @@ class LogRepositoryPort(Protocol):
         """Salva um log de classificação no repositório."""
         ...
 
+    def save_many(self, logs: List[ClassificationLog]) -> List[ClassificationLog]:
+        """Salva vários logs numa única transação."""
+        ...
+
     def list_recent(self, limit: int = 50) -> List[ClassificationLog]:
         """Retorna os últimos logs de classificação."""
         ...
@@ -41,10 +78,56 @@ class LogRepositoryPort(Protocol):
         """Busca um log específico pelo id."""
         ...
 class EmailSourcePort(Protocol):
-    def fetch_unread(self) -> list[Email]:
-        """Busca emails não lidos da fonte (IMAP, Gmail API etc)."""
+    def fetch_unread(self) -> Iterable[Tuple[str, Email]]:
+        """Busca emails não lidos da fonte (IMAP, Gmail API etc) como (id, Email), em stream."""
         ...
 
     def mark_as_read(self, ids: list[str]) -> None:
         """Marca como lidos (ou move para pasta) depois de processar."""
-        ...
\ No newline at end of file
+        ...
+
+    def move_to_folder(self, msg_id: str, folder: str) -> None:
+        """Move uma mensagem para a pasta (criando-a se preciso)."""
+        ...
+
+    def move_batch(self, msg_ids: list[str], folder: str) -> None:
+        """Move várias mensagens para a mesma pasta de uma vez."""
+        ...
+
+
+class CheckpointRepositoryPort(Protocol):
+    """Porta para os checkpoints de sincronização incremental por caixa."""
+
+    def get(self, mailbox_key: str) -> Optional[MailboxCheckpoint]:
+        ...
+
+    def save(self, checkpoint: MailboxCheckpoint) -> MailboxCheckpoint:
+        ...
+
+
+class BatchJobRepositoryPort(Protocol):
+    """Porta para o estado dos lotes offline do LLM."""
+
+    def save(self, job: LlmBatchJob) -> LlmBatchJob:
+        ...
+
+    def list_open(self, mailbox_key: str) -> List[LlmBatchJob]:
+        """Lotes da caixa ainda não aplicados (mais antigos primeiro)."""
+        ...
+
+
+class BatchProviderPort(Protocol):
+    """Provedor de processamento em lote (arquivo JSONL de requests → arquivo JSONL de respostas)."""
+    name: str
+
+    def submit(self, jsonl_path: str) -> str:
+        """Envia o arquivo; devolve o id do job no provedor."""
+        ...
+
+    def status(self, job_id: str) -> str:
+        """'in_progress' | 'completed' | 'failed'"""
+        ...
+
+    def results(self, job_id: str) -> Iterable[Dict]:
+        """Linhas de saída: {"custom_id", "response": {"status_code", "body"}, "error"}."""
+        ...
@@ -0,0 +1,143 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, Dict, Iterator, Optional
+
+from app.infrastructure.classifiers.http_pool import HttpConnectionPool
+
+# status do provedor → status normalizado do port
+_OPENAI_STATUS = {
+    "completed": "completed",
+    "failed": "failed",
+    "expired": "failed",
+    "cancelled": "failed",
+}
+
+
+def _read_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class LocalFileBatchProvider:
+    """
+    Substituto local (sem rede) da Batch API, baseado em arquivos:
+    <work_dir>/<job_id>/input.jsonl → output.jsonl.
+    - com `handler(corpo_do_request) -> corpo_da_resposta`, o job completa no primeiro
+      `status()` após `complete_after_s` (exceção do handler vira linha de erro)
+    - sem handler, completa quando alguém deixar o output.jsonl na pasta do job
+    """
+    name = "local"
+
+    def __init__(
+        self,
+        work_dir: str,
+        handler: Optional[Callable[[dict], dict]] = None,
+        complete_after_s: float = 0.0,
+    ):
+        self.work_dir = work_dir
+        self.handler = handler
+        self.complete_after_s = complete_after_s
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.work_dir, job_id)
+
+    def submit(self, jsonl_path: str) -> str:
+        job_id = f"local-{uuid.uuid4().hex[:12]}"
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+        shutil.copyfile(jsonl_path, os.path.join(job_dir, "input.jsonl"))
+        with open(os.path.join(job_dir, "state.json"), "w", encoding="utf-8") as f:
+            json.dump({"submitted_at": time.time()}, f)
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        job_dir = self._job_dir(job_id)
+        if not os.path.isdir(job_dir):
+            return "failed"
+        output = os.path.join(job_dir, "output.jsonl")
+        if os.path.exists(output):
+            return "completed"
+        if self.handler is None:
+            return "in_progress"
+        with open(os.path.join(job_dir, "state.json"), encoding="utf-8") as f:
+            submitted_at = json.load(f)["submitted_at"]
+        if time.time() - submitted_at < self.complete_after_s:
+            return "in_progress"
+        self._process(job_dir)
+        return "completed"
+
+    def _process(self, job_dir: str):
+        tmp = os.path.join(job_dir, "output.jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as out:
+            for req in _read_jsonl(os.path.join(job_dir, "input.jsonl")):
+                try:
+                    response = {"status_code": 200, "body": self.handler(req["body"])}
+                    line = {"custom_id": req["custom_id"], "response": response, "error": None}
+                except Exception as e:
+                    line = {"custom_id": req["custom_id"], "response": None, "error": {"message": str(e)}}
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+        os.replace(tmp, os.path.join(job_dir, "output.jsonl"))  # output aparece inteiro ou não aparece
+
+    def results(self, job_id: str) -> Iterator[Dict]:
+        return _read_jsonl(os.path.join(self._job_dir(job_id), "output.jsonl"))
+
+
+class OpenAIBatchProvider:
+    """Batch API da OpenAI: upload do JSONL (purpose=batch) → /v1/batches → arquivo de saída."""
+    name = "openai"
+
+    def __init__(self, pool: HttpConnectionPool, api_key: str, completion_window: str = "24h"):
+        self.pool = pool
+        self.api_key = api_key
+        self.completion_window = completion_window
+
+    def _call(self, method: str, path: str, body=None, content_type: Optional[str] = "application/json") -> bytes:
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        if content_type:
+            headers["Content-Type"] = content_type
+        status, data = self.pool.request(method, path, body, headers)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path}: HTTP {status}: {data[:200]!r}")
+        return data
+
+    def submit(self, jsonl_path: str) -> str:
+        boundary = uuid.uuid4().hex
+        with open(jsonl_path, "rb") as f:
+            content = f.read()
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"purpose\"\r\n\r\nbatch\r\n"
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{os.path.basename(jsonl_path)}\"\r\n"
+            f"Content-Type: application/jsonl\r\n\r\n"
+        ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        file_id = json.loads(self._call("POST", "/v1/files", body, f"multipart/form-data; boundary={boundary}"))["id"]
+        batch = json.loads(self._call("POST", "/v1/batches", json.dumps({
+            "input_file_id": file_id,
+            "endpoint": "/v1/chat/completions",
+            "completion_window": self.completion_window,
+        })))
+        return batch["id"]
+
+    def _batch(self, job_id: str) -> dict:
+        return json.loads(self._call("GET", f"/v1/batches/{job_id}", content_type=None))
+
+    def status(self, job_id: str) -> str:
+        return _OPENAI_STATUS.get(self._batch(job_id).get("status"), "in_progress")
+
+    def results(self, job_id: str) -> Iterator[Dict]:
+        batch = self._batch(job_id)
+        # itens com erro vão para um arquivo à parte; os dois compõem a saída
+        for key in ("output_file_id", "error_file_id"):
+            file_id = batch.get(key)
+            if not file_id:
+                continue
+            data = self._call("GET", f"/v1/files/{file_id}/content", content_type=None)
+            for line in data.decode("utf-8").splitlines():
+                if line.strip():
+                    yield json.loads(line)
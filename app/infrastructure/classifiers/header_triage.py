@@ -0,0 +1,103 @@
+"""
+Pré-triagem só por cabeçalhos: decide envios em massa/automáticos sem baixar nem parsear o corpo.
+Conservadora: só devolve resultado quando os sinais somam peso suficiente; caso contrário
+o e-mail segue o fluxo normal (tokenização + classificadores).
+"""
+from typing import List, Mapping, Optional, Tuple
+
+from app.domain.entities import Category, ClassificationResult
+
+# peso mínimo para considerar os cabeçalhos conclusivos
+CONCLUSIVE_SCORE = 2
+
+_BULK_PRECEDENCE = {"bulk", "list", "junk"}
+
+# prefixos de cabeçalhos próprios de plataformas de envio em massa (ESPs)
+_ESP_PREFIXES = (
+    "x-mailgun-",       # Mailgun
+    "x-sg-",            # SendGrid (X-SG-EID, X-SG-ID)
+    "x-mc-user",        # Mailchimp/Mandrill
+    "x-mandrill-",
+    "x-mailchimp-",
+    "x-campaign",       # X-Campaign, X-CampaignID
+    "x-ses-outgoing",   # Amazon SES
+    "x-sfmc-",          # Salesforce Marketing Cloud
+    "x-mktg-",
+    "x-rpcampaign",
+    "x-csa-complaints", # remetentes certificados (CSA)
+)
+
+_ESP_MAILERS = ("mailchimp", "sendgrid", "mailgun", "sendinblue", "brevo", "hubspot", "mailjet", "rdstation")
+
+
+def _header_names(headers) -> List[str]:
+    return [str(k).lower() for k in headers.keys()]
+
+
+def _get(headers, name: str) -> str:
+    # Message (email.message) e dict comum: busca sem diferenciar maiúsculas
+    value = headers.get(name)
+    if value is None and isinstance(headers, Mapping):
+        value = next((v for k, v in headers.items() if str(k).lower() == name.lower()), None)
+    return str(value).strip() if value is not None else ""
+
+
+def header_signals(headers) -> List[Tuple[str, int]]:
+    """Sinais de envio em massa/automático encontrados nos cabeçalhos, com peso."""
+    signals: List[Tuple[str, int]] = []
+
+    auto = _get(headers, "Auto-Submitted").lower()
+    if auto and auto != "no":
+        signals.append((f"auto-submitted:{auto.split(';')[0]}", 2))  # RFC 3834
+
+    precedence = _get(headers, "Precedence").lower()
+    if precedence in _BULK_PRECEDENCE:
+        signals.append((f"precedence:{precedence}", 2))
+
+    if _get(headers, "List-Unsubscribe"):
+        signals.append(("list-unsubscribe", 1))
+        if "one-click" in _get(headers, "List-Unsubscribe-Post").lower():
+            signals.append(("list-unsubscribe-post", 1))  # RFC 8058: exigido de remetentes em massa
+
+    if _get(headers, "List-Id"):
+        signals.append(("list-id", 1))
+
+    if _get(headers, "X-Auto-Response-Suppress") or _get(headers, "X-Autoreply") or _get(headers, "X-Autorespond"):
+        signals.append(("auto-reply", 2))
+
+    names = _header_names(headers)
+    esp = sorted({n for n in names for p in _ESP_PREFIXES if n.startswith(p)})
+    mailer = _get(headers, "X-Mailer").lower()
+    if any(m in mailer for m in _ESP_MAILERS):
+        esp.append("x-mailer")
+    if esp:
+        signals.append(("esp:" + ",".join(esp), 1))
+    if "feedback-id" in names:
+        signals.append(("feedback-id", 1))
+
+    return signals
+
+
+def triage_headers(headers) -> Optional[ClassificationResult]:
+    """
+    Classifica como improdutivo quando os cabeçalhos são conclusivos; None quando não são.
+    `headers` pode ser um email.message.Message (ex.: BytesHeaderParser) ou um dict.
+    """
+    if headers is None:
+        return None
+    signals = header_signals(headers)
+    score = sum(w for _, w in signals)
+    if score < CONCLUSIVE_SCORE:
+        return None
+
+    hits = [name for name, _ in signals]
+    return ClassificationResult(
+        category=Category.UNPRODUCTIVE,
+        reason=f"Envio em massa/automático pelos cabeçalhos ({', '.join(hits)})",
+        suggested_reply="",  # não responder envios automáticos
+        used_model="header-triage",
+        extra={
+            "pre_triage": {"signals": hits, "score": score},
+            "confidence": min(0.99, 0.8 + 0.05 * score),
+        },
+    )
@@ -0,0 +1,166 @@
+import http.client
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# erros que indicam conexão keep-alive derrubada pelo servidor → refaz com conexão nova
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class HttpConnectionPool:
+    """
+    Pool thread-safe de conexões HTTP(S) keep-alive para um único host.
+    - reaproveita conexões ociosas (até `max_idle`)
+    - timeouts separados de conexão e leitura
+    - semáforo limita requisições simultâneas ao provedor
+    - stats() expõe reuso e tempo de espera para monitoramento
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_idle: int = 8,
+        max_concurrency: int = 8,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+    ):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"URL base inválida: {base_url}")
+        self.base_url = base_url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.max_idle = max_idle
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats = {
+            "requests": 0,
+            "errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "in_flight": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+        }
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.connect_timeout)
+        conn.connect()
+        conn.sock.settimeout(self.read_timeout)
+        with self._lock:
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _acquire_connection(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                self._stats["connections_reused"] += 1
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def _release_connection(self, conn: http.client.HTTPConnection):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, conn, method: str, path: str, body, headers) -> Tuple[int, bytes, bool]:
+        conn.request(method, self.prefix + path, body=body, headers=headers)
+        res = conn.getresponse()
+        data = res.read()
+        return res.status, data, res.will_close
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[str | bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, bytes]:
+        t0 = time.perf_counter()
+        self._slots.acquire()
+        waited_ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["wait_ms_total"] += waited_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], waited_ms)
+
+        try:
+            conn, reused = self._acquire_connection()
+            try:
+                status, data, will_close = self._send(conn, method, path, body, headers or {})
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # conexão ociosa expirou no servidor: uma nova tentativa com conexão nova
+                conn = self._new_connection()
+                status, data, will_close = self._send(conn, method, path, body, headers or {})
+            except Exception:
+                conn.close()
+                raise
+
+            if will_close:
+                conn.close()
+            else:
+                self._release_connection(conn)
+            return status, data
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats["in_flight"] -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            out["idle"] = len(self._idle)
+        reqs = out["requests"] or 1
+        out["wait_ms_avg"] = round(out["wait_ms_total"] / reqs, 3)
+        out["base_url"] = self.base_url
+        return out
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_pools: Dict[str, HttpConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_shared_pool(base_url: str, **kwargs) -> HttpConnectionPool:
+    """Um pool por URL base, compartilhado por todas as instâncias do processo."""
+    with _pools_lock:
+        pool = _pools.get(base_url)
+        if pool is None:
+            pool = _pools[base_url] = HttpConnectionPool(base_url, **kwargs)
+        return pool
+
+
+def shared_pools_stats() -> Dict[str, dict]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {p.base_url: p.stats() for p in pools}
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class _Batch:
+    __slots__ = ("deadline", "items", "futures", "closed")
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.items: List[Any] = []
+        self.futures: List[Future] = []
+        self.closed = False
+
+
+class MicroBatcher:
+    """
+    Junta chamadas concorrentes (threads) em lotes por chave: fecha com `max_items` itens
+    ou `max_wait_s` após o primeiro. Sem thread própria: quem abre o lote espera e executa
+    `flush(key, items) -> resultados (mesma ordem)`; as demais só aguardam o seu item.
+    """
+
+    def __init__(self, flush: Callable[[Hashable, List[Any]], List[Any]], max_items: int = 8, max_wait_s: float = 0.2):
+        self.flush = flush
+        self.max_items = max(1, max_items)
+        self.max_wait_s = max_wait_s
+        self._cond = threading.Condition()
+        self._open: Dict[Hashable, _Batch] = {}
+        self._counters = {"batches": 0, "items": 0, "full": 0, "errors": 0}
+
+    def submit(self, key: Hashable, item: Any) -> Any:
+        """Bloqueia até o lote do item ser enviado; devolve o resultado dele (ou levanta o erro do flush)."""
+        fut: Future = Future()
+        with self._cond:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch(time.monotonic() + self.max_wait_s)
+            batch.items.append(item)
+            batch.futures.append(fut)
+            if len(batch.items) >= self.max_items:
+                self._counters["full"] += 1
+                self._close(key, batch)
+            while leader and not batch.closed:
+                remaining = batch.deadline - time.monotonic()
+                if remaining <= 0:
+                    self._close(key, batch)
+                    break
+                self._cond.wait(remaining)
+        if leader:
+            self._run(key, batch)
+        return fut.result()
+
+    def _close(self, key: Hashable, batch: _Batch):
+        batch.closed = True
+        if self._open.get(key) is batch:
+            del self._open[key]
+        self._cond.notify_all()
+
+    def _run(self, key: Hashable, batch: _Batch):
+        with self._cond:
+            self._counters["batches"] += 1
+            self._counters["items"] += len(batch.items)
+        try:
+            results = list(self.flush(key, batch.items))
+            if len(results) != len(batch.items):
+                raise ValueError(f"lote com {len(batch.items)} itens devolveu {len(results)} resultados")
+        except BaseException as e:
+            with self._cond:
+                self._counters["errors"] += 1
+            for fut in batch.futures:
+                fut.set_exception(e)
+            return
+        for fut, result in zip(batch.futures, results):
+            fut.set_result(result)
+
+    def stats(self) -> dict:
+        with self._cond:
+            c = dict(self._counters)
+            c["avg_batch_size"] = round(c["items"] / c["batches"], 2) if c["batches"] else None
+            c["open_batches"] = len(self._open)
+            return c
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+_WS = re.compile(r"\s+")
+
+
+def _norm(text: Optional[str]) -> str:
+    return _WS.sub(" ", text or "").strip()
+
+
+class LlmResultCache:
+    """
+    Cache de respostas do LLM, chaveado pelo conteúdo normalizado do prompt
+    (corpo sem assinatura, assunto, idioma, prioridades, tom, modelo...).
+    - memória: LRU com `max_entries`
+    - SQLite (opcional): sobrevive a reinícios; entradas expiram após `ttl_s`
+    """
+
+    def __init__(self, max_entries: int = 4096, db_path: Optional[str] = None, ttl_s: float = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._mem: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits_memory": 0, "hits_db": 0, "misses": 0, "stores": 0, "tokens_saved": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            # uma conexão compartilhada, serializada pelo lock (acessos curtos)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_expires ON llm_cache(expires_at)")
+            self._db.commit()
+
+    @staticmethod
+    def key(body: str, subject: Optional[str], lang: str, priority: list, mood: Optional[str], model: str,
+            **extra_inputs) -> str:
+        parts = {
+            "body": _norm(body),
+            "subject": _norm(subject),
+            "lang": (lang or "").lower(),
+            "priority": sorted(priority or []),
+            "mood": _norm(mood).lower(),
+            "model": model,
+            **{k: _norm(v) if isinstance(v, str) else v for k, v in extra_inputs.items()},
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """(valor, camada) ou None."""
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > now:
+                    self._mem.move_to_end(key)
+                    self._hit("hits_memory", value)
+                    return value, "memory"
+                del self._mem[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    value = json.loads(row[0])
+                    self._mem_put(key, value, row[1])
+                    self._hit("hits_db", value)
+                    return value, "sqlite"
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        expires_at = time.time() + self.ttl_s
+        with self._lock:
+            self._mem_put(key, value, expires_at)
+            self._counters["stores"] += 1
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value, ensure_ascii=False), expires_at),
+                    )
+                    # limpeza oportunista das expiradas (índice em expires_at)
+                    if self._counters["stores"] % 100 == 0:
+                        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"[WARN] Cache do LLM: falha ao gravar no SQLite: {e}")
+
+    def _mem_put(self, key: str, value: Dict[str, Any], expires_at: float):
+        self._mem[key] = (expires_at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _hit(self, counter: str, value: Dict[str, Any]):
+        self._counters[counter] += 1
+        self._counters["tokens_saved"] += int((value.get("usage") or {}).get("total_tokens") or 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = dict(self._counters)
+            lookups = c["hits_memory"] + c["hits_db"] + c["misses"]
+            return {
+                **c,
+                "hit_rate": round((c["hits_memory"] + c["hits_db"]) / lookups, 3) if lookups else None,
+                "memory_entries": len(self._mem),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
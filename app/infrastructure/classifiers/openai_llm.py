@@ -1,13 +1,19 @@
 import os
 import json
 import re
-import http.client
-from typing import List, Optional
+import weakref
+from typing import Dict, List, Optional, Tuple
 
-from app.domain.entities import Email, ClassificationResult, Category
-from app.domain.ports import ClassifierPort
+from app.domain.entities import Email, ClassificationResult, Category, EmailAnalysis
+from app.domain.ports import ClassifierPort, KeywordIndexPort
 from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.classifiers.http_pool import HttpConnectionPool, get_shared_pool
+from app.infrastructure.classifiers.llm_cache import LlmResultCache
+from app.infrastructure.classifiers.llm_batcher import MicroBatcher
+from app.infrastructure.classifiers.smart_classifier import body_profile_hits
 
+# caracteres de cada anexo incluídos no prompt (no máximo 3 anexos)
+ATTACHMENT_PROMPT_CHARS = 1500
 
 TOOL_SCHEMA = [{
     "type": "function",
@@ -31,6 +37,40 @@ TOOL_SCHEMA = [{
 }]
 
 
+# micro-lote: o mesmo "emit", com um item por e-mail em "results" (casados pelo "index")
+BATCH_TOOL_SCHEMA = [{
+    "type": "function",
+    "function": {
+        "name": "emit",
+        "description": "Retorne a classificação de cada e-mail do lote.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {"type": "integer"},
+                            **TOOL_SCHEMA[0]["function"]["parameters"]["properties"],
+                        },
+                        "required": ["index", "category", "reason", "reply"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["results"],
+            "additionalProperties": False
+        }
+    }
+}]
+
+SYSTEM_MSG = (
+    "Você é um classificador de emails para priorização operacional. "
+    "Siga estritamente o schema solicitado e não adicione campos extras."
+)
+
+
 def _strip_signatures(text: str) -> str:
     if not text:
         return ""
@@ -42,26 +82,127 @@ def _strip_signatures(text: str) -> str:
 
 
 class OpenAIClassifier(ClassifierPort):
-    def __init__(self):
+    """
+    Classificação via chat completions ('emit' forçado).
+    Com `batch_max_items` > 1, chamadas concorrentes (ex.: workers do sync IMAP) viram um
+    único request com até N e-mails ou após `batch_max_wait_ms`; itens ausentes ou malformados
+    na resposta são reenviados (`batch_retries`) e, persistindo, caem no rule-based.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[HttpConnectionPool] = None,
+        cache: Optional[LlmResultCache] = None,
+        batch_max_items: int = 1,
+        batch_max_wait_ms: float = 200,
+        batch_retries: int = 1,
+    ):
+        self.cache = cache
+        self.batch_retries = batch_retries
+        self.batcher = (
+            MicroBatcher(self._flush_batch, max_items=batch_max_items, max_wait_s=batch_max_wait_ms / 1000)
+            if batch_max_items > 1 else None
+        )
+        # índice do perfil → (termos ordenados, JSON do prompt); some junto com o índice
+        self._priority_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.default_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.escalation_model = os.getenv("OPENAI_MODEL_ESCALATE", "gpt-4.1-mini")
         self.rule_based = RuleBasedClassifier()
         self.gray_low = float(os.getenv("RB_GRAY_LOW", "0.45"))
         self.gray_high = float(os.getenv("RB_GRAY_HIGH", "0.75"))
+        # pool keep-alive compartilhado (URL base configurável p/ servidor local em testes)
+        self.pool = pool or get_shared_pool(
+            os.getenv("OPENAI_BASE_URL", "https://api.openai.com"),
+            max_idle=int(os.getenv("OPENAI_POOL_SIZE", "8")),
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+            connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("OPENAI_READ_TIMEOUT", "30")),
+        )
 
     def classify(
         self,
         email: Email,
         tokens: List[str],
         mood: Optional[str] = None,
-        priority: Optional[list[str]] = None
+        priority: Optional[KeywordIndexPort] = None,
+        analysis: Optional[EmailAnalysis] = None,
+        rule_result: Optional[ClassificationResult] = None,
     ) -> ClassificationResult:
 
-        rb = self.rule_based.classify(email, tokens, mood=mood, priority=priority)
+        # escalonado pelo SmartClassifier: reaproveita idioma, hits e confiança já calculados
+        rb = rule_result or self.rule_based.classify(email, tokens, mood=mood, priority=priority, analysis=analysis)
         if not self.api_key or (rb.extra or {}).get("is_spam"):
             return rb
 
+        p = self._prepare(email, rb, priority)
+
+        # e-mails automáticos quase idênticos: mesma entrada normalizada → mesma resposta
+        cache_key = cached = None
+        if self.cache:
+            cache_key = LlmResultCache.key(
+                p["body_clip"], email.subject, p["lang"], p["priority_terms"], mood, p["model"],
+                attachments=p["attachments_block"], hits=p["hits_list"], rb_conf=round(p["rb_conf"], 2),
+                sender=(email.sender or "").strip().lower(),  # está no prompt: a resposta pode citar o remetente
+            )
+            cached = self.cache.get(cache_key)
+
+        batch_info = None
+        if cached:
+            value, tier = cached
+            print(f"[DEBUG] Cache do LLM ({tier}): {p['model']}, {value['usage'].get('total_tokens') or 0} tokens poupados")
+            js, usage = value["result"], {}
+        else:
+            if self.batcher:
+                item = {"lang": p["lang"], "hits": p["hits_list"], "rb_conf": p["rb_conf"], "email": p["email_block"]}
+                try:
+                    js, usage, batch_info = self.batcher.submit((p["model"], mood or "", p["priority_json"]), item)
+                except Exception as e:
+                    print(f"[ERROR] Falha no lote do LLM: {e}")
+                    js, usage = None, {}
+            else:
+                js, usage = self._request(self._single_payload(p, mood))
+            if js is None:
+                return rb
+            if cache_key:
+                self.cache.put(cache_key, {"result": js, "usage": usage, "model": p["model"]})
+
+        extra = {}
+        if batch_info:
+            extra["llm_batch"] = batch_info
+        if cached:
+            extra["llm_cache"] = {
+                "hit": True,
+                "tier": cached[1],
+                "saved_tokens": cached[0]["usage"].get("total_tokens"),
+            }
+        return self._result(js, usage, rb, self._context(p, rb, priority), extra)
+
+    # --- Batch API (backlog offline): mesmo prompt, resposta aplicada depois ---
+
+    def offline_request(
+        self,
+        email: Email,
+        rb: ClassificationResult,
+        mood: Optional[str] = None,
+        priority: Optional[KeywordIndexPort] = None,
+    ) -> Tuple[dict, dict]:
+        """(corpo do POST /v1/chat/completions, contexto serializável para `result_from_offline`)."""
+        p = self._prepare(email, rb, priority)
+        return self._single_payload(p, mood), self._context(p, rb, priority)
+
+    def result_from_offline(
+        self, response_body: dict, rb: ClassificationResult, context: dict
+    ) -> Optional[ClassificationResult]:
+        """Resultado a partir da resposta da Batch API; None se veio sem 'emit' válido."""
+        js, usage = self._parse_completion(response_body)
+        if js is None:
+            return None
+        return self._result(js, usage, rb, context, {"llm_offline": True})
+
+    # --- montagem do prompt ---
+
+    def _prepare(self, email: Email, rb: ClassificationResult, priority: Optional[KeywordIndexPort]) -> dict:
         lang = (rb.extra or {}).get("lang", "pt")
         hits = (rb.extra or {}).get("profile_hits") or []
         rb_conf = float((rb.extra or {}).get("confidence", 0.0))
@@ -71,18 +212,86 @@ class OpenAIClassifier(ClassifierPort):
         if self.gray_low <= rb_conf <= self.gray_high:
             model = self.escalation_model
 
-        mood_instruction = f"- O tom da resposta deve ser {mood}." if mood else ""
         body_clip = _strip_signatures(email.body or "")
 
-        priority_json = json.dumps(priority or [], ensure_ascii=False)
-        hits_list = ", ".join(hits[:20]) if hits else "nenhum"
+        # anexos vêm separados do corpo: sinal complementar, com orçamento próprio no prompt
+        att_texts = [a for a in email.attachments or [] if a.text]
+        attachments_block = "\n".join(
+            f"- Anexo {a.filename or i + 1} (peso menor que o corpo): {a.text[:ATTACHMENT_PROMPT_CHARS]}"
+            for i, a in enumerate(att_texts[:3])
+        )
+
+        priority_terms, priority_json = self._priority_prompt(priority)
+        email_block = f"""
+- Subject: {email.subject or ""}
+- Sender: {email.sender or ""}
+- Body (sem assinatura): {body_clip}
+{attachments_block}
+""".strip()
+        return {
+            "lang": lang,
+            "hits": hits,
+            "hits_list": ", ".join(hits[:20]) if hits else "nenhum",
+            "rb_conf": rb_conf,
+            "model": model,
+            "body_clip": body_clip,
+            "attachments_block": attachments_block,
+            "priority_terms": priority_terms,
+            "priority_json": priority_json,
+            "email_block": email_block,
+        }
+
+    @staticmethod
+    def _context(p: dict, rb: ClassificationResult, priority: Optional[KeywordIndexPort]) -> dict:
+        """O que `_result` precisa além da resposta (cabe em JSON, para o modo offline)."""
+        return {
+            "model": p["model"],
+            "hits": p["hits"][:20],
+            "rb_conf": p["rb_conf"],
+            # boost se prioridade bateu: mesmos hits de priority.match(body), sem nova passada
+            "priority_boost": bool(priority and body_profile_hits(rb)),
+        }
+
+    def _result(self, js: dict, usage: dict, rb: ClassificationResult, ctx: dict, extra: dict) -> ClassificationResult:
+        # normalização
+        cat_raw = str(js.get("category", "")).strip().lower()
+        category = Category.PRODUCTIVE if cat_raw in ("productive", "produtivo") else Category.UNPRODUCTIVE
+        reason = (js.get("reason") or "").strip() or "sem motivo"
+        reply = (js.get("reply") or "").strip()
+        if category == Category.UNPRODUCTIVE:
+            reply = ""
+
+        rb_conf = ctx["rb_conf"]
+        extra = {**(rb.extra or {}), **extra}
+        if ctx["priority_boost"]:
+            extra["priority_boost"] = True
+            rb_conf = min(1.0, rb_conf + 0.15)
 
-        system_msg = (
-            "Você é um classificador de emails para priorização operacional. "
-            "Siga estritamente o schema solicitado e não adicione campos extras."
+        extra.update({
+            "llm": True,
+            "rb_confidence": rb_conf,
+            "hits": ctx["hits"],
+            "model_effective": ctx["model"],
+        })
+
+        return ClassificationResult(
+            category=category,
+            reason=reason,
+            suggested_reply=reply,
+            total_tokens=usage.get("total_tokens"),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            used_model=ctx["model"],
+            extra=extra
         )
 
-        user_prompt = f"""
+    def _single_payload(self, p: dict, mood: Optional[str]) -> dict:
+        prompt = self._single_prompt(p["lang"], mood, p["priority_json"], p["hits_list"], p["rb_conf"], p["email_block"])
+        return self._payload(p["model"], prompt)
+
+    def _single_prompt(self, lang, mood, priority_json, hits_list, rb_conf, email_block) -> str:
+        mood_instruction = f"- O tom da resposta deve ser {mood}." if mood else ""
+        return f"""
 Responda **exclusivamente** via chamada de função 'emit'.
 
 Regras:
@@ -100,38 +309,143 @@ Sinais do pré-processamento rule-based:
 - confiança rule-based: {rb_conf:.2f}
 
 Email:
-- Subject: {email.subject or ""}
-- Sender: {email.sender or ""}
-- Body (sem assinatura): {body_clip}
+{email_block}
+""".strip()
+
+    def _batch_prompt(self, mood, priority_json, items: List[dict]) -> str:
+        """Regras e prioridades uma vez só; cada e-mail com seus sinais e o próprio índice."""
+        mood_instruction = f"- O tom das respostas deve ser {mood}." if mood else ""
+        emails = "\n\n".join(
+            f"""### E-mail index={i}
+- idioma da resposta: {it["lang"]}
+- hits: {it["hits"]}
+- confiança rule-based: {it["rb_conf"]:.2f}
+{it["email"]}"""
+            for i, it in enumerate(items)
+        )
+        return f"""
+Responda **exclusivamente** via chamada de função 'emit', com exatamente um item em "results"
+para CADA e-mail abaixo, repetindo o seu "index".
+
+Regras:
+- "category" deve ser "productive" OU "unproductive".
+- Se for promocional/newsletter/spam: "category" = "unproductive" e "reply" = "".
+- "reason" deve ser curto e citar quando usar uma palavra de prioridade.
+- "reply" (quando existir) deve estar no idioma indicado no e-mail.
+{mood_instruction}
+
+Lista de palavras-chave prioritárias (com sinônimos). A presença delas é INDICADOR FORTE de que é produtivo:
+priority_keywords = {priority_json}
+
+{emails}
 """.strip()
 
-        payload = {
+    def _payload(self, model: str, user_prompt: str, n_items: int = 0) -> dict:
+        return {
             "model": model,
             "messages": [
-                {"role": "system", "content": system_msg},
+                {"role": "system", "content": SYSTEM_MSG},
                 {"role": "user", "content": user_prompt},
             ],
-            "tools": TOOL_SCHEMA,
+            "tools": BATCH_TOOL_SCHEMA if n_items else TOOL_SCHEMA,
             "tool_choice": {"type": "function", "function": {"name": "emit"}},
             "temperature": 0.0,
-            "max_tokens": 220,
+            "max_tokens": 220 * max(1, n_items),
         }
+
+    def _flush_batch(self, key: tuple, items: List[dict]) -> List[tuple]:
+        """Um request por lote; ausentes/malformados são reenviados juntos até `batch_retries` vezes."""
+        model, mood, priority_json = key
+        out: List[tuple] = [(None, {}, None)] * len(items)
+        spent: List[Dict[str, int]] = [{} for _ in items]  # tokens de todas as tentativas em que o item foi
+        pending = list(range(len(items)))
+        for attempt in range(1 + max(0, self.batch_retries)):
+            if not pending:
+                break
+            sent = [items[i] for i in pending]
+            js, usage = self._request(self._payload(model, self._batch_prompt(mood, priority_json, sent), len(sent)))
+            got = self._batch_results(js, len(sent))
+            # tokens do request rateados entre os e-mails enviados nele; quem volta na próxima
+            # tentativa leva junto o que já gastou
+            shares = self._split_usage(usage, len(sent))
+            info = {"size": len(items), "sent": len(sent), "attempt": attempt + 1}
+            for pos, idx in enumerate(pending):
+                for k, v in shares[pos].items():
+                    spent[idx][k] = spent[idx].get(k, 0) + v
+                if pos in got:
+                    out[idx] = ({k: v for k, v in got[pos].items() if k != "index"}, dict(spent[idx]), info)
+            missing = [idx for pos, idx in enumerate(pending) if pos not in got]
+            if missing:
+                print(f"[WARN] Lote do LLM: {len(missing)} de {len(sent)} item(ns) sem resposta válida")
+            pending = missing
+        return out
+
+    @staticmethod
+    def _split_usage(usage: dict, n: int) -> List[Dict[str, int]]:
+        """Rateio sem perder o resto da divisão (os primeiros itens levam 1 token a mais)."""
+        shares: List[Dict[str, int]] = [{} for _ in range(n)]
+        for k, v in usage.items():
+            if isinstance(v, int) and not isinstance(v, bool):
+                q, r = divmod(v, n)
+                for i in range(n):
+                    shares[i][k] = q + (1 if i < r else 0)
+        if "prompt_tokens" in usage and "completion_tokens" in usage:
+            for share in shares:
+                share["total_tokens"] = share["prompt_tokens"] + share["completion_tokens"]
+        return shares
+
+    @staticmethod
+    def _batch_results(js: Optional[dict], n: int) -> Dict[int, dict]:
+        """Resultados válidos do lote por índice (primeira ocorrência de cada índice vale)."""
+        got: Dict[int, dict] = {}
+        results = (js or {}).get("results")
+        if not isinstance(results, list):
+            return got
+        for r in results:
+            if not isinstance(r, dict):
+                continue
+            idx = r.get("index")
+            if isinstance(idx, bool) or not isinstance(idx, int) or not 0 <= idx < n or idx in got:
+                continue
+            if str(r.get("category", "")).strip().lower() not in ("productive", "produtivo", "unproductive", "improdutivo"):
+                continue
+            got[idx] = r
+        return got
+
+    def _priority_prompt(self, priority: Optional[KeywordIndexPort]) -> Tuple[List[str], str]:
+        """Termos ordenados + JSON do prompt, montados uma vez por índice de perfil."""
+        if not priority:
+            return [], "[]"
+        try:
+            return self._priority_cache[priority]
+        except (KeyError, TypeError):
+            pass
+        terms = sorted(priority.terms)
+        built = (terms, json.dumps(terms, ensure_ascii=False))
+        try:
+            self._priority_cache[priority] = built
+        except TypeError:
+            pass  # índice sem suporte a weakref: monta a cada chamada
+        return built
+
+    def _request(self, payload: dict):
+        """Chama a API e devolve (argumentos do 'emit', usage) ou (None, {}) em qualquer falha."""
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
-
         try:
-            conn = http.client.HTTPSConnection("api.openai.com")
-            conn.request("POST", "/v1/chat/completions", json.dumps(payload), headers)
-            res = conn.getresponse()
-            data = res.read().decode("utf-8")
-            parsed = json.loads(data)
+            _, data = self.pool.request("POST", "/v1/chat/completions", json.dumps(payload), headers)
+            parsed = json.loads(data.decode("utf-8"))
         except Exception:
-            return rb
+            return None, {}
+        return self._parse_completion(parsed)
 
-        if "error" in parsed:
-            return rb
+    @staticmethod
+    def _parse_completion(parsed: dict):
+        """(argumentos do 'emit', usage) de uma resposta de chat completions, ou (None, {})."""
+        if not isinstance(parsed, dict) or "error" in parsed:
+            return None, {}
 
         usage = parsed.get("usage", {})
 
@@ -160,36 +474,5 @@ Email:
                     js = None
 
         if not isinstance(js, dict):
-            return rb
-
-        # normalização
-        cat_raw = str(js.get("category", "")).strip().lower()
-        category = Category.PRODUCTIVE if cat_raw in ("productive", "produtivo") else Category.UNPRODUCTIVE
-        reason = (js.get("reason") or "").strip() or "sem motivo"
-        reply = (js.get("reply") or "").strip()
-        if category == Category.UNPRODUCTIVE:
-            reply = ""
-
-        extra = dict(rb.extra or {})
-        # boost na confiança se prioridade bateu
-        if any(p.lower() in (email.body or "").lower() for p in (priority or [])):
-            extra["priority_boost"] = True
-            rb_conf = min(1.0, rb_conf + 0.15)
-
-        extra.update({
-            "llm": True,
-            "rb_confidence": rb_conf,
-            "hits": hits[:20],
-            "model_effective": model,
-        })
-
-        return ClassificationResult(
-            category=category,
-            reason=reason,
-            suggested_reply=reply,
-            total_tokens=usage.get("total_tokens"),
-            prompt_tokens=usage.get("prompt_tokens"),
-            completion_tokens=usage.get("completion_tokens"),
-            used_model=model,
-            extra=extra
-        )
+            return None, {}
+        return js, usage
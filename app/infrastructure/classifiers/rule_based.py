@@ -1,33 +1,11 @@
 from typing import List, Optional, Set
 import re
 
-from app.domain.entities import Email, ClassificationResult, Category
-from app.domain.ports import ClassifierPort
-
-# --- detecção de idioma (pt/en/es) ----
-try:
-    from langdetect import detect, DetectorFactory
-    DetectorFactory.seed = 0
-except Exception:  # fallback se lib não estiver instalada
-    detect = None
-
-def detect_lang(text: str) -> str:
-    if detect:
-        try:
-            lang = detect((text or "")[:4000])
-            if lang in ("pt", "en", "es"):
-                return lang
-        except Exception:
-            pass
-    # heurística leve de fallback
-    t = (text or "").lower()
-    if any(w in t for w in (" você ", " obrigado", " nota fiscal", "prazo")):
-        return "pt"
-    if any(w in t for w in (" you ", " thanks", " invoice", "deadline", "meeting")):
-        return "en"
-    if any(w in t for w in (" usted ", " gracias", " factura", "plazo", "reunión")):
-        return "es"
-    return "pt"
+from app.domain.entities import Email, ClassificationResult, Category, EmailAnalysis
+from app.domain.ports import ClassifierPort, KeywordIndexPort
+
+# --- detecção de idioma (pt/en/es): detector n-grama embutido ----
+from app.infrastructure.nlp.lang_detect import detect_lang
 
 # --- léxicos por idioma (genéricos) ---
 PROD_PT: Set[str] = {
@@ -78,10 +56,23 @@ REASON_STRINGS = {
     },
 }
 
+SPAM_VOCAB_BY_LANG = {
+    "pt": SPAM_COMMON | SPAM_PT,
+    "en": SPAM_COMMON | SPAM_EN,
+    "es": SPAM_COMMON | SPAM_ES,
+}
+PROD_BY_LANG = {"pt": PROD_PT, "en": PROD_EN, "es": PROD_ES}
+
+
+def _lang_key(lang: str) -> str:
+    # qualquer idioma fora de pt/en cai em es
+    return lang if lang in ("pt", "en") else "es"
+
+
 class RuleBasedClassifier(ClassifierPort):
     """
     Rule-based profile-aware, multilíngue (pt/en/es) + filtro de spam.
-    - Usa priority (keywords+sinônimos) quando fornecido.
+    - Usa priority (índice compilado de keywords+sinônimos) quando fornecido.
     - Detecta spam/anúncio por vocabulário + número de links.
     - Devolve 'extra' com 'lang', 'confidence', etc. para o responder adaptar a língua.
     """
@@ -90,61 +81,99 @@ class RuleBasedClassifier(ClassifierPort):
         email: Email,
         tokens: List[str],
         mood: Optional[str] = None,
-        priority: Optional[list[str]] = None,
+        priority: Optional[KeywordIndexPort] = None,
+        analysis: Optional[EmailAnalysis] = None,
     ) -> ClassificationResult:
 
         body = email.body or ""
-        lang = detect_lang((email.subject or "") + "\n" + body)
-        reasons = REASON_STRINGS.get(lang, REASON_STRINGS["pt"])
+        # idioma já detectado no contexto de análise; só detecta aqui se chamado avulso
+        lang = analysis.lang if analysis else detect_lang((email.subject or "") + "\n" + body)
 
         # normaliza tokens
         tok_set = set((t or "").lower() for t in tokens)
 
         # --- SPAM / anúncio ---
-        spam_vocab = SPAM_COMMON | (SPAM_PT if lang == "pt" else SPAM_EN if lang == "en" else SPAM_ES)
+        spam_vocab = SPAM_VOCAB_BY_LANG[_lang_key(lang)]
         spam_hits = tok_set.intersection(spam_vocab)
         link_count = len(_URL_RE.findall(body))
 
         if len(spam_hits) >= 2 or (len(spam_hits) >= 1 and link_count >= 2):
-            reason = f"{reasons['spam']} (hits={len(spam_hits)}, links={link_count})"
-            return ClassificationResult(
-                category=Category.UNPRODUCTIVE,
-                reason=reason,
-                suggested_reply="",  # não responder spam
-                used_model="rule-based",
-                extra={
-                    "lang": lang,
-                    "is_spam": True,
-                    "spam_hits": sorted(spam_hits),
-                    "links": link_count,
-                    "confidence": 0.9,
-                },
-            )
+            return self._spam_result(lang, sorted(spam_hits), link_count)
 
         # --- Produtivo por perfil (priority inclui sinônimos, vindo do use case) ---
-        gen_prod = PROD_PT if lang == "pt" else PROD_EN if lang == "en" else PROD_ES
-        prof_set = set(p.lower() for p in (priority or []))
-        lexicon = prof_set if prof_set else gen_prod
-
-        prod_hits = tok_set.intersection(lexicon)
+        # índice compilado casa termos de uma ou várias palavras numa passada
+        if priority:
+            prod_hits = priority.match(body)
+        else:
+            prod_hits = tok_set.intersection(PROD_BY_LANG[_lang_key(lang)])
         if prod_hits:
             conf = 0.55 + 0.1 * min(4, len(prod_hits))  # 0.55..0.95
-            reason = f"{reasons['profile_hits']}: {', '.join(sorted(prod_hits))}"
-            return ClassificationResult(
-                category=Category.PRODUCTIVE,
-                reason=reason,
-                suggested_reply="",  # responder será gerado no responder com base em extra['lang']
-                used_model="rule-based",
-                extra={
-                    "lang": lang,
-                    "is_spam": False,
-                    "profile_hits": sorted(prod_hits),
-                    "confidence": min(conf, 0.9),
-                },
-            )
+            return self._productive_result(lang, sorted(prod_hits), min(conf, 0.9))
+
+        return self._attachment_result(email, lang, priority, analysis) or self._fallback_result(lang, len(body))
+
+    # --- construção dos resultados ---
+
+    def _spam_result(self, lang: str, spam_hits: List[str], link_count: int) -> ClassificationResult:
+        reasons = REASON_STRINGS.get(lang, REASON_STRINGS["pt"])
+        reason = f"{reasons['spam']} (hits={len(spam_hits)}, links={link_count})"
+        return ClassificationResult(
+            category=Category.UNPRODUCTIVE,
+            reason=reason,
+            suggested_reply="",  # não responder spam
+            used_model="rule-based",
+            extra={
+                "lang": lang,
+                "is_spam": True,
+                "spam_hits": spam_hits,
+                "links": link_count,
+                "confidence": 0.9,
+            },
+        )
+
+    def _productive_result(self, lang: str, prod_hits: List[str], conf: float) -> ClassificationResult:
+        reasons = REASON_STRINGS.get(lang, REASON_STRINGS["pt"])
+        reason = f"{reasons['profile_hits']}: {', '.join(prod_hits)}"
+        return ClassificationResult(
+            category=Category.PRODUCTIVE,
+            reason=reason,
+            suggested_reply="",  # responder será gerado no responder com base em extra['lang']
+            used_model="rule-based",
+            extra={
+                "lang": lang,
+                "is_spam": False,
+                "profile_hits": prod_hits,
+                "confidence": conf,
+            },
+        )
+
+    def _attachment_result(
+        self,
+        email: Email,
+        lang: str,
+        priority: Optional[KeywordIndexPort],
+        analysis: Optional[EmailAnalysis],
+    ) -> Optional[ClassificationResult]:
+        """Corpo sem sinais: termos do perfil nos anexos contam, com peso menor que no corpo."""
+        texts = [a.text for a in email.attachments or [] if a.text]
+        if not texts:
+            return None
+        if priority:
+            hits = priority.match("\n".join(texts))
+        else:
+            hits = set(analysis.attachment_tokens if analysis else []).intersection(PROD_BY_LANG[_lang_key(lang)])
+        if not hits:
+            return None
+        conf = min(0.45 + 0.1 * min(4, len(hits)), 0.8)  # anexos pesam menos que o corpo
+        result = self._productive_result(lang, sorted(hits), conf)
+        result.extra["attachment_hits"] = True
+        return result
+
+    def _fallback_result(self, lang: str, body_len: int) -> ClassificationResult:
+        reasons = REASON_STRINGS.get(lang, REASON_STRINGS["pt"])
 
         # --- Fallback por tamanho ---
-        if len(body) > 10_000:
+        if body_len > 10_000:
             return ClassificationResult(
                 category=Category.PRODUCTIVE,
                 reason=reasons["fallback_len"],
@@ -1,15 +1,25 @@
+import time
 from typing import List, Optional
-from app.domain.entities import Email, ClassificationResult
-from app.domain.ports import ClassifierPort
+from app.domain.entities import Email, ClassificationResult, EmailAnalysis
+from app.domain.ports import ClassifierPort, KeywordIndexPort, LlmClassifierPort
+
+def body_profile_hits(rb: ClassificationResult) -> List[str]:
+    """Hits do perfil no corpo, vindos do resultado rule-based (sem casar o índice de novo)."""
+    extra = rb.extra or {}
+    if extra.get("attachment_hits"):
+        return []
+    return sorted(extra.get("profile_hits") or [])
+
 
 class SmartClassifier(ClassifierPort):
     """
     Combina rule-based (profile-aware) + LLM:
     - Se for spam → retorna rule-based (sem LLM).
     - Se confiança do rule-based >= min_conf → retorna rule-based.
-    - Caso contrário, chama LLM com contexto do perfil/keywords e highlights.
+    - Caso contrário, chama LLM com contexto do perfil/keywords e highlights,
+      repassando o resultado rule-based (o LLM não roda as regras de novo).
     """
-    def __init__(self, rule_based: ClassifierPort, llm: Optional[ClassifierPort], min_conf: float = 0.7):
+    def __init__(self, rule_based: ClassifierPort, llm: Optional[LlmClassifierPort], min_conf: float = 0.7):
         self.rule_based = rule_based
         self.llm = llm
         self.min_conf = min_conf
@@ -19,29 +29,41 @@ class SmartClassifier(ClassifierPort):
         email: Email,
         tokens: List[str],
         mood: Optional[str] = None,
-        priority: Optional[list[str]] = None
+        priority: Optional[KeywordIndexPort] = None,
+        analysis: Optional[EmailAnalysis] = None,
     ) -> ClassificationResult:
-        rb = self.rule_based.classify(email, tokens, mood=mood, priority=priority)
-        extra = rb.extra or {}
-        if extra.get("is_spam"):
-            return rb  # sem LLM, economiza tokens
-
-        if (extra.get("confidence") or 0.0) >= self.min_conf or self.llm is None:
+        t0 = time.perf_counter()
+        rb = self.rule_based.classify(email, tokens, mood=mood, priority=priority, analysis=analysis)
+        rb_ms = round((time.perf_counter() - t0) * 1000, 3)
+        if not self.should_escalate(rb):
             return rb
 
-        # constrói um "highlight" simples para enriquecer o contexto do LLM
-        tok_set = set(t.lower() for t in tokens)
-        prof_set = set(p.lower() for p in (priority or []))
-        hits = sorted(tok_set.intersection(prof_set))[:20]
-
-        # Chama o LLM com as mesmas entradas + perfil expandido
+        # Chama o LLM com as mesmas entradas + índice compilado do perfil + resultado rule-based
         llm_res = self.llm.classify(
             email=email,
             tokens=tokens,
             mood=mood,
-            priority=list(prof_set) if prof_set else None
+            priority=priority if priority else None,
+            analysis=analysis,
+            rule_result=rb,
         )
+        merged = self.merge(rb, llm_res, priority)
+        # tempo de cada classificador, para o caso de uso separar as etapas
+        merged.extra["stage_ms"] = {"rule_based": rb_ms, "llm": round((time.perf_counter() - t0) * 1000 - rb_ms, 3)}
+        return merged
 
-        # mescla informações úteis do rule-based
-        merged_extra = {**(llm_res.extra or {}), "rb_hits": hits, "rb_confidence": extra.get("confidence")}
+    def should_escalate(self, rb: ClassificationResult) -> bool:
+        extra = rb.extra or {}
+        if extra.get("is_spam"):
+            return False  # sem LLM, economiza tokens
+        return self.llm is not None and (extra.get("confidence") or 0.0) < self.min_conf
+
+    @staticmethod
+    def merge(
+        rb: ClassificationResult, llm_res: ClassificationResult, priority: Optional[KeywordIndexPort] = None
+    ) -> ClassificationResult:
+        """Mescla informações úteis do rule-based no resultado do LLM."""
+        # highlights do perfil já calculados pelo rule-based (hits do corpo; anexos ficam de fora)
+        hits = body_profile_hits(rb)[:20] if priority else []
+        merged_extra = {**(llm_res.extra or {}), "rb_hits": hits, "rb_confidence": (rb.extra or {}).get("confidence")}
         return type(llm_res)(**{**llm_res.__dict__, "extra": merged_extra})
@@ -1,8 +1,44 @@
+import os
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
 
-DATABASE_URL = "sqlite:///./data.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data.db")
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+# pragmas aplicados em cada conexão SQLite nova do pool
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",          # leitores não bloqueiam o writer
+    "synchronous": "NORMAL",        # fsync só no checkpoint do WAL
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-20000")),  # negativo = KiB
+    "temp_store": "MEMORY",
+}
+
+
+def create_db_engine(url: str = DATABASE_URL):
+    """Engine com pool de conexões; em SQLite aplica os pragmas de desempenho no connect."""
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=False, pool_pre_ping=True)
+
+    pool_args = {}
+    if url not in ("sqlite://", "sqlite:///:memory:"):
+        pool_args = {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "8")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "8")),
+        }
+    eng = create_engine(url, echo=False, connect_args={"check_same_thread": False}, **pool_args)
+
+    @event.listens_for(eng, "connect")
+    def _apply_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cur.execute(f"PRAGMA {name}={value}")
+        cur.close()
+
+    return eng
+
+
+engine = create_db_engine()
 
 def init_db():
     SQLModel.metadata.create_all(engine)
@@ -10,3 +46,7 @@ def init_db():
 def get_session():
     with Session(engine) as session:
         yield session
+
+def new_session() -> Session:
+    """Sessão nova por unidade de trabalho (uma por request/thread, nunca compartilhada)."""
+    return Session(engine)
@@ -1,79 +1,391 @@
-import imaplib, email
-from app.domain.entities import Email
+import imaplib
+import re
+import select
+import socket
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email import policy
+from email.parser import BytesHeaderParser
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from app.domain.entities import Email, MailboxState
 from app.domain.ports import EmailSourcePort
+from app.infrastructure.classifiers.header_triage import triage_headers
+from app.infrastructure.email_sources.imap_parser import (
+    parse_fetch, compress_uids, walk_bodystructure, pick_text_part, decode_part,
+)
+
+# cabeçalho completo: a pré-triagem precisa de List-*, Precedence, Auto-Submitted e X-* de ESPs
+HEADER_ITEM = "BODY.PEEK[HEADER]"
+
+# servidores encerram IDLE após ~29 min (RFC 2177); reemitimos antes disso
+IDLE_REFRESH_SECONDS = 25 * 60
+_IDLE_WAKE = re.compile(rb"^\* \d+ (EXISTS|RECENT)\b", re.IGNORECASE)
+# prazo para o servidor completar uma linha já começada / responder ao IDLE e ao DONE
+_IDLE_REPLY_TIMEOUT = 30.0
+
+
+def _first_int(values) -> Optional[int]:
+    """Primeiro valor numérico de uma resposta não marcada do imaplib (ex.: [b'123'])."""
+    for v in values or []:
+        v = v.decode() if isinstance(v, bytes) else str(v)
+        if v.strip().isdigit():
+            return int(v)
+    return None
 
 
 class ImapEmailSource(EmailSourcePort):
-    def __init__(self, host: str, user: str, password: str, mailbox: str = "INBOX"):
+    """
+    Fonte IMAP baseada em UID, com busca em lote e parcial:
+    1) UID SEARCH UNSEEN
+    2) UID FETCH <conjunto> (BODYSTRUCTURE + cabeçalhos) — um round-trip por lote
+    3) pré-triagem pelos cabeçalhos: envios em massa/automáticos conclusivos não têm o corpo baixado
+    4) UID FETCH <conjunto> BODY.PEEK[<parte>]<0.cap> — só a parte de texto, agrupada por seção
+    Anexos nunca são baixados; corpos muito grandes são cortados em `body_byte_cap` bytes.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        user: str,
+        password: str,
+        mailbox: str = "INBOX",
+        fetch_batch: int = 100,
+        body_byte_cap: int = 64 * 1024,
+        port: Optional[int] = None,
+        ssl: bool = True,
+        header_triage: bool = True,
+    ):
         self.host = host
         self.user = user
         self.password = password
         self.mailbox = mailbox
-        self.conn: imaplib.IMAP4_SSL | None = None
+        self.fetch_batch = fetch_batch
+        self.body_byte_cap = body_byte_cap
+        self.port = port or (imaplib.IMAP4_SSL_PORT if ssl else imaplib.IMAP4_PORT)
+        self.ssl = ssl
+        self.header_triage = header_triage
+        self.conn: imaplib.IMAP4 | None = None
+        self.capabilities: frozenset = frozenset()
+        # imaplib não é thread-safe: fetch e move (estágios diferentes do pipeline) usam a mesma conexão
+        self._lock = threading.RLock()
+        # IDLE não segura o lock: quem precisar da conexão pede o DONE e espera (ver _session)
+        self._idle_cond = threading.Condition(self._lock)
+        self._idling = False
+        self._interrupt = threading.Event()
+        self._idle_seq = 0
+        self._known_folders: set = set()
+
+    @contextmanager
+    def _session(self):
+        """Uso exclusivo da conexão; se ela está em IDLE, interrompe (DONE) e espera liberar."""
+        with self._idle_cond:
+            while self._idling:
+                self._interrupt.set()
+                self._idle_cond.wait()
+            yield
 
     def _connect(self):
         if not self.conn:
-            self.conn = imaplib.IMAP4_SSL(self.host)
+            cls = imaplib.IMAP4_SSL if self.ssl else imaplib.IMAP4
+            self.conn = cls(self.host, self.port)
             self.conn.login(self.user, self.password)
+            # capacidades podem mudar após o login (ex.: IDLE/MOVE só autenticado)
+            typ, dat = self.conn.capability()
+            caps = dat[-1] if typ == "OK" and dat and dat[-1] else b""
+            self.capabilities = frozenset(caps.decode().upper().split()) | frozenset(self.conn.capabilities)
+            self.conn.capabilities = tuple(self.capabilities)
+            if "CONDSTORE" in self.capabilities and "ENABLE" in self.capabilities:
+                # faz o SELECT devolver HIGHESTMODSEQ (checkpoint barato: nada mudou → nada a buscar)
+                self.conn.enable("CONDSTORE")
+
+    def disconnect(self):
+        """Descarta a conexão atual (a próxima operação reconecta)."""
+        with self._session():
+            conn, self.conn = self.conn, None
+        if conn is not None:
+            try:
+                conn.logout()
+            except Exception:
+                pass
+
+    def fetch_unread(self) -> Iterator[Tuple[str, Email]]:
+        with self._session():
+            self._select()
+        yield from self.fetch_uids(self.search_unseen())
 
-    def fetch_unread(self):
+    def _select(self):
         self._connect()
         self.conn.select(self.mailbox)
-        status, ids = self.conn.search(None, "UNSEEN")
+        # EXISTS do SELECT não é novidade; os que chegarem depois daqui são (ver idle())
+        self.conn.untagged_responses.pop("EXISTS", None)
+        self.conn.untagged_responses.pop("RECENT", None)
+
+    def mailbox_state(self) -> MailboxState:
+        """SELECT na caixa e devolve UIDVALIDITY, UIDNEXT e HIGHESTMODSEQ (se CONDSTORE)."""
+        with self._session():
+            self._select()
+            ur = self.conn.untagged_responses
+            uidvalidity = _first_int(ur.get("UIDVALIDITY"))
+            uidnext = _first_int(ur.get("UIDNEXT"))
+            if uidnext is None:
+                # servidor não mandou UIDNEXT: maior UID atual + 1
+                typ, data = self.conn.uid("SEARCH", None, "ALL")
+                uids = [int(u) for u in data[0].split()] if typ == "OK" and data and data[0] else []
+                uidnext = (max(uids) if uids else 0) + 1
+            return MailboxState(
+                uidvalidity=uidvalidity or 0,
+                uidnext=uidnext,
+                highest_modseq=_first_int(ur.get("HIGHESTMODSEQ")),
+            )
+
+    def search_unseen(self) -> List[int]:
+        with self._session():
+            status, ids = self.conn.uid("SEARCH", None, "UNSEEN")
         if status != "OK" or not ids or not ids[0]:
             return []
+        return [int(u) for u in ids[0].split()]
 
-        for num in ids[0].split():
-            typ, data = self.conn.fetch(num, "(RFC822)")
-            if typ != "OK":
-                continue
+    def search_since(self, last_uid: int) -> List[int]:
+        """UIDs > last_uid (lidos ou não). "n:*" sempre inclui a última mensagem, então filtra."""
+        with self._session():
+            status, ids = self.conn.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+        if status != "OK" or not ids or not ids[0]:
+            return []
+        return sorted(u for u in (int(x) for x in ids[0].split()) if u > last_uid)
 
-            msg = email.message_from_bytes(data[0][1])
-            body = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        body = part.get_payload(decode=True).decode(errors="ignore")
-                        break
-            else:
-                body = msg.get_payload(decode=True).decode(errors="ignore")
+    def fetch_uids(self, uids: List[int]) -> Iterator[Tuple[str, Email]]:
+        for start in range(0, len(uids), self.fetch_batch):
+            # a conexão fica livre entre lotes (o consumidor pode mover mensagens enquanto isso)
+            with self._session():
+                batch = self._fetch_batch(uids[start:start + self.fetch_batch])
+            yield from batch
+
+    def _fetch_batch(self, uids: List[int]) -> List[Tuple[str, Email]]:
+        typ, data = self.conn.uid("FETCH", compress_uids(uids), f"(UID BODYSTRUCTURE {HEADER_ITEM})")
+        if typ != "OK":
+            return []
 
-            yield num.decode(), Email(
-                subject=msg.get("subject"),
-                sender=msg.get("from"),
-                body=body,
+        metas: Dict[int, dict] = {}
+        for _, item in parse_fetch(data):
+            if "UID" not in item or "BODYSTRUCTURE" not in item:
+                continue  # FETCH não solicitado (ex.: mudança de FLAGS)
+            header_key = next((k for k in item if k.startswith("BODY[HEADER")), None)
+            headers = BytesHeaderParser(policy=policy.default).parsebytes(item.get(header_key) or b"")
+            triage = triage_headers(headers) if self.header_triage else None
+            metas[int(item["UID"])] = {
+                "subject": headers.get("subject"),
+                "sender": headers.get("from"),
+                # triagem conclusiva: nada de FETCH do corpo
+                "part": None if triage else pick_text_part(walk_bodystructure(item["BODYSTRUCTURE"])),
+                "triage": triage,
+            }
+
+        bodies = self._fetch_text_parts(metas)
+        return [
+            (str(uid), Email(
+                subject=str(metas[uid]["subject"]) if metas[uid]["subject"] is not None else None,
+                sender=str(metas[uid]["sender"]) if metas[uid]["sender"] is not None else None,
+                body=bodies.get(uid, ""),
+                triage=metas[uid]["triage"],
+            ))
+            for uid in uids if uid in metas
+        ]
+
+    def _fetch_text_parts(self, metas: Dict[int, dict]) -> Dict[int, str]:
+        # agrupa por número de seção: um UID FETCH por seção distinta no lote
+        by_section: Dict[str, List[int]] = {}
+        for uid, meta in metas.items():
+            if meta["part"] is not None:
+                by_section.setdefault(meta["part"].section, []).append(uid)
+
+        bodies: Dict[int, str] = {}
+        for section, uids in by_section.items():
+            typ, data = self.conn.uid(
+                "FETCH", compress_uids(uids), f"(UID BODY.PEEK[{section}]<0.{self.body_byte_cap}>)"
             )
+            if typ != "OK":
+                continue
+            for _, item in parse_fetch(data):
+                if "UID" not in item:
+                    continue
+                uid = int(item["UID"])
+                part = metas.get(uid, {}).get("part")
+                raw = item.get(f"BODY[{section}]")
+                if part is None or not isinstance(raw, bytes):
+                    continue
+                text = decode_part(raw, part.encoding, part.charset)
+                if part.ctype == "text/html":
+                    text = BeautifulSoup(text, "html.parser").get_text(separator="\n")
+                bodies[uid] = text
+        return bodies
 
     def mark_as_read(self, ids: list[str]) -> None:
-        self._connect()
-        for msg_id in ids:
-            self.conn.store(msg_id, "+FLAGS", "\\Seen")
+        with self._session():
+            self._connect()
+            if ids:
+                self.conn.uid("STORE", compress_uids(ids), "+FLAGS", "(\\Seen)")
 
     def move_to_folder(self, msg_id: str, folder: str):
-        self._connect()
-        print(f"[DEBUG] Movendo mensagem {msg_id} para '{folder}'")
+        self.move_batch([msg_id], folder)
+
+    def move_batch(self, msg_ids: List[str], folder: str) -> None:
+        """
+        Move um lote de UIDs para `folder` com um comando por etapa:
+        - Gmail (X-GM-EXT-1): UID STORE +X-GM-LABELS no conjunto
+        - MOVE anunciado: UID MOVE no conjunto
+        - senão: UID COPY + UID STORE \\Deleted + UID EXPUNGE (EXPUNGE sem UIDPLUS)
+        As mensagens são marcadas como lidas antes, para a cópia no destino já chegar lida.
+        """
+        if not msg_ids:
+            return
+        uid_set = compress_uids(msg_ids)
+        with self._session():
+            self._connect()
+            print(f"[DEBUG] Movendo {len(msg_ids)} mensagem(ns) ({uid_set}) para '{folder}'")
+            self._ensure_folder(folder)
+            self._check(self.conn.uid("STORE", uid_set, "+FLAGS", "(\\Seen)"), "STORE \\Seen")
 
+            if "X-GM-EXT-1" in self.capabilities:
+                self._check(self.conn.uid("STORE", uid_set, "+X-GM-LABELS", f"({folder})"), "X-GM-LABELS")
+            elif "MOVE" in self.capabilities:
+                self._check(self.conn.uid("MOVE", uid_set, folder), "UID MOVE")
+            else:
+                self._check(self.conn.uid("COPY", uid_set, folder), "UID COPY")
+                self._check(self.conn.uid("STORE", uid_set, "+FLAGS", "(\\Deleted)"), "STORE \\Deleted")
+                if "UIDPLUS" in self.capabilities:
+                    self._check(self.conn.uid("EXPUNGE", uid_set), "UID EXPUNGE")
+                else:
+                    self._check(self.conn.expunge(), "EXPUNGE")
+
+    def _ensure_folder(self, folder: str):
+        # CREATE só na primeira vez por pasta (falha = já existe; o COPY/MOVE acusa se não existir)
+        if folder in self._known_folders:
+            return
         try:
             self.conn.create(folder)
-        except:
+        except imaplib.IMAP4.error:
             pass
+        self._known_folders.add(folder)
+
+    @staticmethod
+    def _check(resp, what: str):
+        typ, data = resp
+        if typ != "OK":
+            raise imaplib.IMAP4.error(f"{what} falhou: {typ} {data}")
 
+    def supports_idle(self) -> bool:
+        with self._session():
+            self._connect()
+        return "IDLE" in self.capabilities
+
+    def idle(self, timeout: float = IDLE_REFRESH_SECONDS, stop_event=None, tick: float = 1.0) -> bool:
+        """
+        Entra em IDLE na caixa e bloqueia até EXISTS/RECENT (True), `timeout`, stop_event ou
+        outro uso da conexão (False). Sempre encerra com DONE, deixando a conexão pronta.
+        O lock só é tomado para entrar; durante a espera os outros métodos interrompem o IDLE.
+        """
+        with self._session():
+            tag = self._start_idle()
+            if tag is None:
+                return True
+            self._idling = True
+            self._interrupt.clear()
         try:
-            status, resp = self.conn.store(msg_id, '+X-GM-LABELS', f'({folder})')
-            print(f"[DEBUG] Gmail store +X-GM-LABELS -> {status}, {resp}")
-        except Exception as e:
-            print(f"[WARN] Gmail labels não suportadas, usando fallback: {e}")
-            try:
-                self.conn.copy(msg_id, folder)
-                self.conn.store(msg_id, "+FLAGS", "\\Deleted")
-                self.conn.expunge()
-                print(f"[DEBUG] Mensagem {msg_id} copiada para {folder} e removida da origem")
-            except Exception as e2:
-                print(f"[ERROR] Falha ao mover mensagem {msg_id} para {folder}: {e2}")
-                return
+            return self._wait_idle(tag, timeout, stop_event, tick)
+        except Exception:
+            # conexão em estado desconhecido: descarta (a próxima operação reconecta)
+            conn, self.conn = self.conn, None
+            if conn is not None:
+                try:
+                    conn.shutdown()
+                except Exception:
+                    pass
+            raise
+        finally:
+            with self._idle_cond:
+                self._idling = False
+                self._idle_cond.notify_all()
+
+    def _start_idle(self) -> Optional[bytes]:
+        """Envia IDLE e espera o "+"; None se já há e-mail novo (nem entra em IDLE)."""
+        self._connect()
+        if self.conn.state != "SELECTED":
+            self.conn.select(self.mailbox)
+        # EXISTS recebido junto de comandos anteriores: chegou e-mail entre o SEARCH e agora
+        if self.conn.untagged_responses.pop("EXISTS", None):
+            return None
+
+        # tag própria: a resposta é lida aqui, o imaplib não espera por ela
+        self._idle_seq += 1
+        tag = b"IDLE%d" % self._idle_seq
+        self.conn.send(tag + b" IDLE\r\n")
+        line = self._read_line(_IDLE_REPLY_TIMEOUT)
+        if line is None or not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE recusado: {line!r}")
+        return tag
+
+    def _wait_idle(self, tag: bytes, timeout: float, stop_event, tick: float) -> bool:
+        woke = False
+        deadline = time.monotonic() + timeout
+        while not woke and not self._interrupt.is_set() and not (stop_event and stop_event.is_set()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            line = self._read_line(min(tick, remaining))
+            if line is None:
+                continue
+            if line.upper().startswith(b"* BYE"):
+                raise imaplib.IMAP4.abort(line.decode(errors="replace"))
+            woke = bool(_IDLE_WAKE.match(line))
+
+        self.conn.send(b"DONE\r\n")
+        while True:
+            line = self._read_line(_IDLE_REPLY_TIMEOUT)
+            if line is None:
+                raise imaplib.IMAP4.abort("sem resposta ao DONE do IDLE")
+            if line.startswith(tag + b" "):
+                break
+            woke = woke or bool(_IDLE_WAKE.match(line))
+        if not line[len(tag) + 1:].upper().startswith(b"OK"):
+            raise imaplib.IMAP4.error(f"IDLE terminou com erro: {line!r}")
+        return woke
+
+    def _read_line(self, timeout: float) -> Optional[bytes]:
+        """
+        Próxima linha pelo próprio imaplib (`conn.readline`, mesmo buffer dos outros comandos);
+        None se nada chegou em `timeout`. A espera é feita antes, sem timeout no socket,
+        porque um timeout no meio da leitura inutiliza o arquivo do imaplib.
+        """
+        if not self._buffered():
+            ready, _, _ = select.select([self.conn.sock], [], [], timeout)
+            if not ready:
+                return None
+        sock = self.conn.sock
+        previous = sock.gettimeout()
+        sock.settimeout(_IDLE_REPLY_TIMEOUT)
+        try:
+            line = self.conn.readline()
+        except socket.timeout:
+            raise imaplib.IMAP4.abort("linha incompleta do servidor durante IDLE")
+        finally:
+            sock.settimeout(previous)
+        if not line:
+            raise imaplib.IMAP4.abort("conexão encerrada pelo servidor durante IDLE")
+        return line.rstrip(b"\r\n")
 
+    def _buffered(self) -> bool:
+        """Há bytes já recebidos (buffer do imaplib ou registro SSL decifrado) que o select não enxerga?"""
+        sock = self.conn.sock
+        previous = sock.gettimeout()
+        sock.settimeout(0)
         try:
-            status, resp = self.conn.store(msg_id, "+FLAGS", "\\Seen")
-            print(f"[DEBUG] store +FLAGS \\Seen -> {status}, {resp}")
-        except Exception as e:
-            print(f"[WARN] Não conseguiu marcar como lido: {e}")
+            return bool(self.conn.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(previous)
@@ -0,0 +1,214 @@
+"""
+Parser mínimo das respostas FETCH do IMAP (RFC 3501) no formato devolvido pelo imaplib:
+uma lista em que literais aparecem como tuplas (prefixo terminando em {n}, bytes do literal).
+"""
+import base64
+import binascii
+import quopri
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_LITERAL_RE = re.compile(rb"\{(\d+)\}$")
+_ATOM_END = b" ()\r\n"
+
+
+class _Literal(bytes):
+    """Marca bytes que vieram de um literal {n} (não passam pelo tokenizer)."""
+
+
+class _Atom(bytes):
+    """Átomo (não-string) do protocolo."""
+
+
+_OPEN, _CLOSE = object(), object()
+
+
+def _segments(data: Iterable) -> List[bytes]:
+    out: List[bytes] = []
+    for item in data:
+        if item is None:
+            continue
+        if isinstance(item, tuple):
+            prefix, literal = item[0], item[1]
+            out.append(_LITERAL_RE.sub(b"", prefix))
+            out.append(_Literal(literal))
+        else:
+            out.append(item)
+    return out
+
+
+def _tokenize(segments: List[bytes]) -> List:
+    tokens: List = []
+    for seg in segments:
+        if isinstance(seg, _Literal):
+            tokens.append(bytes(seg))
+            continue
+        i, n = 0, len(seg)
+        while i < n:
+            c = seg[i:i + 1]
+            if c in (b" ", b"\r", b"\n"):
+                i += 1
+            elif c == b"(":
+                tokens.append(_OPEN)
+                i += 1
+            elif c == b")":
+                tokens.append(_CLOSE)
+                i += 1
+            elif c == b'"':
+                j, buf = i + 1, bytearray()
+                while j < n and seg[j:j + 1] != b'"':
+                    if seg[j:j + 1] == b"\\":
+                        j += 1
+                    buf += seg[j:j + 1]
+                    j += 1
+                tokens.append(bytes(buf))
+                i = j + 1
+            else:
+                j = i
+                depth = 0
+                # átomos como BODY[HEADER.FIELDS (SUBJECT FROM)]<0> contêm espaços/parênteses
+                while j < n and (depth or seg[j:j + 1] not in _ATOM_END):
+                    if seg[j:j + 1] == b"[":
+                        depth += 1
+                    elif seg[j:j + 1] == b"]":
+                        depth -= 1
+                    j += 1
+                atom = seg[i:j]
+                tokens.append(None if atom.upper() == b"NIL" else _Atom(atom))
+                i = j
+    return tokens
+
+
+def _nest(tokens: List) -> List:
+    stack: List[List] = [[]]
+    for tok in tokens:
+        if tok is _OPEN:
+            stack.append([])
+        elif tok is _CLOSE:
+            inner = stack.pop()
+            stack[-1].append(inner)
+        else:
+            stack[-1].append(tok)
+    return stack[0]
+
+
+def _text(value) -> str:
+    return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else str(value or "")
+
+
+def parse_fetch(data: Iterable) -> List[Tuple[int, Dict[str, object]]]:
+    """
+    Converte a resposta de FETCH em [(seq, {ITEM: valor})].
+    Chaves em maiúsculas sem o <offset> parcial: "UID", "BODYSTRUCTURE", "BODY[1]".
+    """
+    nested = _nest(_tokenize(_segments(data)))
+    out = []
+    # o imaplib entrega "<seq> (ITEM valor ...)" — o "* " e o "FETCH" já foram removidos
+    for tok, items in zip(nested, nested[1:]):
+        if not (isinstance(tok, _Atom) and tok.isdigit() and isinstance(items, list)):
+            continue
+        d: Dict[str, object] = {}
+        for k in range(0, len(items) - 1, 2):
+            key = re.sub(r"<\d+>$", "", _text(items[k]).upper())
+            d[key] = items[k + 1]
+        out.append((int(tok), d))
+    return out
+
+
+def compress_uids(uids: Iterable[int]) -> str:
+    """[1,2,3,7,9,10] → '1:3,7,9:10' (message set compacto)."""
+    nums = sorted(set(int(u) for u in uids))
+    out = []
+    i = 0
+    while i < len(nums):
+        j = i
+        while j + 1 < len(nums) and nums[j + 1] == nums[j] + 1:
+            j += 1
+        out.append(str(nums[i]) if i == j else f"{nums[i]}:{nums[j]}")
+        i = j + 1
+    return ",".join(out)
+
+
+class BodyPart:
+    __slots__ = ("section", "ctype", "charset", "encoding", "size", "disposition", "filename")
+
+    def __init__(self, section, ctype, charset, encoding, size, disposition, filename):
+        self.section = section
+        self.ctype = ctype
+        self.charset = charset
+        self.encoding = encoding
+        self.size = size
+        self.disposition = disposition
+        self.filename = filename
+
+    def __repr__(self):
+        return f"BodyPart({self.section}, {self.ctype}, {self.encoding}, {self.size}, {self.disposition})"
+
+
+def _params(value) -> Dict[str, str]:
+    if not isinstance(value, list):
+        return {}
+    return {_text(value[k]).lower(): _text(value[k + 1]) for k in range(0, len(value) - 1, 2)}
+
+
+def walk_bodystructure(bs, prefix: str = "") -> List[BodyPart]:
+    """Lista as partes folha de um BODYSTRUCTURE com o número de seção de cada uma."""
+    if not isinstance(bs, list) or not bs:
+        return []
+    if isinstance(bs[0], list):
+        parts: List[BodyPart] = []
+        n = 0
+        for child in bs:
+            if not isinstance(child, list):
+                break  # subtype + extensões do multipart
+            n += 1
+            parts.extend(walk_bodystructure(child, f"{prefix}.{n}" if prefix else str(n)))
+        return parts
+
+    ctype = f"{_text(bs[0])}/{_text(bs[1])}".lower()
+    params = _params(bs[2]) if len(bs) > 2 else {}
+    encoding = _text(bs[5]).lower() if len(bs) > 5 and bs[5] else "7bit"
+    size = int(_text(bs[6])) if len(bs) > 6 and bs[6] and _text(bs[6]).isdigit() else 0
+    # extensões: text/* tem "lines" extra; message/rfc822 tem envelope+body+lines
+    if ctype.startswith("text/"):
+        ext = 8
+    elif ctype == "message/rfc822":
+        ext = 10
+    else:
+        ext = 7
+    disposition, filename = None, None
+    dsp = bs[ext + 1] if len(bs) > ext + 1 else None
+    if isinstance(dsp, list) and dsp:
+        disposition = _text(dsp[0]).lower()
+        filename = _params(dsp[1] if len(dsp) > 1 else None).get("filename")
+    filename = filename or params.get("name")
+    return [BodyPart(prefix or "1", ctype, params.get("charset"), encoding, size, disposition, filename)]
+
+
+def pick_text_part(parts: List[BodyPart]) -> Optional[BodyPart]:
+    """Primeiro text/plain fora de anexo; senão o primeiro text/html."""
+    inline = [p for p in parts if p.disposition != "attachment"]
+    for ctype in ("text/plain", "text/html"):
+        for p in inline:
+            if p.ctype == ctype:
+                return p
+    return None
+
+
+def decode_part(raw: bytes, encoding: str, charset: Optional[str]) -> str:
+    """Decodifica o conteúdo da parte (tolerante a corte pelo limite de bytes)."""
+    raw = raw or b""
+    enc = (encoding or "").lower()
+    if enc == "base64":
+        compact = re.sub(rb"[^A-Za-z0-9+/=]", b"", raw)
+        compact = compact[: len(compact) - len(compact) % 4]
+        try:
+            raw = base64.b64decode(compact)
+        except (binascii.Error, ValueError):
+            raw = b""
+    elif enc == "quoted-printable":
+        raw = quopri.decodestring(raw)
+    try:
+        return raw.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app.infrastructure.email_sources.imap_service import ImapService
+
+
+def account_key(user: str, host: str) -> str:
+    return f"{user}@{host}"
+
+
+def mailbox_key(user: str, host: str, mailbox: str) -> str:
+    return f"{account_key(user, host)}/{mailbox}"
+
+
+class _AccountSlots:
+    """Semáforo de conexões de uma conta, com contagem de uso para o /imap/stats."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._sem = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.in_use = 0
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        if not self._sem.acquire(timeout=timeout):
+            return False
+        with self._lock:
+            self.in_use += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_use -= 1
+        self._sem.release()
+
+
+class ImapRegistry:
+    """
+    Registro de vários ImapService, chaveados por conta (user@host) + caixa.
+    - sincronizações rodam num pool compartilhado de `max_workers` threads
+    - cada sincronização abre `classify_workers` + 2 threads de estágio (classificar, gravar, mover;
+      a busca roda na thread do pool), definido aqui para todas as caixas. Teto de threads de
+      sincronização: `max_workers` × (`classify_workers` + 3), em `stats()["max_sync_threads"]`;
+      fora disso só a thread de espera (IDLE/polling) de cada caixa
+    - cada conta tem no máximo `max_connections_per_account` conexões abertas;
+      se a conta tiver mais caixas que conexões, todas passam a polling com a
+      conexão devolvida entre ciclos (nenhuma caixa fica presa sem vaga em IDLE)
+    """
+
+    def __init__(self, max_workers: int = 8, max_connections_per_account: int = 10, classify_workers: int = 4):
+        self.max_connections_per_account = max_connections_per_account
+        self.classify_workers = max(1, classify_workers)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="imap-sync")
+        self._services: Dict[str, ImapService] = {}
+        self._slots: Dict[str, _AccountSlots] = {}
+        self._accounts: Dict[str, str] = {}  # chave da caixa -> chave da conta
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+        self._retired = {"syncs": 0, "processed": 0, "errors": 0}  # caixas já removidas
+        self.max_workers = max_workers
+
+    def add(self, key: str, account: str, factory: Callable[..., ImapService], replace: bool = False) -> ImapService:
+        """
+        Registra e inicia um serviço. `factory(executor=..., connection_slots=..., classify_workers=...)`
+        monta o ImapService.
+        Levanta KeyError se a chave já existe e `replace` é False.
+        """
+        with self._lock:
+            if key in self._services and not replace:
+                raise KeyError(key)
+            old = self._services.pop(key, None)
+        if old is not None:
+            old.stop()
+            with self._lock:
+                for name in self._retired:
+                    self._retired[name] += old.stats[name]
+
+        with self._lock:
+            slots = self._slots.setdefault(account, _AccountSlots(self.max_connections_per_account))
+            svc = factory(executor=self._executor, connection_slots=slots, classify_workers=self.classify_workers)
+            self._services[key] = svc
+            self._accounts[key] = account
+            self._rebalance(account)
+        svc.start()
+        return svc
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            svc = self._services.pop(key, None)
+            account = self._accounts.pop(key, None)
+            if account is not None:
+                self._rebalance(account)
+        if svc is None:
+            return False
+        svc.stop()
+        with self._lock:
+            for name in self._retired:
+                self._retired[name] += svc.stats[name]
+        return True
+
+    def get(self, key: str) -> Optional[ImapService]:
+        return self._services.get(key)
+
+    def keys(self) -> List[str]:
+        return list(self._services)
+
+    def stop_all(self):
+        for key in list(self._services):
+            self.remove(key)
+        self._executor.shutdown(wait=True)
+
+    def _rebalance(self, account: str):
+        keys = [k for k, a in self._accounts.items() if a == account]
+        persistent = len(keys) <= self.max_connections_per_account
+        for k in keys:
+            svc = self._services[k]
+            if svc.persistent != persistent:
+                svc.persistent = persistent
+                svc.wake()
+
+    def status(self, key: str) -> Optional[dict]:
+        svc = self._services.get(key)
+        if svc is None:
+            return None
+        return {
+            "id": key,
+            "status": "running" if svc.is_running else "stopped",
+            "account": self._accounts.get(key),
+            "host": svc.source.host,
+            "mailbox": svc.source.mailbox,
+            "profile_id": svc.profile_id,
+            "interval": svc.interval,
+            "mode": svc.mode,
+            "persistent": svc.persistent,
+            **svc.stats,
+            "pipeline": svc.pipeline_stats(),
+        }
+
+    def stats(self) -> dict:
+        """Contadores agregados de throughput de todas as caixas."""
+        services = list(self._services.values())
+        totals = {
+            name: base + sum(s.stats[name] for s in services) for name, base in self._retired.items()
+        }
+        uptime = max(time.time() - self._started_at, 1e-9)
+        return {
+            "mailboxes": len(services),
+            "running": sum(1 for s in services if s.is_running),
+            "idle": sum(1 for s in services if s.mode == "idle"),
+            **totals,
+            "emails_per_min": round(totals["processed"] / uptime * 60, 2),
+            "max_workers": self.max_workers,
+            "max_sync_threads": self.max_workers * (self.classify_workers + 3),
+            "connections": {a: {"in_use": s.in_use, "limit": s.limit} for a, s in self._slots.items()},
+        }
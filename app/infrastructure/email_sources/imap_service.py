@@ -1,27 +1,65 @@
 import threading
+import time
 from app.application.use_cases.sync_emails import SyncEmailsUseCase
 from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.email_sources.imap_adapter import IDLE_REFRESH_SECONDS
 
 
 class ImapService:
-    def __init__(self, source, classifier, repo, profile_id, interval=60):
+    """
+    Worker IMAP em thread própria.
+    - modo "idle" (padrão quando o servidor anuncia IDLE): sincroniza, entra em IDLE na mesma
+      conexão e acorda em EXISTS/RECENT; o IDLE é reemitido a cada `idle_timeout` s
+    - modo "poll": sincroniza a cada `interval` s (também usado como fallback)
+    - `executor` (opcional): a sincronização roda num pool compartilhado; a thread só espera
+    - `connection_slots` (opcional): semáforo da conta; a conexão só fica aberta com uma vaga.
+      Com `persistent=False` a vaga (e a conexão) é devolvida entre ciclos de polling.
+    """
+
+    def __init__(self, source, classifier, repo, profile_id, interval=60, use_idle=True,
+                 idle_timeout=IDLE_REFRESH_SECONDS, executor=None, connection_slots=None,
+                 classify_workers=4, queue_size=32, checkpoints=None, checkpoint_key=None, backlog=None,
+                 prices=None, max_attempts=3):
         self.source = source
         self.classifier = classifier
         self.repo = repo
         self.profile_id = profile_id
         self.interval = interval
+        self.use_idle = use_idle
+        self.idle_timeout = idle_timeout
+        self.executor = executor
+        self.connection_slots = connection_slots
+        self.classify_workers = classify_workers
+        self.queue_size = queue_size
+        self.checkpoints = checkpoints
+        self.checkpoint_key = checkpoint_key
+        self.backlog = backlog
+        self.prices = prices
+        self.max_attempts = max_attempts
+        self._use_case: SyncEmailsUseCase | None = None
+        self.persistent = True
+        self.mode: str | None = None
+        self.stats = {"syncs": 0, "processed": 0, "errors": 0, "last_sync_at": None, "last_error": None}
+        self._holding_slot = False
         self._stop_event = threading.Event()
+        self._wake = threading.Event()  # interrompe o IDLE (stop ou mudança de modo)
         self._thread: threading.Thread | None = None
         self.tokenizer = SimpleTokenizer(lang="auto")
 
     def start(self):
         if not self._thread or not self._thread.is_alive():
             self._stop_event.clear()
+            self._wake.clear()
             self._thread = threading.Thread(target=self._worker, daemon=True)
             self._thread.start()
 
+    def wake(self):
+        """Sai do IDLE atual para reavaliar o modo (ex.: registro mudou `persistent`)."""
+        self._wake.set()
+
     def stop(self):
         self._stop_event.set()
+        self._wake.set()
         if self._thread:
             self._thread.join()
             self._thread = None
@@ -34,17 +72,93 @@ class ImapService:
             repo=self.repo,
             profile_id=self.profile_id,
             tokenizer=self.tokenizer,
+            classify_workers=self.classify_workers,
+            queue_size=self.queue_size,
+            checkpoints=self.checkpoints,
+            checkpoint_key=self.checkpoint_key,
+            backlog=self.backlog,
+            prices=self.prices,
+            max_attempts=self.max_attempts,
         )
+        self._use_case = use_case
 
         while not self._stop_event.is_set():
+            if not self._acquire_slot():
+                break
+            if not self._sync(use_case):
+                self._release_connection()
+                self._stop_event.wait(self.interval)
+                continue
+            if self.persistent:
+                self._wait_for_mail()
+            else:
+                # conta com mais caixas que conexões: devolve a vaga entre ciclos
+                self.mode = "poll"
+                self._release_connection()
+                self._stop_event.wait(self.interval)
+
+        self._release_connection()
+
+    def _sync(self, use_case) -> bool:
+        try:
+            print("[DEBUG] Chamando use_case.run()")
+            if self.executor is not None:
+                processed = self.executor.submit(use_case.run, stop_event=self._stop_event).result()
+            else:
+                processed = use_case.run(stop_event=self._stop_event)   # <-- passa o evento
+        except Exception as e:
+            import traceback
+            print("[ERROR] Falha no use_case.run():")
+            traceback.print_exc()
+            self.stats["errors"] += 1
+            self.stats["last_error"] = str(e)
+            return False
+        self.stats["syncs"] += 1
+        self.stats["processed"] += processed or 0
+        self.stats["last_sync_at"] = time.time()
+        return True
+
+    def _wait_for_mail(self):
+        """Bloqueia até haver e-mail novo (IDLE) ou até o próximo ciclo de polling."""
+        if self.use_idle and hasattr(self.source, "idle"):
             try:
-                print("[DEBUG] Chamando use_case.run()")
-                use_case.run(stop_event=self._stop_event)   # <-- passa o evento
-            except Exception:
-                import traceback
-                print("[ERROR] Falha no use_case.run():")
-                traceback.print_exc()
-            self._stop_event.wait(self.interval)
+                if self.source.supports_idle():
+                    self.mode = "idle"
+                    woke = self.source.idle(timeout=self.idle_timeout, stop_event=self._wake)
+                    self._wake.clear()
+                    print(f"[DEBUG] IDLE -> {'novo e-mail' if woke else 'timeout/parada'}")
+                    return
+                if self.mode != "poll":
+                    print("[WARN] Servidor sem IDLE, usando polling")
+            except Exception as e:
+                print(f"[WARN] IDLE falhou, voltando ao polling neste ciclo: {e}")
+                self._reset_connection()
+        self.mode = "poll"
+        self._stop_event.wait(self.interval)
+
+    def _acquire_slot(self) -> bool:
+        """Espera uma vaga de conexão da conta (checando o stop_event); False se parado."""
+        if self.connection_slots is None or self._holding_slot:
+            return True
+        while not self._stop_event.is_set():
+            if self.connection_slots.acquire(timeout=1.0):
+                self._holding_slot = True
+                return True
+        return False
+
+    def _release_connection(self):
+        self._reset_connection()
+        if self._holding_slot:
+            self._holding_slot = False
+            self.connection_slots.release()
+
+    def _reset_connection(self):
+        if hasattr(self.source, "disconnect"):
+            self.source.disconnect()
+
+    def pipeline_stats(self) -> dict | None:
+        """Profundidade das filas e contadores de cada estágio da sincronização."""
+        return self._use_case.stats() if self._use_case else None
 
     @property
     def is_running(self) -> bool:
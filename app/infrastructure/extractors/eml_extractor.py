@@ -1,24 +1,132 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from email import policy
-from email.parser import BytesParser
-from bs4 import BeautifulSoup
+from email.parser import BytesParser, BytesHeaderParser
+from io import BytesIO
+from typing import BinaryIO, List, Optional
+
+from app.domain.entities import AttachmentText, ClassificationResult, ExtractedDocument
+from app.infrastructure.classifiers.header_triage import triage_headers
+from app.infrastructure.extractors.html_text import get_html_converter
+
+# limite de leitura do bloco de cabeçalhos na pré-triagem
+_MAX_HEADER_BYTES = 256 * 1024
+
+
+def _open(source) -> BinaryIO:
+    return BytesIO(source) if isinstance(source, (bytes, bytearray)) else source.open()
+
+
+def _header_block(fp: BinaryIO) -> bytes:
+    """Lê só até a linha em branco que separa cabeçalhos do corpo."""
+    buf = b""
+    while len(buf) < _MAX_HEADER_BYTES:
+        chunk = fp.read(8192)
+        if not chunk:
+            break
+        buf += chunk
+        for sep in (b"\r\n\r\n", b"\n\n"):
+            end = buf.find(sep)
+            if end >= 0:
+                return buf[:end + len(sep)]
+    return buf
+
+
+def _attachment_kind(part) -> Optional[str]:
+    ctype = part.get_content_type()
+    name = (part.get_filename() or "").lower()
+    if ctype == "application/pdf" or name.endswith(".pdf"):
+        return "pdf"
+    if name.endswith(".txt") or (ctype == "text/plain" and part.get_content_disposition() == "attachment"):
+        return "txt"
+    return None
+
 
 class EmlExtractor:
-    def extract(self, raw_bytes: bytes) -> str:
-        msg = BytesParser(policy=policy.default).parsebytes(raw_bytes)
+    """
+    Texto de .eml: corpo (text/plain, senão HTML) e, opcionalmente, anexos PDF/TXT.
+    Anexos vão para os extratores de PDF/TXT em paralelo, com limites por e-mail
+    (quantidade, bytes somados e tempo total); o texto deles fica separado do corpo.
+    O tempo total vale dentro de cada job: o PDF recebe só o que sobrou do prazo e é
+    interrompido no processo de extração, não só abandonado.
+    """
+
+    def __init__(
+        self,
+        header_triage: bool = True,
+        html_converter: str = "fast",
+        html_max_chars: Optional[int] = None,
+        pdf_extractor=None,
+        txt_extractor=None,
+        attachments: bool = False,
+        max_attachments: int = 5,
+        max_attachment_bytes: int = 10 * 1024 * 1024,
+        attachments_timeout_s: float = 20.0,
+        attachment_workers: int = 4,
+    ):
+        self.header_triage = header_triage
+        # "fast" (streaming, sem DOM) ou "bs4"; limite de caracteres por parte HTML
+        self._html = get_html_converter(html_converter)
+        self.html_converter = html_converter
+        self.html_max_chars = html_max_chars
+        self._pdf = pdf_extractor
+        self._txt = txt_extractor
+        self.attachments = attachments and bool(pdf_extractor or txt_extractor)
+        self.max_attachments = max_attachments
+        self.max_attachment_bytes = max_attachment_bytes
+        self.attachments_timeout_s = attachments_timeout_s
+        self.attachment_workers = attachment_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def cache_version(self) -> str:
+        version = f"eml-2/html={self.html_converter}/chars={self.html_max_chars}"
+        if self.attachments:
+            pdf = getattr(self._pdf, "cache_version", "-")
+            version += f"/att={self.max_attachments}:{self.max_attachment_bytes}:{pdf}"
+        return version
+
+    def close(self):
+        with self._executor_lock:
+            ex, self._executor = self._executor, None
+        if ex:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    def triage(self, source) -> Optional[ClassificationResult]:
+        """Pré-triagem só pelos cabeçalhos (o corpo nem é lido)."""
+        if not self.header_triage:
+            return None
+        with _open(source) as fp:
+            headers = BytesHeaderParser(policy=policy.default).parsebytes(_header_block(fp))
+        return triage_headers(headers)
+
+    def extract(self, source) -> str:
+        return self.extract_document(source).text
+
+    def extract_document(self, source) -> ExtractedDocument:
+        # bytes ou upload em spool: o parser lê o arquivo em blocos
+        with _open(source) as fp:
+            msg = BytesParser(policy=policy.default).parse(fp)
 
         texts_plain = []
         texts_html = []
+        attached = []
 
         if msg.is_multipart():
             for part in msg.walk():
                 ctype = part.get_content_type()
                 disp = (part.get_content_disposition() or "").lower()
                 if disp == "attachment":
+                    attached.append(part)
                     continue
                 if ctype == "text/plain":
                     texts_plain.append(part.get_content())
                 elif ctype == "text/html":
                     texts_html.append(self._html_to_text(part.get_content()))
+                elif _attachment_kind(part):
+                    attached.append(part)  # PDF inline (sem disposition) também conta como anexo
         else:
             ctype = msg.get_content_type()
             if ctype == "text/plain":
@@ -31,11 +139,69 @@ class EmlExtractor:
             text = "\n\n".join(t.strip() for t in texts_html if t and t.strip())
 
         text = self._strip_signature_and_quotes(text)
-        return text.strip()
+        attachments = self._extract_attachments(attached) if self.attachments else []
+        return ExtractedDocument(text=text.strip(), attachments=attachments)
+
+    # --- anexos ---
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # threads só esperam: o PDF roda no pool de processos do PdfExtractor
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.attachment_workers, thread_name_prefix="eml-attachments",
+                )
+            return self._executor
+
+    def _extract_attachments(self, parts) -> List[AttachmentText]:
+        results: List[AttachmentText] = []
+        jobs = []  # (resultado, extrator, bytes)
+        budget = self.max_attachment_bytes
+
+        for part in parts:
+            kind = _attachment_kind(part)
+            if not kind or (kind == "pdf" and not self._pdf) or (kind == "txt" and not self._txt):
+                continue  # tipos não suportados nem aparecem no resultado
+            att = AttachmentText(filename=part.get_filename(), content_type=part.get_content_type())
+            results.append(att)
+            if len(jobs) >= self.max_attachments:
+                att.error = "limite de anexos"
+                continue
+            payload = part.get_payload(decode=True) or b""
+            if len(payload) > budget:
+                att.error = "limite de bytes"
+                continue
+            budget -= len(payload)
+            jobs.append((att, self._pdf if kind == "pdf" else self._txt, payload))
+
+        if not jobs:
+            return results
+
+        executor = self._get_executor()
+        deadline = time.monotonic() + self.attachments_timeout_s
+        futures = {executor.submit(self._run_job, ext, payload, deadline): att for att, ext, payload in jobs}
+        done, pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for fut in pending:
+            fut.cancel()
+            futures[fut].error = "tempo limite"
+        for fut in done:
+            att = futures[fut]
+            try:
+                att.text = (fut.result() or "").strip()
+            except Exception as e:  # BadRequest dos extratores vira erro do anexo, não do e-mail
+                att.error = str(e) or type(e).__name__
+        return results
+
+    def _run_job(self, ext, payload: bytes, deadline: float) -> str:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("tempo limite")  # ficou na fila além do prazo do e-mail
+        if ext is self._pdf:
+            return ext.extract(payload, timeout_s=remaining)
+        return ext.extract(payload)
 
     def _html_to_text(self, html: str) -> str:
-        soup = BeautifulSoup(html or "", "html.parser")
-        return soup.get_text(separator="\n")
+        return self._html(html, self.html_max_chars)
 
     def _strip_signature_and_quotes(self, text: str) -> str:
         lines = (text or "").splitlines()
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class ExtractionCache:
+    """
+    Cache de texto extraído de uploads, endereçado por conteúdo:
+    chave = sha256(bytes) + versão do extrator (mudou a versão/limites → chave nova).
+    - memória: LRU limitado em bytes de texto
+    - disco (opcional): um arquivo zlib por chave; despeja os menos usados (mtime) acima do limite
+    """
+
+    def __init__(self, max_memory_bytes: int = 64 * 1024 * 1024, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._mem: "OrderedDict[str, str]" = OrderedDict()
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "evictions": 0}
+        self._dir = Path(disk_dir) if disk_dir else None
+        self._disk_bytes = 0
+        if self._dir:
+            self._dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(p.stat().st_size for p in self._dir.glob("*/*.z"))
+
+    @staticmethod
+    def key(raw: bytes, version: str) -> str:
+        return ExtractionCache.key_for_digest(hashlib.sha256(raw).hexdigest(), version)
+
+    @staticmethod
+    def key_for_digest(sha256_hex: str, version: str) -> str:
+        # upload em spool já traz o sha256 calculado durante a leitura
+        return f"{sha256_hex}-{hashlib.sha1(version.encode()).hexdigest()[:8]}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    # --- memória ---
+
+    def _mem_put(self, key: str, text: str):
+        size = len(text.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._mem.pop(key, None)
+            if old is not None:
+                self._mem_bytes -= len(old.encode("utf-8"))
+            self._mem[key] = text
+            self._mem_bytes += size
+            while self._mem_bytes > self.max_memory_bytes:
+                _, evicted = self._mem.popitem(last=False)
+                self._mem_bytes -= len(evicted.encode("utf-8"))
+                self._counters["evictions"] += 1
+
+    # --- disco ---
+
+    def _path(self, key: str) -> Path:
+        return self._dir / key[:2] / f"{key}.z"
+
+    def _disk_get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mtime = último uso (ordem do despejo)
+            return zlib.decompress(data).decode("utf-8")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[WARN] Cache de extração: entrada ilegível {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _disk_put(self, key: str, text: str):
+        path = self._path(key)
+        data = zlib.compress(text.encode("utf-8"), 6)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)  # escrita atômica: leitores nunca veem arquivo pela metade
+        except OSError as e:
+            print(f"[WARN] Cache de extração: falha ao gravar em disco: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for p in self._dir.glob("*/*.z"):
+            try:
+                st = p.stat()
+                entries.append((st.st_mtime, st.st_size, p))
+            except FileNotFoundError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        # despeja até 90% do limite para não varrer o diretório a cada gravação
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= target:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            self._count("evictions")
+        with self._lock:
+            self._disk_bytes = total
+
+    # --- API ---
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._mem.get(key)
+            if text is not None:
+                self._mem.move_to_end(key)
+                self._counters["hits_memory"] += 1
+                return text
+        if self._dir:
+            text = self._disk_get(key)
+            if text is not None:
+                self._count("hits_disk")
+                self._mem_put(key, text)
+                return text
+        self._count("misses")
+        return None
+
+    def put(self, key: str, text: str):
+        self._mem_put(key, text)
+        if self._dir:
+            self._disk_put(key, text)
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = dict(self._counters)
+            lookups = c["hits_memory"] + c["hits_disk"] + c["misses"]
+            return {
+                **c,
+                "hit_rate": round((c["hits_memory"] + c["hits_disk"]) / lookups, 3) if lookups else None,
+                "memory_entries": len(self._mem),
+                "memory_bytes": self._mem_bytes,
+                "disk_bytes": self._disk_bytes if self._dir else None,
+            }
@@ -0,0 +1,99 @@
+"""
+Conversão HTML → texto para partes de e-mail.
+- "fast": uma passada com html.parser (stdlib), sem montar DOM; descarta <style>/<script>/<title>
+  e comentários, colapsa espaços e para de ler ao atingir `max_chars`
+- "bs4": caminho original (BeautifulSoup.get_text), mantido para comparação/fallback
+"""
+import re
+from html.parser import HTMLParser
+from typing import Callable, List, Optional
+
+_SKIP_TAGS = {"style", "script", "title", "noscript", "template", "svg"}
+_BLOCK_TAGS = {
+    "br", "p", "div", "tr", "li", "ul", "ol", "table", "section", "article", "header", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "hr", "center",
+}
+_SPACES = re.compile(r"[ \t\r\f\v\u00a0\u200c\u200b]+")
+_CHUNK = 32 * 1024
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self, max_chars: Optional[int]):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self.skip = 0
+        self.line_open = False  # já há texto na linha atual
+
+    @property
+    def full(self) -> bool:
+        return self.max_chars is not None and self.size >= self.max_chars
+
+    def _newline(self):
+        if self.line_open:
+            self.parts.append("\n")
+            self.size += 1
+            self.line_open = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self.skip += 1
+        elif tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self.skip or self.full:
+            return
+        for i, line in enumerate(data.split("\n")):
+            if i:
+                self._newline()
+            text = _SPACES.sub(" ", line).strip()
+            if not text:
+                continue
+            if self.line_open:
+                text = " " + text
+            self.parts.append(text)
+            self.size += len(text)
+            self.line_open = True
+
+
+def fast_html_to_text(html: str, max_chars: Optional[int] = None) -> str:
+    parser = _TextCollector(max_chars)
+    html = html or ""
+    # alimenta em blocos para parar cedo em HTML gigante quando o limite já foi atingido
+    for i in range(0, len(html), _CHUNK):
+        parser.feed(html[i:i + _CHUNK])
+        if parser.full:
+            break
+    else:
+        parser.close()
+    text = "".join(parser.parts).strip()
+    return text[:max_chars] if max_chars is not None else text
+
+
+def bs4_html_to_text(html: str, max_chars: Optional[int] = None) -> str:
+    from bs4 import BeautifulSoup
+
+    text = BeautifulSoup(html or "", "html.parser").get_text(separator="\n")
+    return text[:max_chars] if max_chars is not None else text
+
+
+HTML_CONVERTERS = {"fast": fast_html_to_text, "bs4": bs4_html_to_text}
+
+
+def get_html_converter(name: str) -> Callable[..., str]:
+    try:
+        return HTML_CONVERTERS[(name or "fast").strip().lower()]
+    except KeyError:
+        raise ValueError(f"Conversor HTML desconhecido: {name!r} (use: {', '.join(HTML_CONVERTERS)})")
@@ -1,22 +1,195 @@
+import multiprocessing
+import threading
+import time
 from io import BytesIO
+from typing import List, Optional, Tuple, Union
+
 from pypdf import PdfReader
 from pypdf.errors import PdfReadError
 from app.domain.ports import TextExtractorPort
 from app.domain.errors import BadRequest
 
+# folga do pai além do prazo cooperativo do filho antes de matar o worker
+_TIMEOUT_GRACE_S = 2.0
+
+
+def _extract_pages(src: Union[bytes, str], max_pages: int, max_chars: int, deadline_s: float) -> Tuple[str, int]:
+    """
+    Roda no processo filho: extrai página a página e para cedo ao atingir
+    `max_chars` (texto suficiente para classificar), `max_pages` ou o prazo.
+    `src` são os bytes ou o caminho do upload em disco (o filho abre o arquivo; nada é copiado via pickle).
+    Devolve (texto, páginas lidas).
+    """
+    start = time.monotonic()
+    with (open(src, "rb") if isinstance(src, str) else BytesIO(src)) as buf:
+        reader = PdfReader(buf, strict=False)
+        parts, chars, read = [], 0, 0
+        for page in reader.pages:
+            if read >= max_pages or chars >= max_chars:
+                break
+            if read and time.monotonic() - start > deadline_s:
+                break  # devolve o que já tem em vez de estourar o timeout
+            text = page.extract_text() or ""
+            parts.append(text)
+            chars += len(text) + 1
+            read += 1
+    return "\n".join(parts).strip()[:max_chars], read
+
+
+def _serve(conn):
+    """Laço do worker: recebe os argumentos de `_extract_pages`, devolve ("ok", resultado) ou ("error", exceção)."""
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        if args is None:
+            return
+        try:
+            reply = ("ok", _extract_pages(*args))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception as e:  # exceção que não passa por pickle
+            conn.send(("error", RuntimeError(str(e))))
+
+
+class _Worker:
+    """Processo dedicado com um Pipe próprio: dá para matar só ele quando estoura o prazo."""
+
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_serve, args=(child,), daemon=True, name="pdf-extract")
+        self.proc.start()
+        child.close()
+
+    def run(self, args, timeout: float):
+        """Levanta TimeoutError no prazo e EOFError/OSError se o processo morreu."""
+        self.conn.send(args)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.join(1)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.proc.join(1)
+        if self.proc.is_alive():
+            self.proc.kill()
+        self.conn.close()
+
+
 class PdfExtractor(TextExtractorPort):
-    def extract(self, raw_bytes: bytes) -> str:
+    """
+    Extração de PDF fora da thread da requisição, em processos dedicados (sem segurar o GIL).
+    Até `workers` extrações simultâneas; cada uma usa um processo só seu, reaproveitado entre
+    documentos. Estouro de prazo mata apenas o processo daquele documento.
+    Orçamentos por documento: bytes, páginas, caracteres (MAX_BODY_CHARS) e tempo.
+    `workers=0` extrai no próprio processo (mesmos limites, exceto o timeout rígido).
+    """
+
+    def __init__(
+        self,
+        max_pages: int = 50,
+        max_bytes: int = 20 * 1024 * 1024,
+        max_chars: int = 8000,
+        timeout_s: float = 15.0,
+        workers: int = 2,
+    ):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.timeout_s = timeout_s
+        self.workers = workers
+        # spawn: o processo da API tem threads (fork herdaria locks travados)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._idle: List[_Worker] = []
+        self._idle_lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def cache_version(self) -> str:
+        # entra na chave do cache de extração: mudar limites invalida o texto já extraído
+        return f"pdf-1/pages={self.max_pages}/chars={self.max_chars}"
+
+    def _checkout(self) -> _Worker:
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop()
+        return _Worker(self._ctx)
+
+    def _checkin(self, worker: _Worker):
+        with self._idle_lock:
+            if not self._closed:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def _run(self, args, timeout: float):
+        deadline = timeout + _TIMEOUT_GRACE_S
+        started = time.monotonic()
+        # espera por vaga conta no prazo, como antes na fila do pool
+        if not self._slots.acquire(timeout=deadline):
+            raise BadRequest(f"Tempo limite ao ler PDF ({round(timeout, 1):g}s).")
         try:
-            with BytesIO(raw_bytes) as buf:
-                reader = PdfReader(buf, strict=False)
-                parts = []
-                for page in reader.pages:
-                    parts.append(page.extract_text() or "")
-                text = "\n".join(parts).strip()
-                if not text:
-                    raise BadRequest("Não foi possível extrair texto do PDF (parece ser digitalizado).")
-                return text
+            worker = self._checkout()
+            try:
+                status, payload = worker.run(args, max(0.0, deadline - (time.monotonic() - started)))
+            except TimeoutError:
+                worker.kill()  # só este documento; os outros workers seguem
+                raise BadRequest(f"Tempo limite ao ler PDF ({round(timeout, 1):g}s).")
+            except (EOFError, OSError):
+                worker.kill()
+                raise BadRequest("Falha ao ler PDF: processo de extração encerrado.")
+            self._checkin(worker)
+        finally:
+            self._slots.release()
+        if status == "error":
+            raise payload
+        return payload
+
+    def close(self):
+        with self._idle_lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+    def extract(self, source, timeout_s: Optional[float] = None) -> str:
+        """`timeout_s` encurta o prazo deste documento (ex.: o que sobrou do orçamento de anexos do .eml)."""
+        size = len(source) if isinstance(source, (bytes, bytearray)) else source.size
+        if size > self.max_bytes:
+            raise BadRequest(f"PDF acima do limite de {self.max_bytes // (1024 * 1024)} MB.")
+
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                src = bytes(source)
+            elif source.path:
+                src = source.path  # upload em disco: lido direto do arquivo (sem pickle de bytes)
+            else:
+                src = source.read_bytes()
+            timeout = self.timeout_s if timeout_s is None else min(self.timeout_s, timeout_s)
+            args = (src, self.max_pages, self.max_chars, timeout)
+            if self.workers <= 0:
+                text, _ = _extract_pages(*args)
+            else:
+                text, _ = self._run(args, timeout)
+        except BadRequest:
+            raise
         except PdfReadError as e:
             raise BadRequest(f"PDF inválido: {e}")
         except Exception as e:
             raise BadRequest(f"Falha ao ler PDF: {e}")
+
+        if not text:
+            raise BadRequest("Não foi possível extrair texto do PDF (parece ser digitalizado).")
+        return text
@@ -1,6 +1,14 @@
 class TxtExtractor:
-    def extract(self, raw_bytes: bytes) -> str:
+    cache_version = "txt-1"
+
+    def extract(self, source) -> str:
+        if isinstance(source, (bytes, bytearray)):
+            return self._decode(source)
+        with source.view() as buf:  # memoryview/mmap: decodifica sem copiar para bytes
+            return self._decode(buf)
+
+    def _decode(self, buf) -> str:
         try:
-            return raw_bytes.decode("utf-8")
+            return str(buf, "utf-8")
         except UnicodeDecodeError:
-            return raw_bytes.decode("latin-1", errors="ignore")
+            return str(buf, "latin-1", errors="ignore")
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from sqlmodel import SQLModel, Field, Column, JSON
 
 
@@ -80,4 +80,58 @@ class UserModel(SQLModel, table=True):
 
     @classmethod
     def from_entity(cls, user_entity):
-        return cls(**user_entity.__dict__)
\ No newline at end of file
+        return cls(**user_entity.__dict__)
+
+
+class ImapCheckpointModel(SQLModel, table=True):
+    __tablename__ = "imap_checkpoints"
+
+    mailbox_key: str = Field(primary_key=True)  # user@host/caixa
+    uidvalidity: int
+    last_uid: int = 0
+    highest_modseq: Optional[int] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def to_entity(self):
+        from app.domain.entities import MailboxCheckpoint
+        return MailboxCheckpoint(
+            mailbox_key=self.mailbox_key,
+            uidvalidity=self.uidvalidity,
+            last_uid=self.last_uid,
+            highest_modseq=self.highest_modseq,
+            updated_at=self.updated_at,
+        )
+
+
+class LlmBatchJobModel(SQLModel, table=True):
+    __tablename__ = "llm_batch_jobs"
+
+    id: str = Field(primary_key=True)
+    mailbox_key: str = Field(index=True)
+    provider: str
+    provider_job_id: str
+    status: str = Field(default="submitted", index=True)
+    items: Optional[List[Dict[str, Any]]] = Field(default=None, sa_column=Column(JSON))
+    uidvalidity: Optional[int] = None
+    input_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    applied_at: Optional[datetime] = None
+
+    def to_entity(self):
+        from app.domain.entities import LlmBatchJob
+        return LlmBatchJob(
+            id=self.id,
+            mailbox_key=self.mailbox_key,
+            provider=self.provider,
+            provider_job_id=self.provider_job_id,
+            status=self.status,
+            items=list(self.items or []),
+            uidvalidity=self.uidvalidity,
+            input_path=self.input_path,
+            error=self.error,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            applied_at=self.applied_at,
+        )
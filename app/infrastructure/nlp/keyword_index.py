@@ -0,0 +1,94 @@
+import re
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+class KeywordIndex:
+    """
+    Autômato Aho-Corasick sobre palavras.
+    Casa termos de uma ou várias palavras ("nota fiscal") numa única passada
+    pelo texto, sempre respeitando fronteiras de palavra.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: FrozenSet[str] = frozenset(
+            t for t in (" ".join(_words(str(term))) for term in terms) if t
+        )
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for term in self.terms:
+            self._add(term)
+        self._build()
+
+    def _add(self, term: str):
+        state = 0
+        for w in term.split(" "):
+            nxt = self._goto[state].get(w)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][w] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(term)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for w, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and w not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(w, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, text: str) -> Set[str]:
+        """Retorna o conjunto de termos presentes no texto."""
+        hits: Set[str] = set()
+        if not self.terms:
+            return hits
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for w in _words(text):
+            while state and w not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(w, 0)
+            if out[state]:
+                hits.update(out[state])
+        return hits
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+def expand_profile_keywords(profile: dict) -> Set[str]:
+    """
+    Expande keywords + sinônimos do profile:
+    - normaliza tudo para lowercase
+    - combina priority_keywords e keyword_synonyms (se existirem)
+    """
+    base = (profile.get("priority_keywords") or [])
+    syns = (profile.get("keyword_synonyms") or {})
+    expanded = set(map(str.lower, base))
+    for k, arr in syns.items():
+        expanded.add(str(k).lower())
+        for s in arr:
+            expanded.add(str(s).lower())
+    return expanded
+
+
+def compile_profile(profile: dict) -> KeywordIndex:
+    return KeywordIndex(expand_profile_keywords(profile))
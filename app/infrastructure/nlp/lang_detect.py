@@ -0,0 +1,101 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable
+
+# Detector compacto de idioma (pt/en/es) por n-gramas de caracteres.
+# Os perfis são construídos uma única vez a partir de pequenos textos-semente
+# típicos de e-mail corporativo; a detecção olha só um prefixo limitado do texto.
+
+SUPPORTED_LANGS = ("pt", "en", "es")
+DEFAULT_LANG = "pt"
+MAX_PREFIX_CHARS = 1000
+NGRAM_SIZES = (1, 2, 3)
+
+_SEED_TEXTS = {
+    "pt": """
+    olá, bom dia. obrigado pelo contato. segue em anexo a proposta com o orçamento e o prazo
+    de entrega. você pode confirmar a reunião de amanhã? não recebemos a nota fiscal do pedido,
+    por favor envie o boleto para pagamento. estamos à disposição para qualquer dúvida.
+    atenciosamente, equipe comercial. precisamos de uma informação sobre o contrato e a
+    cobrança deste mês. as condições são as mesmas que foram combinadas na última conversa.
+    também gostaríamos de saber se já é possível agendar a visita técnica na próxima semana.
+    isso não está correto, então vamos verificar com o financeiro e retornar ainda hoje.
+    promoção imperdível: aproveite o desconto, frete grátis e cupom exclusivo para você.
+    """,
+    "en": """
+    hi, good morning. thanks for reaching out. please find attached the proposal with the
+    budget and the delivery deadline. could you confirm tomorrow's meeting? we have not
+    received the invoice for the order, please send the bill for payment. we are available
+    for any questions. kind regards, sales team. we need some information about the contract
+    and this month's charges. the terms are the same that were agreed in our last call.
+    we would also like to know whether it is possible to schedule the technical visit next
+    week. this is not right, so we will check with finance and get back to you today.
+    amazing deal: shop the sale now, free shipping and an exclusive coupon just for you.
+    """,
+    "es": """
+    hola, buenos días. gracias por el contacto. adjunto la propuesta con el presupuesto y el
+    plazo de entrega. ¿puede confirmar la reunión de mañana? no hemos recibido la factura del
+    pedido, por favor envíe el comprobante para el pago. quedamos a su disposición para
+    cualquier duda. saludos cordiales, equipo comercial. necesitamos una información sobre el
+    contrato y el cobro de este mes. las condiciones son las mismas que se acordaron en la
+    última llamada. también queremos saber si ya es posible programar la visita técnica la
+    próxima semana. esto no está bien, así que vamos a revisar con finanzas y responder hoy.
+    ¡oferta increíble! aproveche el descuento, envío gratis y un cupón exclusivo para usted.
+    """,
+}
+
+_NON_LETTER_RE = re.compile(r"[^\w]+|\d+|_", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    return " " + _NON_LETTER_RE.sub(" ", (text or "").lower()).strip() + " "
+
+
+def _ngrams(text: str) -> Iterable[str]:
+    for n in NGRAM_SIZES:
+        for i in range(len(text) - n + 1):
+            gram = text[i:i + n]
+            if gram.strip():
+                yield gram
+
+
+class NgramLanguageDetector:
+    """
+    Naive Bayes sobre n-gramas de caracteres (1..3) com suavização de Laplace.
+    Sem dependências externas; analisa no máximo `max_chars` caracteres.
+    """
+
+    def __init__(self, max_chars: int = MAX_PREFIX_CHARS, default: str = DEFAULT_LANG):
+        self.max_chars = max_chars
+        self.default = default
+        self._log_probs: Dict[str, Dict[str, float]] = {}
+        self._unseen: Dict[str, float] = {}
+        vocab = set()
+        counts = {}
+        for lang, seed in _SEED_TEXTS.items():
+            counts[lang] = Counter(_ngrams(_normalize(seed)))
+            vocab.update(counts[lang])
+        for lang, cnt in counts.items():
+            denom = sum(cnt.values()) + len(vocab) + 1
+            self._log_probs[lang] = {g: math.log((c + 1) / denom) for g, c in cnt.items()}
+            self._unseen[lang] = math.log(1 / denom)
+
+    def detect(self, text: str) -> str:
+        sample = _normalize((text or "")[: self.max_chars])
+        if not sample.strip():
+            return self.default
+
+        scores = {lang: 0.0 for lang in SUPPORTED_LANGS}
+        for gram in _ngrams(sample):
+            for lang in SUPPORTED_LANGS:
+                scores[lang] += self._log_probs[lang].get(gram, self._unseen[lang])
+        return max(SUPPORTED_LANGS, key=lambda lang: (scores[lang], lang == self.default))
+
+
+_default_detector = NgramLanguageDetector()
+
+
+def detect_lang(text: str) -> str:
+    """Detecta o idioma (pt/en/es) com o detector compartilhado do processo."""
+    return _default_detector.detect(text)
@@ -1,6 +1,7 @@
 import re
-from langdetect import detect, DetectorFactory
-DetectorFactory.seed = 0  # reproducibilidade
+from typing import Optional
+
+from app.infrastructure.nlp.lang_detect import NgramLanguageDetector
 
 STOP_PT = {"de","da","do","a","o","e","que","em","para","com","um","uma","por","no","na","os","as"}
 STOP_EN = {"the","a","an","and","of","to","in","for","on","with","is","are","be","this","that"}
@@ -10,18 +11,21 @@ class SimpleTokenizer:
     def __init__(self, lang: str = "pt", supported_langs=("pt","en","es")):
         self.lang = lang
         self.supported_langs = supported_langs
+        self._detector = NgramLanguageDetector()
 
     def preprocess(self, text: str) -> str:
         return (text or "").strip().lower()
 
-    def tokenize(self, text: str):
-        lang = self.lang
-        if self.lang == "auto":
-            try:
-                guess = detect(text or "")
-                lang = guess if guess in self.supported_langs else "pt"
-            except Exception:
-                lang = "pt"
+    def detect_lang(self, text: str) -> str:
+        """Idioma fixo do tokenizer ou, em modo 'auto', detectado no prefixo do texto."""
+        if self.lang != "auto":
+            return self.lang
+        guess = self._detector.detect(text)
+        return guess if guess in self.supported_langs else "pt"
+
+    def tokenize(self, text: str, lang: Optional[str] = None):
+        # lang vem do contexto de análise quando já foi detectado (evita detectar de novo)
+        lang = lang or self.detect_lang(text)
 
         tokens = re.findall(r"\b\w+\b", text or "", flags=re.UNICODE)
         stop = STOP_PT if lang == "pt" else STOP_EN if lang == "en" else STOP_ES
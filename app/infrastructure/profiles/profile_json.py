@@ -2,6 +2,7 @@ import json
 import os
 from typing import Optional, Dict
 from app.domain.ports import ProfilePort
+from app.infrastructure.nlp.keyword_index import KeywordIndex, compile_profile
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "../../data/profiles.json")
 
@@ -9,6 +10,13 @@ class JsonProfileAdapter(ProfilePort):
     def __init__(self, path: str = DATA_PATH):
         with open(path, "r") as f:
             self.profiles = json.load(f)
+        # índices de keywords compilados uma vez no carregamento, por profile_id
+        self._indexes: Dict[str, KeywordIndex] = {
+            pid: compile_profile(profile) for pid, profile in self.profiles.items()
+        }
 
     def get_profile(self, profile_id: str) -> Optional[Dict]:
         return self.profiles.get(profile_id)
+
+    def get_keyword_index(self, profile_id: str) -> Optional[KeywordIndex]:
+        return self._indexes.get(profile_id)
@@ -0,0 +1,180 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+from app.domain.entities import ClassificationLog
+from app.domain.errors import Overloaded
+from app.domain.ports import LogRepositoryPort
+
+_STOP = object()
+
+
+class GroupCommitLogRepository(LogRepositoryPort):
+    """
+    LogRepositoryPort assíncrono com group commit.
+    - save() só enfileira (fila limitada) e retorna; um único writer em thread própria
+      grava em lotes numa transação, ao atingir `max_batch` itens ou após `flush_interval` s
+    - fila cheia → bloqueia o chamador até `put_timeout` (backpressure) e depois Overloaded
+    - submit() devolve um Future com o log gravado (com id) para quem precisa do id
+    - close() drena tudo o que foi enfileirado antes de encerrar (também via atexit)
+    """
+
+    def __init__(
+        self,
+        repo_factory: Callable[[], LogRepositoryPort],
+        max_batch: int = 100,
+        flush_interval: float = 0.2,
+        max_queue: int = 10_000,
+        put_timeout: float = 5.0,
+    ):
+        self._repo_factory = repo_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._reader = repo_factory()
+        self._reader_lock = threading.Lock()
+        self._closed = False
+        self._inflight = 0  # produtores entre a checagem de _closed e o put
+        self._state = threading.Condition()
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._writer, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- produtores ---
+
+    def submit(self, log: ClassificationLog) -> "Future[ClassificationLog]":
+        fut: Future = Future()
+        try:
+            if not self._enqueue((log, fut), timeout=self.put_timeout):
+                raise RuntimeError("Log writer encerrado.")
+        except queue.Full:
+            raise Overloaded("Fila de gravação de logs cheia.")
+        self._count("enqueued")
+        return fut
+
+    def save(self, log: ClassificationLog) -> ClassificationLog:
+        self.submit(log)
+        return log
+
+    def save_many(self, logs: List[ClassificationLog]) -> List[ClassificationLog]:
+        for log in logs:
+            self.submit(log)
+        return logs
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Bloqueia até tudo o que já foi enfileirado estar gravado."""
+        marker: Future = Future()
+        if self._enqueue((None, marker)):
+            marker.result(timeout)
+
+    def close(self) -> None:
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            # quem já passou da checagem termina o put antes do _STOP: nada fica sem gravar
+            self._state.wait_for(lambda: self._inflight == 0)
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _enqueue(self, item, timeout: Optional[float] = None) -> bool:
+        """Enfileira se o writer ainda aceita itens; False depois do close()."""
+        with self._state:
+            if self._closed:
+                return False
+            self._inflight += 1
+        try:
+            self._queue.put(item, timeout=timeout)
+            return True
+        finally:
+            with self._state:
+                self._inflight -= 1
+                self._state.notify_all()
+
+    # --- leitura (delegada ao repositório síncrono) ---
+
+    def list_recent(self, limit: int = 50) -> List[ClassificationLog]:
+        with self._reader_lock:
+            return self._reader.list_recent(limit=limit)
+
+    def get_by_id(self, log_id: int) -> Optional[ClassificationLog]:
+        with self._reader_lock:
+            return self._reader.get_by_id(log_id)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    # --- writer ---
+
+    def _writer(self):
+        repo = self._repo_factory()
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            if batch[-1] is _STOP:
+                batch.pop()
+                stop = True
+                # drena o que ainda estiver na fila antes de encerrar
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            self._write(repo, batch)
+
+    def _write(self, repo: LogRepositoryPort, batch: list):
+        items = [(log, fut) for log, fut in batch if log is not None]
+        markers = [fut for log, fut in batch if log is None]
+        for start in range(0, len(items), self.max_batch):
+            chunk = items[start:start + self.max_batch]
+            try:
+                saved = repo.save_many([log for log, _ in chunk])
+            except Exception as e:
+                self._count("errors")
+                print(f"[ERROR] Falha ao gravar lote de {len(chunk)} logs: {e}")
+                for _, fut in chunk:
+                    self._resolve(fut, error=e)
+                continue
+            self._count("written", len(chunk))
+            self._count("batches")
+            for (_, fut), log in zip(chunk, saved):
+                self._resolve(fut, result=log)
+        for fut in markers:
+            self._resolve(fut)
+
+    @staticmethod
+    def _resolve(fut: Future, result=None, error: Optional[BaseException] = None):
+        """Entrega o resultado sem derrubar o writer: Future cancelado pelo chamador é ignorado."""
+        try:
+            if not fut.set_running_or_notify_cancel():
+                return  # log gravado mesmo assim; só ninguém espera mais o resultado
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+        except Exception as e:
+            print(f"[WARN] Falha ao entregar resultado do log: {e}")
@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Callable, List
+
+from sqlmodel import Session, select
+
+from app.domain.entities import LlmBatchJob
+from app.domain.ports import BatchJobRepositoryPort
+from app.infrastructure.models import LlmBatchJobModel
+
+
+class SqlBatchJobRepository(BatchJobRepositoryPort):
+    """Estado dos lotes offline do LLM (uma linha por job), com sessão nova por operação."""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def save(self, job: LlmBatchJob) -> LlmBatchJob:
+        with self.session_factory() as session:
+            try:
+                obj = session.get(LlmBatchJobModel, job.id)
+                if obj is None:
+                    obj = LlmBatchJobModel(
+                        id=job.id,
+                        mailbox_key=job.mailbox_key,
+                        provider=job.provider,
+                        provider_job_id=job.provider_job_id,
+                    )
+                obj.status = job.status
+                obj.items = job.items
+                obj.uidvalidity = job.uidvalidity
+                obj.input_path = job.input_path
+                obj.error = job.error
+                obj.applied_at = job.applied_at
+                obj.updated_at = datetime.utcnow()
+                session.add(obj)
+                session.commit()
+                session.refresh(obj)
+                return obj.to_entity()
+            except Exception:
+                session.rollback()
+                raise
+
+    def list_open(self, mailbox_key: str) -> List[LlmBatchJob]:
+        with self.session_factory() as session:
+            stmt = (
+                select(LlmBatchJobModel)
+                .where(LlmBatchJobModel.mailbox_key == mailbox_key, LlmBatchJobModel.status != "applied")
+                .order_by(LlmBatchJobModel.created_at)
+            )
+            return [obj.to_entity() for obj in session.exec(stmt).all()]
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlmodel import Session
+
+from app.domain.entities import MailboxCheckpoint
+from app.domain.ports import CheckpointRepositoryPort
+from app.infrastructure.models import ImapCheckpointModel
+
+
+class SqlCheckpointRepository(CheckpointRepositoryPort):
+    """Checkpoints de sincronização IMAP (uma linha por caixa), com sessão nova por operação."""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def get(self, mailbox_key: str) -> Optional[MailboxCheckpoint]:
+        with self.session_factory() as session:
+            obj = session.get(ImapCheckpointModel, mailbox_key)
+            return obj.to_entity() if obj else None
+
+    def save(self, checkpoint: MailboxCheckpoint) -> MailboxCheckpoint:
+        with self.session_factory() as session:
+            try:
+                obj = session.get(ImapCheckpointModel, checkpoint.mailbox_key)
+                if obj is None:
+                    obj = ImapCheckpointModel(mailbox_key=checkpoint.mailbox_key, uidvalidity=checkpoint.uidvalidity)
+                obj.uidvalidity = checkpoint.uidvalidity
+                obj.last_uid = checkpoint.last_uid
+                obj.highest_modseq = checkpoint.highest_modseq
+                obj.updated_at = datetime.utcnow()
+                session.add(obj)
+                session.commit()
+                session.refresh(obj)
+                return obj.to_entity()
+            except Exception:
+                session.rollback()
+                raise
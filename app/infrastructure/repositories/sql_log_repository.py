@@ -1,4 +1,5 @@
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Callable, List, Optional
 from sqlmodel import Session, select
 
 from app.domain.entities import ClassificationLog
@@ -7,25 +8,55 @@ from app.infrastructure.models import ClassificationLogModel
 
 
 class SqlLogRepository(LogRepositoryPort):
-    """Implementação de LogRepositoryPort com SQLModel."""
+    """
+    Implementação de LogRepositoryPort com SQLModel.
+    - `session`: sessão do chamador (ex.: Depends(get_session) de um request)
+    - `session_factory`: abre uma sessão nova por operação → seguro entre threads
+    """
 
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Optional[Session] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+    ):
+        if session is None and session_factory is None:
+            raise ValueError("Informe session ou session_factory")
         self.session = session
+        self.session_factory = session_factory
+
+    @contextmanager
+    def _session(self):
+        if self.session is not None:
+            yield self.session
+            return
+        with self.session_factory() as session:
+            yield session
 
     def save(self, log: ClassificationLog) -> ClassificationLog:
-        db_obj = ClassificationLogModel.from_entity(log)
-        self.session.add(db_obj)
-        self.session.commit()
-        self.session.refresh(db_obj)
-        return db_obj.to_entity()
+        return self.save_many([log])[0]
+
+    def save_many(self, logs: List[ClassificationLog]) -> List[ClassificationLog]:
+        db_objs = [ClassificationLogModel.from_entity(log) for log in logs]
+        with self._session() as session:
+            try:
+                session.add_all(db_objs)
+                session.flush()  # gera os ids antes do commit expirar os objetos
+                saved = [obj.to_entity() for obj in db_objs]
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        return saved
 
     def list_recent(self, limit: int = 50) -> List[ClassificationLog]:
         stmt = select(ClassificationLogModel).order_by(
             ClassificationLogModel.created_at.desc()
         ).limit(limit)
-        results = self.session.exec(stmt).all()
-        return [obj.to_entity() for obj in results]
+        with self._session() as session:
+            results = session.exec(stmt).all()
+            return [obj.to_entity() for obj in results]
 
     def get_by_id(self, log_id: int) -> Optional[ClassificationLog]:
-        db_obj = self.session.get(ClassificationLogModel, log_id)
-        return db_obj.to_entity() if db_obj else None
+        with self._session() as session:
+            db_obj = session.get(ClassificationLogModel, log_id)
+            return db_obj.to_entity() if db_obj else None
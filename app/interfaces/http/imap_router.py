@@ -1,16 +1,17 @@
-# app/interfaces/http/imap_router.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from sqlmodel import Session
 
 from app.infrastructure.email_sources.imap_service import ImapService
 from app.infrastructure.email_sources.imap_adapter import ImapEmailSource
-from app.bootstrap import build_use_case
-from app.infrastructure.db import get_session
+from app.infrastructure.email_sources.imap_registry import account_key, mailbox_key
+from app.bootstrap import (
+    build_imap_deps, build_imap_registry, build_checkpoint_repository, build_llm_backlog, build_price_table,
+)
+from app.config import settings
 
 router = APIRouter(prefix="/imap", tags=["imap"])
 
-imap_service: ImapService | None = None
+registry = build_imap_registry()
 
 
 class ImapConfig(BaseModel):
@@ -20,65 +21,131 @@ class ImapConfig(BaseModel):
     mailbox: str = "INBOX"
     profile_id: str = "default"
     interval: int = 60
+    idle: bool = settings.IMAP_IDLE_ENABLED
+
+
+def _start(cfg: ImapConfig, replace: bool) -> str:
+    key = mailbox_key(cfg.user, cfg.host, cfg.mailbox)
+
+    def factory(executor, connection_slots, classify_workers):
+        source = ImapEmailSource(
+            host=cfg.host,
+            user=cfg.user,
+            password=cfg.password,
+            mailbox=cfg.mailbox,
+            fetch_batch=settings.IMAP_FETCH_BATCH,
+            body_byte_cap=settings.IMAP_BODY_BYTE_CAP,
+            header_triage=settings.HEADER_TRIAGE_ENABLED,
+        )
+        # repositório compartilhado abre uma sessão por operação (nada de Session global)
+        classifier, repo = build_imap_deps()
+        return ImapService(
+            source=source,
+            classifier=classifier,
+            repo=repo,
+            profile_id=cfg.profile_id,
+            interval=cfg.interval,
+            use_idle=cfg.idle,
+            idle_timeout=settings.IMAP_IDLE_REFRESH_S,
+            executor=executor,
+            connection_slots=connection_slots,
+            classify_workers=classify_workers,
+            queue_size=settings.SYNC_QUEUE_SIZE,
+            checkpoints=build_checkpoint_repository(),
+            checkpoint_key=key,
+            backlog=build_llm_backlog(classifier),
+            prices=build_price_table(),
+            max_attempts=settings.SYNC_MAX_ATTEMPTS,
+        )
+
+    try:
+        registry.add(key, account_key(cfg.user, cfg.host), factory, replace=replace)
+    except KeyError:
+        raise HTTPException(status_code=409, detail=f"Caixa já configurada: {key}")
+    return key
 
 
 @router.post("/config")
-def configure_imap(cfg: ImapConfig, session: Session = Depends(get_session)):
+def configure_imap(cfg: ImapConfig):
     """
-    Configura e inicia o serviço IMAP para leitura de e-mails.
+    Configura e inicia o serviço IMAP de uma caixa (substitui a mesma conta+caixa, se existir).
     """
-    global imap_service
-    if imap_service:
-        imap_service.stop()
-
-    source = ImapEmailSource(
-        host=cfg.host,
-        user=cfg.user,
-        password=cfg.password,
-        mailbox=cfg.mailbox,
-    )
-
-    uc = build_use_case()
-    classifier = uc.classifier
-    repo = uc.log_repo
-
-    imap_service = ImapService(
-        source=source,
-        classifier=classifier,
-        repo=repo,
-        profile_id=cfg.profile_id,
-        interval=cfg.interval,
-    )
-    imap_service.start()
-    return {"status": "imap started", "profile_id": cfg.profile_id}
+    key = _start(cfg, replace=True)
+    return {"status": "imap started", "id": key, "profile_id": cfg.profile_id}
 
 
 @router.get("/status")
 def status_imap():
     """
-    Retorna o status atual do serviço IMAP.
+    Retorna o status de todas as caixas IMAP registradas.
+    "running" só se todas estão rodando; "partial" se algumas; "stopped" se nenhuma.
     """
-    global imap_service
-    if not imap_service:
+    # caixa removida entre keys() e status() volta None
+    mailboxes = [st for st in (registry.status(k) for k in registry.keys()) if st]
+    if not mailboxes:
         return {"status": "not configured"}
-    return {
-        "status": "running" if imap_service.is_running else "stopped",
-        "profile_id": imap_service.profile_id,
-        "interval": imap_service.interval,
-        "mailbox": imap_service.source.mailbox,
-        "host": imap_service.source.host,
-    }
+    running = sum(st["status"] == "running" for st in mailboxes)
+    if running == len(mailboxes):
+        overall = "running"
+    elif running:
+        overall = "partial"
+    else:
+        overall = "stopped"
+    return {"status": overall, "mailboxes": mailboxes}
 
 
 @router.post("/stop")
 def stop_imap():
     """
-    Interrompe o serviço IMAP se estiver em execução.
+    Interrompe todos os serviços IMAP em execução.
     """
-    global imap_service
-    if not imap_service:
+    keys = registry.keys()
+    if not keys:
         raise HTTPException(status_code=400, detail="No IMAP service running")
+    for key in keys:
+        registry.remove(key)
+    return {"status": "imap stopped", "stopped": keys}
+
+
+@router.get("/stats")
+def stats_imap():
+    """
+    Contadores agregados (caixas, e-mails processados, erros, vazão, conexões por conta).
+    """
+    return registry.stats()
+
+
+@router.get("/mailboxes")
+def list_mailboxes():
+    return [registry.status(k) for k in registry.keys()]
+
+
+@router.post("/mailboxes", status_code=201)
+def create_mailbox(cfg: ImapConfig):
+    key = _start(cfg, replace=False)
+    return registry.status(key)
+
+
+@router.get("/mailboxes/{mailbox_id:path}")
+def get_mailbox(mailbox_id: str):
+    st = registry.status(mailbox_id)
+    if st is None:
+        raise HTTPException(status_code=404, detail="Caixa não encontrada")
+    return st
+
+
+@router.put("/mailboxes/{mailbox_id:path}")
+def update_mailbox(mailbox_id: str, cfg: ImapConfig):
+    if mailbox_key(cfg.user, cfg.host, cfg.mailbox) != mailbox_id:
+        raise HTTPException(status_code=400, detail="user/host/mailbox não correspondem ao id")
+    if registry.get(mailbox_id) is None:
+        raise HTTPException(status_code=404, detail="Caixa não encontrada")
+    _start(cfg, replace=True)
+    return registry.status(mailbox_id)
+
 
-    imap_service.stop()
-    imap_service = None
-    return {"status": "imap stopped"}
+@router.delete("/mailboxes/{mailbox_id:path}")
+def delete_mailbox(mailbox_id: str):
+    if not registry.remove(mailbox_id):
+        raise HTTPException(status_code=404, detail="Caixa não encontrada")
+    return {"status": "imap stopped", "id": mailbox_id}
@@ -1,20 +1,28 @@
 # app/interfaces/http/api_router.py
+import json
+
 from fastapi import (
-    APIRouter, UploadFile, File, Request,
+    APIRouter, Request,
     HTTPException, Depends
 )
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlmodel import Session
 
-from app.bootstrap import build_use_case
+from app.bootstrap import build_use_case, build_async_use_case, build_llm_cache
 from app.application.dto import DirectJson, ClassifyResponse
-from app.domain.errors import BadRequest
-from app.ratelimiting import limiter
+from app.domain.errors import BadRequest, Overloaded, PayloadTooLarge
+from app.application.uploads import ENVELOPE_BYTES, spool_multipart, limit_message
+from app.ratelimiting import limiter, hit_with_cost
+from app.config import settings
 from app.infrastructure.db import get_session
 from app.infrastructure.repositories.sql_log_repository import SqlLogRepository
-from app.domain.entities import ClassificationLog
+from app.domain.entities import ClassificationLog, Email
+from app.infrastructure.classifiers.http_pool import shared_pools_stats
 
 router = APIRouter()
 uc = build_use_case()
+auc = build_async_use_case(uc)
 
 
 @router.get("/health")
@@ -22,16 +30,50 @@ def health(request: Request):
     return {"status": "ok"}
 
 
+@router.get("/metrics")
+def metrics(request: Request):
+    return {
+        "classify": auc.stats(),
+        "log_writer": uc.log_repo.stats() if hasattr(uc.log_repo, "stats") else None,
+        "llm_pools": shared_pools_stats(),
+        "extraction_cache": uc.file_facade.cache_stats(),
+        "llm_cache": _llm_cache_stats(),
+    }
+
+
+def _llm_cache_stats():
+    # cache só existe com LLM ligado; não cria o arquivo SQLite só para a métrica
+    cache = build_llm_cache() if settings.USE_OPENAI else None
+    return cache.stats() if cache else None
+
+
+def _check_content_length(request: Request):
+    """Recusa pelo Content-Length antes de receber o corpo (folga para o envelope multipart)."""
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.UPLOAD_MAX_BYTES + ENVELOPE_BYTES:
+        raise PayloadTooLarge(limit_message(settings.UPLOAD_MAX_BYTES))
+
+
 @router.post(
     "/classify",
     response_model=ClassifyResponse,
-    summary="Aceita JSON (subject/body + profile_id opcional) ou multipart com arquivo .pdf/.txt/.eml"
+    summary="Aceita JSON (subject/body + profile_id opcional) ou multipart com arquivo .pdf/.txt/.eml",
+    # o multipart é lido à mão (limite de tamanho antes de receber o corpo); documenta o campo `file`
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                }
+            }
+        }
+    },
 )
 @limiter.limit("5/minute")
-async def classify(
-    request: Request,
-    file: UploadFile | None = File(None),
-):
+async def classify(request: Request):
     ctype = request.headers.get("content-type", "").lower()
     try:
         if "application/json" in ctype:
@@ -39,7 +81,7 @@ async def classify(
             payload = DirectJson(**data)
             profile_id = payload.profile_id
 
-            r = uc.execute_from_text(
+            r = await auc.execute_from_text(
                 payload.subject,
                 payload.body,
                 payload.sender,
@@ -48,24 +90,108 @@ async def classify(
             return ClassifyResponse(**r.__dict__)
 
         if "multipart/form-data" in ctype:
-            if not file:
-                raise BadRequest("Envie 'file' (.pdf/.txt/.eml).")
-
-            raw = await file.read()
-            profile_id = request.query_params.get("profile_id")
-
-            r = uc.execute_from_file(
-                file.filename,
-                raw,
-                profile_id=profile_id,
+            _check_content_length(request)
+            # corpo lido direto do stream (sem request.form()): limite enquanto chega, sem Content-Length
+            # também; acima de UPLOAD_SPOOL_BYTES vai para arquivo temporário
+            filename, upload = await spool_multipart(
+                request.stream(),
+                request.headers["content-type"],
+                settings.UPLOAD_MAX_BYTES,
+                settings.UPLOAD_SPOOL_BYTES,
             )
+            profile_id = request.query_params.get("profile_id")
+            try:
+                if filename is None:
+                    raise BadRequest("Envie 'file' (.pdf/.txt/.eml).")
+                r = await auc.execute_from_file(
+                    filename,
+                    upload,
+                    profile_id=profile_id,
+                )
+            finally:
+                upload.close()
             return ClassifyResponse(**r.__dict__)
 
         raise BadRequest("Use JSON ou multipart/form-data.")
 
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BadRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+
+def _parse_batch(raw: bytes) -> list[DirectJson | str]:
+    """Aceita array JSON ou NDJSON; itens inválidos viram mensagem de erro na posição."""
+    text = raw.decode("utf-8", errors="replace").strip()
+    if not text:
+        raise BadRequest("Lote vazio.")
+    try:
+        if text.startswith("["):
+            rows = json.loads(text)
+        else:
+            rows = [json.loads(ln) for ln in text.splitlines() if ln.strip()]
+    except json.JSONDecodeError as e:
+        raise BadRequest(f"JSON/NDJSON inválido: {e}")
+    if not isinstance(rows, list) or not rows:
+        raise BadRequest("Lote vazio.")
+    if len(rows) > settings.CLASSIFY_BATCH_MAX_ITEMS:
+        raise BadRequest(f"Lote acima do limite de {settings.CLASSIFY_BATCH_MAX_ITEMS} itens.")
+
+    items: list[DirectJson | str] = []
+    for row in rows:
+        try:
+            items.append(DirectJson(**row) if isinstance(row, dict) else "item deve ser um objeto")
+        except ValidationError as e:
+            items.append(f"item inválido: {e.errors()[0].get('msg')}")
+    return items
+
+
+def _ndjson(line: dict) -> str:
+    return json.dumps(line, ensure_ascii=False) + "\n"
+
+
+@router.post(
+    "/classify/batch",
+    summary="Aceita array JSON ou NDJSON de itens DirectJson; responde NDJSON conforme cada item fica pronto"
+)
+@limiter.exempt
+async def classify_batch(request: Request):
+    try:
+        items = _parse_batch(await request.body())
     except BadRequest as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    # uma cobrança por lote, proporcional ao número de itens
+    if not hit_with_cost(request, settings.CLASSIFY_BATCH_LIMIT, "classify_batch", len(items)):
+        raise HTTPException(status_code=429, detail="Too Many Requests")
+    try:
+        auc.check_capacity()
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    valid = [(i, it) for i, it in enumerate(items) if isinstance(it, DirectJson)]
+    batch = [
+        (Email(subject=it.subject, body=it.body, sender=it.sender), it.profile_id)
+        for _, it in valid
+    ]
+
+    async def stream():
+        for i, it in enumerate(items):
+            if isinstance(it, str):
+                yield _ndjson({"index": i, "error": it})
+        async for pos, res in auc.execute_batch(batch):
+            index = valid[pos][0]
+            if isinstance(res, BadRequest):
+                yield _ndjson({"index": index, "error": str(res)})
+            elif isinstance(res, Exception):
+                yield _ndjson({"index": index, "error": "falha ao classificar"})
+            else:
+                yield _ndjson({"index": index, **ClassifyResponse(**res.__dict__).model_dump(mode="json")})
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 
 @router.get(
     "/logs",
@@ -2,7 +2,8 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.interfaces.http.routers import router
+from app.interfaces.http.routers import router, uc, auc
+from app.bootstrap import build_log_repository, build_imap_registry
 from app.ratelimiting import init_rate_limit
 from app.interfaces.http.imap_router import router as imap_router
 
@@ -20,6 +21,17 @@ app.include_router(router)
 app.include_router(imap_router)
 
 
+@app.on_event("shutdown")
+def _shutdown_executors():
+    auc.shutdown()
+    uc.file_facade.close()
+    build_imap_registry().stop_all()
+    # garante que os logs ainda na fila do writer sejam gravados
+    log_repo = build_log_repository()
+    if hasattr(log_repo, "close"):
+        log_repo.close()
+
+
 raw_origins = os.getenv("ALLOW_ORIGINS", "")
 origins = [o.strip() for o in raw_origins.split(",") if o.strip()]
 
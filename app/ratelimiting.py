@@ -1,5 +1,6 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from limits import parse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -14,3 +15,8 @@ def init_rate_limit(app):
     @app.exception_handler(RateLimitExceeded)
     async def _rl_handler(request: Request, exc: RateLimitExceeded):
         return JSONResponse(status_code=429, content={"detail": "Too Many Requests"})
+
+
+def hit_with_cost(request: Request, limit_value: str, scope: str, cost: int) -> bool:
+    """Consome `cost` unidades do limite (ex.: um lote cobra por item, numa única checagem)."""
+    return limiter.limiter.hit(parse(limit_value), get_remote_address(request), scope, cost=cost)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Vazão de inserts concorrentes no SQLite (WAL + sessão por operação), um save por log.
+Uso: python -m scripts.bench_db_writes --threads 8 --per-thread 500
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlmodel import SQLModel, Session
+
+from app.domain.entities import ClassificationLog
+from app.infrastructure.db import create_db_engine
+from app.infrastructure.repositories.sql_log_repository import SqlLogRepository
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--per-thread", type=int, default=500)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        eng = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(eng)
+        repo = SqlLogRepository(session_factory=lambda: Session(eng))
+        errors = []
+        start = threading.Barrier(args.threads + 1)
+
+        def writer(n: int):
+            start.wait()
+            for i in range(args.per_thread):
+                try:
+                    repo.save(ClassificationLog(source="bench", subject=f"t{n}-{i}", category="productive"))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.threads)]
+        for t in threads:
+            t.start()
+        start.wait()
+        t0 = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        eng.dispose()
+
+    total = args.threads * args.per_thread
+    print(f"inserts: {total} ({args.threads} threads)")
+    print(f"tempo  : {elapsed:.2f}s → {total / elapsed:,.0f} inserts/s | erros: {len(errors)}")
+
+
+if __name__ == "__main__":
+    main()
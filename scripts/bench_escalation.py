@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Custo local do caminho de escalonamento (rule-based → LLM), sem rede:
+- antes: regras rodam duas vezes (SmartClassifier e OpenAIClassifier), o perfil é casado
+  de novo no corpo para os highlights e o JSON das prioridades é montado a cada e-mail
+- depois: SmartClassifier repassa o resultado rule-based (`rule_result`) ao LLM
+A API é trocada por um pool em memória com resposta fixa: mede só o trabalho local.
+Uso: python -m scripts.bench_escalation --n 5000
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from app.domain.entities import Email
+from app.application.analysis import analyze_email
+from app.infrastructure.nlp.keyword_index import KeywordIndex
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.classifiers.openai_llm import OpenAIClassifier
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.classifiers.smart_classifier import SmartClassifier
+
+PROFILE = [
+    "contrato", "prazo", "reunião", "fatura", "pedido", "orçamento", "proposta", "nota fiscal",
+    "boleto", "entrega", "suporte", "chamado", "meeting", "invoice", "budget", "factura",
+] + [f"termo {i}" for i in range(300)]
+
+SAMPLES = [
+    ("Contrato", "Olá, segue o contrato para revisão. " * 20),
+    ("Dúvida", "Bom dia, poderia verificar o pedido 123? Obrigado. " * 15),
+    ("Oi", "Tudo bem? Só passando para dar um oi e combinar um café. " * 10),
+    ("Invoice", "Hi, please find the invoice attached for last month. " * 15),
+]
+
+_REPLY = json.dumps({
+    "choices": [{"message": {"tool_calls": [{"function": {"arguments": json.dumps(
+        {"category": "productive", "reason": "ok", "reply": "Obrigado!"}
+    )}}]}}],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+}).encode()
+
+
+class CannedPool:
+    def request(self, method, path, body=None, headers=None):
+        return 200, _REPLY
+
+
+class LegacySmart(SmartClassifier):
+    """Fluxo anterior: highlights via priority.match e LLM reclassificando com as regras."""
+
+    def classify(self, email, tokens, mood=None, priority=None, analysis=None):
+        rb = self.rule_based.classify(email, tokens, mood=mood, priority=priority, analysis=analysis)
+        if (rb.extra or {}).get("is_spam") or (rb.extra or {}).get("confidence", 0.0) >= self.min_conf:
+            return rb
+        hits = sorted(priority.match(email.body or ""))[:20] if priority else []
+        self.llm._priority_cache.clear()  # JSON das prioridades refeito a cada e-mail
+        llm_res = self.llm.classify(email=email, tokens=tokens, mood=mood, priority=priority, analysis=analysis)
+        merged_extra = {**(llm_res.extra or {}), "rb_hits": hits, "rb_confidence": rb.extra.get("confidence")}
+        return type(llm_res)(**{**llm_res.__dict__, "extra": merged_extra})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=5000, help="quantidade de e-mails escalonados")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3, help="rodadas (vale o melhor tempo)")
+    args = ap.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    rnd = random.Random(args.seed)
+    tk = SimpleTokenizer(lang="auto")
+    emails = [Email(subject=s, body=b) for s, b in (rnd.choice(SAMPLES) for _ in range(args.n))]
+    analyses = [analyze_email(tk, e) for e in emails]
+    priority = KeywordIndex(PROFILE)
+
+    rule = RuleBasedClassifier()
+    llm = OpenAIClassifier(pool=CannedPool())
+    # min_conf acima de qualquer confiança: todo e-mail não-spam escala
+    before = LegacySmart(rule_based=rule, llm=llm, min_conf=1.01)
+    after = SmartClassifier(rule_based=rule, llm=llm, min_conf=1.01)
+
+    def best_of(clf):
+        best, out = float("inf"), None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            out = [clf.classify(e, a.tokens, priority=priority, analysis=a) for e, a in zip(emails, analyses)]
+            best = min(best, time.perf_counter() - t0)
+        return best, out
+
+    t_before, res_before = best_of(before)
+    t_after, res_after = best_of(after)
+
+    def comparable(extra):
+        return {k: v for k, v in extra.items() if k != "stage_ms"}  # tempos variam a cada rodada
+
+    same = all(
+        a.category == b.category and comparable(a.extra) == comparable(b.extra) for a, b in zip(res_before, res_after)
+    )
+    print(f"e-mails escalonados: {args.n} | termos no perfil: {len(priority.terms)}")
+    print(f"antes : {t_before * 1000:.1f} ms ({t_before / args.n * 1e6:.1f} µs/e-mail)")
+    print(f"depois: {t_after * 1000:.1f} ms ({t_after / args.n * 1e6:.1f} µs/e-mail)")
+    print(f"speedup: {t_before / t_after:.2f}x | resultados idênticos: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compara os conversores HTML → texto do EmlExtractor ("fast" vs "bs4").
+Uso: python -m scripts.bench_html_to_text --dir pasta/com/newsletters   (.html ou .eml)
+Sem --dir, gera newsletters sintéticas (tabelas aninhadas + CSS inline + <style> grande).
+"""
+import argparse
+import random
+import time
+from email import policy
+from email.parser import BytesParser
+from pathlib import Path
+
+from app.infrastructure.extractors.html_text import HTML_CONVERTERS
+
+
+def load_corpus(folder: str) -> list:
+    docs = []
+    for path in sorted(Path(folder).iterdir()):
+        if path.suffix.lower() in (".html", ".htm"):
+            docs.append(path.read_text(encoding="utf-8", errors="ignore"))
+        elif path.suffix.lower() == ".eml":
+            msg = BytesParser(policy=policy.default).parsebytes(path.read_bytes())
+            for part in msg.walk():
+                if part.get_content_type() == "text/html":
+                    docs.append(part.get_content())
+    return docs
+
+
+def synthetic_newsletter(rnd: random.Random, items: int) -> str:
+    style = "td{font-family:Arial,sans-serif;color:#333}" * 200
+    cell = (
+        '<td style="padding:12px 24px;font-family:Arial,Helvetica,sans-serif;font-size:14px;'
+        'line-height:20px;color:#333333;background-color:#ffffff;border-collapse:collapse">'
+        '<a href="https://click.example.com/?u={n}&amp;t=abc" style="color:#0055aa;text-decoration:none">'
+        "Oferta {n}: {w}</a>&nbsp;&nbsp;<span style=\"font-weight:bold\">R$ {p},90</span></td>"
+    )
+    words = ["desconto", "frete grátis", "só hoje", "últimas unidades", "cupom", "novidades"]
+    rows = "".join(
+        "<tr>" + cell.format(n=i, w=rnd.choice(words), p=rnd.randint(10, 999)) * 2 + "</tr><!-- tracking -->"
+        for i in range(items)
+    )
+    return (
+        f"<html><head><style>{style}</style><script>var t=1;</script></head><body>"
+        f'<table width="100%"><tr><td><table width="600">{rows}</table></td></tr></table>'
+        '<p style="font-size:11px">Descadastrar: <a href="https://x.com/u">clique aqui</a></p></body></html>'
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dir", default=None, help="pasta com .html/.eml reais (newsletters)")
+    ap.add_argument("--n", type=int, default=50, help="documentos sintéticos (sem --dir)")
+    ap.add_argument("--items", type=int, default=300, help="linhas de oferta por documento sintético")
+    ap.add_argument("--max-chars", type=int, default=8000, help="limite de saída (0 = sem limite)")
+    ap.add_argument("--repeat", type=int, default=3, help="rodadas (vale o melhor tempo)")
+    args = ap.parse_args()
+
+    rnd = random.Random(0)
+    docs = load_corpus(args.dir) if args.dir else [synthetic_newsletter(rnd, args.items) for _ in range(args.n)]
+    if not docs:
+        raise SystemExit("nenhum HTML encontrado")
+    cap = args.max_chars or None
+    size_mb = sum(len(d) for d in docs) / 1e6
+    print(f"documentos: {len(docs)} ({size_mb:.1f} MB de HTML) | max_chars={cap}")
+
+    timings = {}
+    for name, fn in HTML_CONVERTERS.items():
+        for limit in (None, cap) if cap else (None,):
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                for d in docs:
+                    fn(d, limit)
+                best = min(best, time.perf_counter() - t0)
+            timings[(name, limit)] = best
+            print(f"{name:5s} max_chars={str(limit):5s}: {best * 1000:8.1f} ms ({size_mb / best:6.1f} MB/s)")
+
+    base = timings[("bs4", None)]
+    for (name, limit), t in timings.items():
+        if name != "bs4":
+            print(f"speedup {name} (max_chars={limit}): {base / t:.1f}x sobre bs4")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import pytest
+
+from tests.fake_imap_server import FakeImapServer
+
+
+@pytest.fixture
+def fake_imap():
+    """Servidor IMAP local com IDLE; use `fake_imap.append(...)` para entregar e-mails."""
+    server = FakeImapServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake_imap_no_idle():
+    server = FakeImapServer(capabilities=("IMAP4rev1",)).start()
+    yield server
+    server.stop()
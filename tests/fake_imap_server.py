@@ -0,0 +1,299 @@
+"""
+Servidor IMAP falso (texto puro, sem TLS) para testes offline do adapter/serviço IMAP.
+Implementa só o necessário: CAPABILITY, LOGIN, SELECT, UID SEARCH/FETCH/STORE/COPY/MOVE,
+CREATE, EXPUNGE, IDLE/DONE, ENABLE (CONDSTORE), NOOP e LOGOUT.
+"""
+import re
+import socketserver
+import threading
+from typing import Dict, List, Optional
+
+
+class FakeMessage:
+    def __init__(self, uid: int, subject: str, body: str, sender: str, extra_headers: Optional[Dict[str, str]] = None):
+        self.uid = uid
+        self.subject = subject
+        self.extra_headers = extra_headers or {}
+        self.body = body.encode("utf-8")
+        self.sender = sender
+        self.flags = set()
+
+    def headers(self) -> bytes:
+        extra = "".join(f"{k}: {v}\r\n" for k, v in self.extra_headers.items())
+        return f"Subject: {self.subject}\r\nFrom: {self.sender}\r\n{extra}\r\n".encode("utf-8")
+
+    def bodystructure(self) -> bytes:
+        lines = self.body.count(b"\n") + 1
+        return b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "8BIT" %d %d NIL NIL NIL)' % (len(self.body), lines)
+
+
+class FakeImapServer:
+    def __init__(self, capabilities=("IMAP4rev1", "IDLE")):
+        self.capabilities = list(capabilities)
+        self.mailbox: List[FakeMessage] = []
+        self.folders: Dict[str, List[FakeMessage]] = {"INBOX": self.mailbox}
+        self.commands: List[str] = []
+        self.next_uid = 1
+        self.uidvalidity = 1
+        self.modseq = 1  # sobe a cada mudança (HIGHESTMODSEQ com CONDSTORE)
+        self.lock = threading.RLock()
+        self.sessions: List["_Handler"] = []
+        self.peak_sessions = 0
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self) -> "FakeImapServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self.lock:
+            for s in list(self.sessions):
+                s.close()
+
+    def append(self, subject: str, body: str, sender: str = "a@x.com", mailbox: str = "INBOX",
+               headers: Optional[Dict[str, str]] = None) -> int:
+        """Entrega um e-mail novo na caixa e notifica as sessões com ela selecionada (EXISTS)."""
+        with self.lock:
+            box = self.folders.setdefault(mailbox, [])
+            msg = FakeMessage(self.next_uid, subject, body, sender, headers)
+            self.next_uid += 1
+            box.append(msg)
+            self.modseq += 1
+            for s in self.sessions:
+                if s.box is box:
+                    s.notify(b"* %d EXISTS" % len(box))
+            return msg.uid
+
+    def commands_named(self, name: str) -> List[str]:
+        return [c for c in self.commands if c.upper().startswith(name.upper())]
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def _uid_set(spec: str, uids: List[int]) -> List[int]:
+    top = max(uids) if uids else 0
+    out = set()
+    for part in spec.split(","):
+        a, _, b = part.partition(":")
+        lo = top if a == "*" else int(a)
+        hi = lo if not b else (top if b == "*" else int(b))
+        lo, hi = min(lo, hi), max(lo, hi)
+        out.update(u for u in uids if lo <= u <= hi)
+    return sorted(out)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.pending: List[bytes] = []
+        self.idle_tag: Optional[bytes] = None
+        self.wlock = threading.Lock()
+        self.closed = False
+        self.box: List[FakeMessage] = self.server.fake.mailbox
+        self.condstore = False
+
+    @property
+    def fake(self) -> FakeImapServer:
+        return self.server.fake
+
+    def write(self, *lines: bytes):
+        with self.wlock:
+            try:
+                # tudo num write só: linhas chegam juntas, como num servidor real
+                self.wfile.write(b"".join(ln + b"\r\n" for ln in lines))
+                self.wfile.flush()
+            except OSError:
+                self.closed = True
+
+    def notify(self, line: bytes):
+        # em IDLE vai na hora; fora dele segue antes da próxima resposta marcada
+        if self.idle_tag is not None:
+            self.write(line)
+        else:
+            self.pending.append(line)
+
+    def close(self):
+        self.closed = True
+        try:
+            self.connection.close()
+        except OSError:
+            pass
+
+    def handle(self):
+        with self.fake.lock:
+            self.fake.sessions.append(self)
+            self.fake.peak_sessions = max(self.fake.peak_sessions, len(self.fake.sessions))
+        self.write(b"* OK fake imap ready")
+        try:
+            while not self.closed:
+                raw = self.rfile.readline()
+                if not raw:
+                    break
+                line = raw.rstrip(b"\r\n").decode("utf-8")
+                if self.idle_tag is not None:
+                    if line.upper() == "DONE":
+                        tag, self.idle_tag = self.idle_tag, None
+                        self.write(tag + b" OK IDLE terminated")
+                    continue
+                tag, _, rest = line.partition(" ")
+                self.fake.commands.append(rest)
+                if not self.dispatch(tag.encode(), rest):
+                    break
+        finally:
+            with self.fake.lock:
+                if self in self.fake.sessions:
+                    self.fake.sessions.remove(self)
+
+    def ok(self, tag: bytes, text: str = "done", untagged: List[bytes] = ()):
+        with self.fake.lock:
+            pending, self.pending = self.pending, []
+        self.write(*untagged, *pending, tag + b" OK " + text.encode())
+
+    def dispatch(self, tag: bytes, rest: str) -> bool:
+        cmd, _, args = rest.partition(" ")
+        cmd = cmd.upper()
+        fake = self.fake
+
+        if cmd == "CAPABILITY":
+            self.ok(tag, untagged=[b"* CAPABILITY " + " ".join(fake.capabilities).encode()])
+        elif cmd in ("LOGIN", "NOOP"):
+            self.ok(tag)
+        elif cmd == "ENABLE":
+            self.condstore = "CONDSTORE" in args.upper() and "CONDSTORE" in fake.capabilities
+            self.ok(tag, untagged=[b"* ENABLED" + (b" CONDSTORE" if self.condstore else b"")])
+        elif cmd == "CREATE":
+            folder = args.strip('"')
+            with fake.lock:
+                if folder in fake.folders:
+                    self.write(tag + b" NO [ALREADYEXISTS] mailbox exists")
+                    return True
+                fake.folders[folder] = []
+            self.ok(tag)
+        elif cmd in ("SELECT", "EXAMINE"):
+            with fake.lock:
+                self.box = fake.folders.setdefault(args.strip('"'), [])
+                n = len(self.box)
+                self.pending = []
+                untagged = [
+                    b"* %d EXISTS" % n, b"* 0 RECENT",
+                    b"* OK [UIDVALIDITY %d]" % fake.uidvalidity, b"* OK [UIDNEXT %d]" % fake.next_uid,
+                ]
+                if self.condstore:
+                    untagged.append(b"* OK [HIGHESTMODSEQ %d]" % fake.modseq)
+            self.ok(tag, "[READ-WRITE] selected", untagged)
+        elif cmd == "IDLE":
+            if "IDLE" not in fake.capabilities:
+                self.write(tag + b" BAD IDLE not supported")
+                return True
+            with fake.lock:
+                pending, self.pending = self.pending, []
+                self.idle_tag = tag
+            self.write(b"+ idling", *pending)
+        elif cmd == "UID":
+            self.uid_command(tag, args)
+        elif cmd == "EXPUNGE":
+            with fake.lock:
+                gone = []
+                for seq in range(len(self.box), 0, -1):
+                    if "\\Deleted" in self.box[seq - 1].flags:
+                        self.box.pop(seq - 1)
+                        gone.append(b"* %d EXPUNGE" % seq)
+                fake.modseq += 1
+            self.ok(tag, untagged=gone)
+        elif cmd == "LOGOUT":
+            # sai da contagem de sessões antes de responder (o cliente já considera a conexão fechada)
+            with fake.lock:
+                if self in fake.sessions:
+                    fake.sessions.remove(self)
+            self.write(b"* BYE logging out", tag + b" OK bye")
+            return False
+        else:
+            self.write(tag + b" BAD unknown command")
+        return True
+
+    def uid_command(self, tag: bytes, args: str):
+        fake = self.fake
+        sub, _, rest = args.partition(" ")
+        sub = sub.upper()
+        with fake.lock:
+            by_uid = {m.uid: (i + 1, m) for i, m in enumerate(self.box)}
+            all_uids = list(by_uid)
+
+        if sub == "SEARCH":
+            crit = rest.split()
+            if crit and crit[0].upper() == "UNSEEN":
+                found = [m.uid for _, m in by_uid.values() if "\\Seen" not in m.flags]
+            elif len(crit) == 2 and crit[0].upper() == "UID":
+                found = _uid_set(crit[1], all_uids)
+            else:
+                found = all_uids
+            self.ok(tag, untagged=[("* SEARCH " + " ".join(map(str, found))).rstrip().encode()])
+            return
+
+        spec, _, items = rest.partition(" ")
+        targets = [by_uid[u] for u in _uid_set(spec, all_uids)]
+
+        if sub == "FETCH":
+            out = []
+            for seq, m in targets:
+                parts = [b"UID %d" % m.uid]
+                if "BODYSTRUCTURE" in items.upper():
+                    parts.append(b"BODYSTRUCTURE " + m.bodystructure())
+                if "HEADER" in items.upper():
+                    hdr = m.headers()
+                    parts.append(b"BODY[HEADER] {%d}\r\n" % len(hdr) + hdr)
+                sec = re.search(r"BODY\.PEEK\[(1|TEXT)\](?:<0\.(\d+)>)?", items, re.IGNORECASE)
+                if sec:
+                    data = m.body[: int(sec.group(2))] if sec.group(2) else m.body
+                    suffix = b"<0>" if sec.group(2) else b""
+                    parts.append(b"BODY[%s]%s {%d}\r\n" % (sec.group(1).encode(), suffix, len(data)) + data)
+                out.append(b"* %d FETCH (" % seq + b" ".join(parts) + b")")
+            self.ok(tag, untagged=out)
+        elif sub == "STORE":
+            if "X-GM-LABELS" in items.upper():
+                self.write(tag + b" BAD X-GM-LABELS not supported")
+                return
+            flags = set(re.findall(r"\\\w+", items))
+            with fake.lock:
+                for _, m in targets:
+                    if items.startswith("-"):
+                        m.flags -= flags
+                    else:
+                        m.flags |= flags
+                fake.modseq += 1
+            self.ok(tag)
+        elif sub in ("COPY", "MOVE"):
+            folder = items.strip('"')
+            with fake.lock:
+                if folder not in fake.folders:
+                    self.write(tag + b" NO [TRYCREATE] no such mailbox")
+                    return
+                fake.folders[folder].extend(m for _, m in targets)
+                gone = []
+                if sub == "MOVE":
+                    for seq, m in sorted(targets, reverse=True):
+                        self.box.remove(m)
+                        gone.append(b"* %d EXPUNGE" % seq)
+                fake.modseq += 1
+            self.ok(tag, untagged=gone)
+        elif sub == "EXPUNGE":
+            wanted = {m.uid for _, m in targets}
+            with fake.lock:
+                gone = []
+                for seq in range(len(self.box), 0, -1):
+                    m = self.box[seq - 1]
+                    if m.uid in wanted and "\\Deleted" in m.flags:
+                        self.box.pop(seq - 1)
+                        gone.append(b"* %d EXPUNGE" % seq)
+                fake.modseq += 1
+            self.ok(tag, untagged=gone)
+        else:
+            self.write(tag + b" BAD unknown UID command")
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.domain.entities import ClassificationResult, Category, Email
+from app.domain.errors import Overloaded
+from app.application.use_cases.classify_email import FileFacade, ClassifyEmailUseCase
+from app.application.use_cases.classify_email_async import AsyncClassifyEmailUseCase
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.responders.simple_templates import SimpleResponder
+from app.infrastructure.profiles.profile_json import JsonProfileAdapter
+
+
+class BlockingClassifier:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def classify(self, email, tokens, mood=None, priority=None, analysis=None):
+        self.release.wait(5)
+        return ClassificationResult(category=Category.UNPRODUCTIVE, reason="ok", suggested_reply="")
+
+
+class InstantClassifier:
+    def classify(self, email, tokens, mood=None, priority=None, analysis=None):
+        return ClassificationResult(category=Category.PRODUCTIVE, reason="ok", suggested_reply="")
+
+
+class MemoryRepo:
+    def __init__(self):
+        self.logs = []
+        self.batches = []
+
+    def save(self, log):
+        self.logs.append(log)
+        return log
+
+    def save_many(self, logs):
+        self.batches.append(len(logs))
+        self.logs.extend(logs)
+        return logs
+
+
+def _build(classifier, repo, **kw):
+    uc = ClassifyEmailUseCase(
+        file_facade=FileFacade(None, None),
+        tokenizer=SimpleTokenizer(lang="auto"),
+        classifier=classifier,
+        responder=SimpleResponder(),
+        profiles=JsonProfileAdapter(),
+        log_repo=repo,
+    )
+    return AsyncClassifyEmailUseCase(uc, **kw)
+
+
+def test_rejects_when_in_flight_and_queue_are_full():
+    classifier, repo = BlockingClassifier(), MemoryRepo()
+    auc = _build(classifier, repo, max_in_flight=1, max_queue=1, cpu_workers=1)
+
+    async def scenario():
+        first = asyncio.create_task(auc.execute_from_text("a", "corpo"))
+        second = asyncio.create_task(auc.execute_from_text("b", "corpo"))
+        await asyncio.sleep(0.05)
+        assert auc.stats()["in_flight"] == 1 and auc.stats()["waiting"] == 1
+
+        with pytest.raises(Overloaded):
+            await auc.execute_from_text("c", "corpo")
+
+        classifier.release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+    auc.shutdown()
+    assert len(repo.logs) == 2
+
+
+def test_batch_saves_logs_in_groups_and_flushes_the_rest():
+    items = [(Email(subject=f"s{i}", body="corpo"), None) for i in range(5)]
+
+    async def consume(auc, stop_after=None):
+        seen = []
+        gen = auc.execute_batch(items, flush_every=2)
+        async for i, res in gen:
+            assert isinstance(res, ClassificationResult)
+            seen.append(i)
+            if len(seen) == stop_after:
+                break
+        await gen.aclose()
+        return seen
+
+    repo = MemoryRepo()
+    auc = _build(InstantClassifier(), repo)
+    assert sorted(asyncio.run(consume(auc))) == list(range(5))
+    assert repo.batches == [2, 2, 1]  # grupos de flush_every; o resto sai no finally
+    auc.shutdown()
+
+    # cliente desconectou no meio: o que já foi entregue é gravado mesmo assim
+    repo = MemoryRepo()
+    auc = _build(InstantClassifier(), repo)
+    assert len(asyncio.run(consume(auc, stop_after=1))) == 1
+    assert repo.batches == [1]
+    auc.shutdown()
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.application.use_cases.classify_email import ClassifyEmailUseCase, FileFacade
+from app.application.use_cases.classify_email_async import AsyncClassifyEmailUseCase
+from app.config import settings
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.profiles.profile_json import JsonProfileAdapter
+from app.infrastructure.responders.simple_templates import SimpleResponder
+from app.interfaces.http import routers
+from app.ratelimiting import init_rate_limit, limiter
+from tests.test_classify_async import MemoryRepo
+
+
+@pytest.fixture
+def client(monkeypatch):
+    repo = MemoryRepo()
+    uc = ClassifyEmailUseCase(
+        file_facade=FileFacade(None, None),
+        tokenizer=SimpleTokenizer(lang="auto"),
+        classifier=RuleBasedClassifier(),
+        responder=SimpleResponder(),
+        profiles=JsonProfileAdapter(),
+        log_repo=repo,
+    )
+    auc = AsyncClassifyEmailUseCase(uc)
+    monkeypatch.setattr(routers, "auc", auc)
+    monkeypatch.setattr(settings, "CLASSIFY_BATCH_LIMIT", "6/minute")
+    monkeypatch.setattr(settings, "CLASSIFY_BATCH_MAX_ITEMS", 5)
+    limiter.reset()
+
+    app = FastAPI()
+    init_rate_limit(app)
+    app.include_router(routers.router)
+    with TestClient(app) as c:
+        c.repo = repo
+        yield c
+    auc.shutdown()
+    limiter.reset()
+
+
+def _lines(response):
+    return sorted((json.loads(ln) for ln in response.text.splitlines()), key=lambda line: line["index"])
+
+
+def test_json_array_and_ndjson_bodies(client):
+    items = [{"subject": "Reunião", "body": "Podemos marcar uma reunião?"}, {"body": "Feliz natal!"}]
+    for body in (json.dumps(items), "\n".join(json.dumps(it) for it in items) + "\n"):
+        r = client.post("/classify/batch", content=body)
+        assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+        lines = _lines(r)
+        assert [line["index"] for line in lines] == [0, 1]
+        assert all("category" in line and "error" not in line for line in lines)
+    assert len(client.repo.logs) == 4
+
+
+def test_invalid_items_get_errors_at_their_index(client):
+    body = json.dumps([{"body": "Podemos conversar?"}, 5, {"subject": "sem corpo"}, {"body": "Oi"}])
+    r = client.post("/classify/batch", content=body)
+    lines = _lines(r)
+    assert r.status_code == 200 and [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert lines[1]["error"] == "item deve ser um objeto"
+    assert lines[2]["error"].startswith("item inválido")
+    assert "category" in lines[0] and "category" in lines[3]
+    assert len(client.repo.logs) == 2  # só os válidos viram log
+
+
+def test_rate_limit_charges_per_item(client):
+    four = json.dumps([{"body": f"corpo {i}"} for i in range(4)])
+    assert client.post("/classify/batch", content=four).status_code == 200
+    r = client.post("/classify/batch", content=four)  # 4 + 4 > 6/minute
+    assert r.status_code == 429 and len(client.repo.logs) == 4
+
+
+def test_batch_above_max_items_is_rejected(client):
+    r = client.post("/classify/batch", content=json.dumps([{"body": "x"}] * 6))
+    assert r.status_code == 400 and "5 itens" in r.json()["detail"]
+    assert client.post("/classify/batch", content="").status_code == 400
+    assert client.post("/classify/batch", content="{nao é json").status_code == 400
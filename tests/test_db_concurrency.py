@@ -0,0 +1,53 @@
+import threading
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, select, func
+
+from app.domain.entities import ClassificationLog
+from app.infrastructure.db import create_db_engine
+from app.infrastructure.models import ClassificationLogModel
+from app.infrastructure.repositories.sql_log_repository import SqlLogRepository
+
+THREADS = 8
+PER_THREAD = 50
+
+
+def test_sqlite_pragmas_applied(tmp_path):
+    eng = create_db_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    with eng.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_concurrent_writers(tmp_path):
+    eng = create_db_engine(f"sqlite:///{tmp_path / 'stress.db'}")
+    SQLModel.metadata.create_all(eng)
+    repo = SqlLogRepository(session_factory=lambda: Session(eng))
+
+    ids, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(THREADS)
+
+    def writer(n: int):
+        start.wait()
+        for i in range(PER_THREAD):
+            try:
+                saved = repo.save(ClassificationLog(source="stress", subject=f"t{n}-{i}", category="productive"))
+                with lock:
+                    ids.append(saved.id)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    total = THREADS * PER_THREAD
+    assert not errors  # nenhum "database is locked"
+    assert len(set(ids)) == total and None not in ids
+    with Session(eng) as session:
+        assert session.exec(select(func.count()).select_from(ClassificationLogModel)).one() == total
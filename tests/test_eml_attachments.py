@@ -0,0 +1,104 @@
+import threading
+import time
+from email.message import EmailMessage
+
+from app.application.analysis import analyze_email
+from app.application.use_cases.classify_email import FileFacade
+from app.domain.entities import Category, Email
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.extractors.eml_extractor import EmlExtractor
+from app.infrastructure.extractors.extraction_cache import ExtractionCache
+from app.infrastructure.extractors.pdf_extractor import PdfExtractor
+from app.infrastructure.extractors.txt_extractor import TxtExtractor
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from tests.test_pdf_extractor import make_pdf
+
+
+def _eml(body, attachments):
+    msg = EmailMessage()
+    msg["Subject"], msg["From"] = "Pedido", "cliente@x.com"
+    msg.set_content(body)
+    for name, data, maintype, subtype in attachments:
+        msg.add_attachment(data, maintype=maintype, subtype=subtype, filename=name)
+    return msg.as_bytes()
+
+
+class SlowPdf:
+    cache_version = "slow"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def extract(self, raw, timeout_s=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        # como o PdfExtractor: para no prazo recebido
+        timed_out = timeout_s is not None and timeout_s < self.delay
+        time.sleep(timeout_s if timed_out else self.delay)
+        with self.lock:
+            self.active -= 1
+        self.finished.set()
+        if timed_out:
+            raise TimeoutError("tempo limite")
+        return "pdf ok"
+
+
+def test_attachments_are_extracted_separately_from_the_body():
+    raw = _eml("Segue em anexo.", [
+        ("pedido.pdf", make_pdf(["Pedido de compra 123"]), "application", "pdf"),
+        ("notas.txt", "contrato assinado".encode(), "text", "plain"),
+        ("foto.png", b"\x89PNG", "image", "png"),
+    ])
+    ext = EmlExtractor(pdf_extractor=PdfExtractor(workers=0), txt_extractor=TxtExtractor(), attachments=True)
+    doc = ext.extract_document(raw)
+
+    assert doc.text == "Segue em anexo."
+    assert [(a.filename, a.text, a.error) for a in doc.attachments] == [
+        ("pedido.pdf", "Pedido de compra 123", None),
+        ("notas.txt", "contrato assinado", None),
+    ]
+    # desligado: mesmo corpo, sem anexos
+    assert EmlExtractor().extract_document(raw).attachments == []
+
+
+def test_attachments_run_in_parallel_within_count_bytes_and_time_budget():
+    pdf = SlowPdf(0.2)
+    files = [(f"a{i}.pdf", b"%PDF-" + b"x" * 100, "application", "pdf") for i in range(4)]
+    raw = _eml("corpo", files + [("grande.pdf", b"%PDF-" + b"x" * 5000, "application", "pdf")])
+    ext = EmlExtractor(pdf_extractor=pdf, attachments=True, max_attachments=3, max_attachment_bytes=1000)
+
+    t0 = time.monotonic()
+    doc = ext.extract_document(raw)
+    assert time.monotonic() - t0 < 0.5 and pdf.peak == 3
+    assert [a.error for a in doc.attachments] == [None, None, None, "limite de anexos", "limite de anexos"]
+
+    slow = SlowPdf(5.0)
+    ext = EmlExtractor(pdf_extractor=slow, attachments=True, attachments_timeout_s=0.1)
+    doc = ext.extract_document(_eml("corpo", files[:1]))
+    assert doc.attachments[0].error == "tempo limite"
+    assert slow.finished.wait(1)  # o job recebeu o prazo restante e parou, não seguiu por 5s
+    ext.close()
+
+
+def test_attachment_hits_weigh_less_than_body_and_survive_the_cache():
+    raw = _eml("Olá, segue.", [("contrato.txt", "contrato e fatura do pedido".encode(), "text", "plain")])
+    ext = EmlExtractor(txt_extractor=TxtExtractor(), attachments=True)
+    facade = FileFacade(None, TxtExtractor(), ext, cache=ExtractionCache())
+    facade.from_document("m.eml", raw)
+    doc = facade.from_document("m.eml", raw)  # vem do cache
+    assert facade.cache_stats()["hits_memory"] == 1 and doc.attachments[0].text.startswith("contrato")
+
+    tk, clf = SimpleTokenizer(lang="pt"), RuleBasedClassifier()
+    email = Email(subject="Pedido", body=doc.text, attachments=doc.attachments)
+    a = analyze_email(tk, email)
+    via_att = clf.classify(email, a.tokens, analysis=a)
+    assert via_att.category == Category.PRODUCTIVE and via_att.extra["attachment_hits"]
+
+    in_body = Email(subject="Pedido", body="contrato e fatura do pedido")
+    b = analyze_email(tk, in_body)
+    assert clf.classify(in_body, b.tokens, analysis=b).extra["confidence"] > via_att.extra["confidence"]
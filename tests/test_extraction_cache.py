@@ -0,0 +1,55 @@
+from app.application.use_cases.classify_email import FileFacade
+from app.infrastructure.extractors.extraction_cache import ExtractionCache
+
+
+class CountingTxt:
+    cache_version = "txt-test"
+
+    def __init__(self):
+        self.calls = 0
+
+    def extract(self, raw):
+        self.calls += 1
+        return raw.read_bytes().decode()
+
+
+def test_facade_reuses_text_by_content_and_extractor_version():
+    txt, cache = CountingTxt(), ExtractionCache()
+    facade = FileFacade(None, txt, cache=cache)
+
+    assert facade.from_upload("a.txt", b"fatura") == "fatura"
+    assert facade.from_upload("outro-nome.txt", b"fatura") == "fatura"  # mesmo conteúdo, nome diferente
+    assert txt.calls == 1
+
+    txt.cache_version = "txt-test-2"  # extrator mudou → chave nova
+    facade.from_upload("a.txt", b"fatura")
+    assert txt.calls == 2
+    st = facade.cache_stats()
+    assert (st["hits_memory"], st["misses"]) == (1, 2)
+
+
+def test_memory_lru_evicts_by_size():
+    cache = ExtractionCache(max_memory_bytes=10)
+    cache.put("a", "12345")
+    cache.put("b", "12345")
+    cache.get("a")  # "a" passa a ser o mais recente
+    cache.put("c", "12345")
+    assert cache.get("b") is None and cache.get("a") == "12345"
+    assert cache.stats()["evictions"] == 1 and cache.stats()["memory_bytes"] == 10
+
+
+def test_disk_tier_survives_restart_and_is_bounded(tmp_path):
+    cache = ExtractionCache(disk_dir=str(tmp_path))
+    key = cache.key(b"pdf", "v1")
+    cache.put(key, "texto " * 100)
+
+    fresh = ExtractionCache(disk_dir=str(tmp_path))  # novo processo: memória vazia
+    assert fresh.get(key) == "texto " * 100
+    assert fresh.stats()["hits_disk"] == 1
+    assert fresh.get(key) and fresh.stats()["hits_memory"] == 1
+
+    small = ExtractionCache(max_memory_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=200)
+    for i in range(20):
+        small.put(small.key(bytes([i]), "v1"), str(i) * 500)
+    assert small.stats()["disk_bytes"] <= 200
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.z")) <= 200
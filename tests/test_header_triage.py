@@ -0,0 +1,88 @@
+from app.application.use_cases.classify_email import FileFacade, ClassifyEmailUseCase
+from app.application.use_cases.sync_emails import SyncEmailsUseCase
+from app.domain.entities import Category
+from app.infrastructure.classifiers.header_triage import triage_headers
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.email_sources.imap_adapter import ImapEmailSource
+from app.infrastructure.extractors.eml_extractor import EmlExtractor
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.profiles.profile_json import JsonProfileAdapter
+from app.infrastructure.responders.simple_templates import SimpleResponder
+
+NEWSLETTER = {
+    "List-Unsubscribe": "<https://x.com/u?id=1>",
+    "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
+    "X-SG-EID": "abc",
+}
+
+
+class Repo:
+    def __init__(self):
+        self.logs = []
+
+    def save(self, log):
+        self.logs.append(log)
+        return log
+
+    def save_many(self, logs):
+        self.logs.extend(logs)
+        return logs
+
+
+class ExplodingClassifier:
+    def classify(self, *a, **kw):
+        raise AssertionError("classificador não deveria ser chamado")
+
+
+def test_triage_needs_conclusive_headers():
+    assert triage_headers({"List-Id": "<dev.lists.x.com>"}) is None  # lista de discussão sozinha não basta
+    assert triage_headers({"Auto-Submitted": "no"}) is None
+
+    r = triage_headers({"auto-submitted": "auto-replied"})
+    assert r.category == Category.UNPRODUCTIVE and r.suggested_reply == ""
+
+    r = triage_headers(NEWSLETTER)
+    assert r.extra["pre_triage"]["signals"] == ["list-unsubscribe", "list-unsubscribe-post", "esp:x-sg-eid"]
+
+
+def test_imap_skips_body_fetch_for_bulk_mail(fake_imap):
+    fake_imap.append("Ofertas da semana", "promo " * 1000, headers=NEWSLETTER)
+    fake_imap.append("Reunião", "Podemos marcar amanhã?")
+    src = ImapEmailSource("127.0.0.1", "u", "p", port=fake_imap.port, ssl=False)
+
+    emails = dict(src.fetch_unread())
+    assert emails["1"].triage is not None and emails["1"].body == ""
+    assert emails["2"].triage is None and "amanhã" in emails["2"].body
+    body_fetches = [c for c in fake_imap.commands_named("UID FETCH") if "BODY.PEEK[1]" in c]
+    assert len(body_fetches) == 1 and body_fetches[0].startswith("UID FETCH 2 ")
+
+    repo = Repo()
+    fake_imap.mailbox[0].flags.clear()
+    uc = SyncEmailsUseCase(src, RuleBasedClassifier(), repo, "default", SimpleTokenizer(lang="pt"))
+    uc.run()
+    triaged = next(log for log in repo.logs if log.subject == "Ofertas da semana")
+    assert triaged.category == Category.UNPRODUCTIVE and "pre_triage" in triaged.extra
+    assert "Ofertas da semana" in [m.subject for m in fake_imap.folders["Improdutivos"]]
+    src.disconnect()
+
+
+def test_eml_triage_skips_extraction_and_classifier():
+    raw = (
+        b"Subject: Seu pedido\r\nFrom: loja@x.com\r\nAuto-Submitted: auto-generated\r\n"
+        b"Content-Type: text/plain\r\n\r\ncorpo que nao deve ser lido\r\n"
+    )
+    repo = Repo()
+    uc = ClassifyEmailUseCase(
+        file_facade=FileFacade(None, None, EmlExtractor()),
+        tokenizer=SimpleTokenizer(lang="auto"),
+        classifier=ExplodingClassifier(),
+        responder=SimpleResponder(),
+        profiles=JsonProfileAdapter(),
+        log_repo=repo,
+    )
+    result = uc.execute_from_file("n.eml", raw)
+    assert result.category == Category.UNPRODUCTIVE
+    assert repo.logs[0].body_excerpt == "" and repo.logs[0].used_model == "header-triage"
+
+    # desligado: volta ao fluxo normal (extração + classificador)
+    assert EmlExtractor(header_triage=False).triage(raw) is None
@@ -0,0 +1,30 @@
+import pytest
+
+from app.infrastructure.extractors.eml_extractor import EmlExtractor
+from app.infrastructure.extractors.html_text import fast_html_to_text, get_html_converter
+
+HTML = (
+    "<html><head><title>News</title><style>td{color:red}</style></head><body>"
+    "<!-- pixel --><script>var x = '<p>não</p>';</script>"
+    "<table><tr><td>Oferta&nbsp;1</td><td>  R$&nbsp;10  </td></tr>"
+    "<tr><td>Oferta 2</td></tr></table><p>Olá,<br>tudo   bem?</p></body></html>"
+)
+
+
+def test_fast_converter_drops_style_script_comments_and_collapses_whitespace():
+    assert fast_html_to_text(HTML) == "Oferta 1 R$ 10\nOferta 2\nOlá,\ntudo bem?"
+
+
+def test_fast_converter_caps_output_and_stops_reading():
+    big = "<p>" + "palavra " * 200_000 + "</p><p>FIM</p>"
+    text = fast_html_to_text(big, max_chars=100)
+    assert len(text) == 100 and "FIM" not in text
+
+
+def test_eml_extractor_uses_configured_converter():
+    raw = b"Subject: x\r\nContent-Type: text/html; charset=utf-8\r\n\r\n" + HTML.encode("utf-8")
+    fast = EmlExtractor(header_triage=False).extract(raw)
+    bs4 = EmlExtractor(header_triage=False, html_converter="bs4").extract(raw)
+    assert fast.split() == [w for w in bs4.split() if w != "News"]
+    with pytest.raises(ValueError):
+        get_html_converter("lxml")
@@ -0,0 +1,196 @@
+import pytest
+from sqlmodel import SQLModel, Session
+
+from app.application.use_cases.sync_emails import SyncEmailsUseCase, _UidProgress
+from app.domain.entities import Email, MailboxState
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.db import create_db_engine
+from app.infrastructure.email_sources.imap_adapter import ImapEmailSource
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.repositories.sql_checkpoint_repository import SqlCheckpointRepository
+from tests.fake_imap_server import FakeImapServer
+
+KEY = "u@127.0.0.1/INBOX"
+
+
+class Repo:
+    def __init__(self):
+        self.logs = []
+
+    def save_many(self, logs):
+        self.logs.extend(logs)
+        return logs
+
+
+class FlakySource:
+    """Caixa em memória (interface de UIDs); `move_fails` lista pastas cujo move falha.
+
+    Com `labels_only` o move só rotula (como no Gmail) e a mensagem continua na caixa.
+    """
+
+    def __init__(self, n, move_fails=(), labels_only=False):
+        self.unseen = {uid: Email(subject=f"s{uid}", body="Podemos marcar uma reunião?") for uid in range(1, n + 1)}
+        self.move_fails = set(move_fails)
+        self.labels_only = labels_only
+        self.fetched = []
+
+    def mailbox_state(self):
+        return MailboxState(uidvalidity=1, uidnext=max(self.unseen, default=0) + 1)
+
+    def search_unseen(self):
+        return sorted(self.unseen)
+
+    def search_since(self, last_uid):
+        return [uid for uid in sorted(self.unseen) if uid > last_uid]
+
+    def fetch_uids(self, uids):
+        for uid in uids:
+            self.fetched.append(uid)
+            yield str(uid), self.unseen[uid]
+
+    def move_batch(self, msg_ids, folder):
+        if folder in self.move_fails:
+            raise ConnectionError("caiu")
+        if self.labels_only:
+            return
+        for msg_id in msg_ids:
+            self.unseen.pop(int(msg_id))
+
+
+class FailingRepo:
+    def save_many(self, logs):
+        raise RuntimeError("database is locked")
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    eng = create_db_engine(f"sqlite:///{tmp_path / 'cp.db'}")
+    SQLModel.metadata.create_all(eng)
+    return SqlCheckpointRepository(session_factory=lambda: Session(eng))
+
+
+@pytest.fixture
+def fake_imap_condstore():
+    server = FakeImapServer(capabilities=("IMAP4rev1", "ENABLE", "CONDSTORE")).start()
+    yield server
+    server.stop()
+
+
+def _sync(server, checkpoints, repo):
+    src = ImapEmailSource("127.0.0.1", "u", "p", port=server.port, ssl=False)
+    uc = SyncEmailsUseCase(src, RuleBasedClassifier(), repo, "default", SimpleTokenizer(lang="pt"),
+                           checkpoints=checkpoints, checkpoint_key=KEY)
+    return src, uc
+
+
+def test_incremental_sync_catches_messages_already_read_by_the_user(fake_imap, checkpoints):
+    repo = Repo()
+    fake_imap.append("antigo lido", "x")
+    fake_imap.mailbox[0].flags.add("\\Seen")
+    src, uc = _sync(fake_imap, checkpoints, repo)
+
+    # primeira sincronização: sem checkpoint parte dos não lidos e marca a caixa toda como vista
+    assert uc.run() == 0
+    assert checkpoints.get(KEY).last_uid == 1
+
+    fake_imap.append("novo lido", "y")
+    fake_imap.append("novo", "z")
+    fake_imap.mailbox[1].flags.add("\\Seen")  # usuário leu no cliente antes da nossa sincronização
+    fake_imap.commands.clear()
+
+    assert uc.run() == 2
+    assert sorted(log.subject for log in repo.logs) == ["novo", "novo lido"]
+    assert fake_imap.commands_named("UID SEARCH") == ["UID SEARCH UID 2:*"]
+    assert checkpoints.get(KEY).last_uid == 3
+
+    # nada novo: "UID 4:*" devolve a última mensagem (UID 1), que é filtrada
+    assert uc.run() == 0
+    assert [m.subject for m in fake_imap.mailbox] == ["antigo lido"]
+    src.disconnect()
+
+
+def test_uidvalidity_change_restarts_from_unseen(fake_imap, checkpoints):
+    repo = Repo()
+    src, uc = _sync(fake_imap, checkpoints, repo)
+    uc.run()
+    fake_imap.append("a", "x")
+    uc.run()
+    assert checkpoints.get(KEY).last_uid == 1
+
+    fake_imap.uidvalidity = 2
+    fake_imap.append("b", "y")
+    fake_imap.commands.clear()
+    assert uc.run() == 1
+    assert fake_imap.commands_named("UID SEARCH") == ["UID SEARCH UNSEEN"]
+    cp = checkpoints.get(KEY)
+    assert (cp.uidvalidity, cp.last_uid) == (2, 2)
+    src.disconnect()
+
+
+def test_condstore_skips_search_when_mailbox_unchanged(fake_imap_condstore, checkpoints):
+    repo = Repo()
+    src, uc = _sync(fake_imap_condstore, checkpoints, repo)
+    fake_imap_condstore.append("a", "x")
+    uc.run()
+    uc.run()  # o próprio move mudou o modseq: uma busca vazia
+    assert checkpoints.get(KEY).highest_modseq == fake_imap_condstore.modseq
+
+    fake_imap_condstore.commands.clear()
+    assert uc.run() == 0
+    assert fake_imap_condstore.commands_named("UID SEARCH") == []
+    src.disconnect()
+
+
+def test_checkpoint_holds_messages_neither_saved_nor_moved(checkpoints):
+    def sync(src, repo):
+        uc = SyncEmailsUseCase(src, RuleBasedClassifier(), repo, "default", SimpleTokenizer(lang="pt"),
+                               checkpoints=checkpoints, checkpoint_key=KEY)
+        uc.run()
+        return uc.stats()
+
+    # gravação e move falhando: nada concluído, o checkpoint não passa das mensagens
+    stats = sync(FlakySource(3, move_fails={"Produtivos", "Improdutivos"}), FailingRepo())
+    assert (stats["persisted"], stats["moved"]) == (0, 0)
+    assert checkpoints.get(KEY).last_uid == 0
+
+    # gravado mas não movido também segura
+    src = FlakySource(3, move_fails={"Produtivos", "Improdutivos"})
+    assert sync(src, Repo())["persisted"] == 3
+    assert checkpoints.get(KEY).last_uid == 0
+
+    # com o move de volta, o ciclo seguinte reprocessa e avança até o fim
+    src.move_fails.clear()
+    assert sync(src, Repo())["moved"] == 3
+    assert checkpoints.get(KEY).last_uid == 3 and not src.unseen
+
+
+def test_failing_move_is_retried_without_duplicate_logs_then_given_up(checkpoints):
+    src = FlakySource(3, move_fails={"Improdutivos"}, labels_only=True)
+    src.unseen[2] = Email(subject="Promoção", body="Promoção imperdível com desconto e cupom grátis, clique já!")
+    repo = Repo()
+    uc = SyncEmailsUseCase(src, RuleBasedClassifier(), repo, "default", SimpleTokenizer(lang="pt"),
+                           checkpoints=checkpoints, checkpoint_key=KEY, max_attempts=3)
+
+    uc.run()  # 1 e 3 movidos; 2 gravado, move falhou
+    assert uc.stats()["moved"] == 2 and checkpoints.get(KEY).last_uid == 1
+
+    uc.run()  # só o 2 volta (o 3 já foi concluído, mesmo continuando na caixa); log não é regravado
+    assert src.fetched == [1, 2, 3, 2] and len(repo.logs) == 3
+    assert checkpoints.get(KEY).last_uid == 1
+
+    uc.run()  # 3ª falha: desiste e libera o checkpoint
+    assert uc.stats()["gave_up"] == 1 and checkpoints.get(KEY).last_uid == 3
+    assert len(repo.logs) == 3
+
+    uc.run()  # nada mais a buscar
+    assert src.fetched == [1, 2, 3, 2, 2]
+
+
+def test_progress_only_advances_over_contiguous_done_uids():
+    p = _UidProgress([5, 7, 9], floor=4, ceiling=12)
+    p.mark("7")
+    assert p.last_uid() == 4
+    p.mark("5")
+    assert p.last_uid() == 7 and not p.complete()
+    p.mark("9")
+    assert p.last_uid() == 12 and p.complete()
@@ -0,0 +1,84 @@
+import base64
+
+from app.infrastructure.email_sources.imap_adapter import ImapEmailSource
+from app.infrastructure.email_sources.imap_parser import (
+    parse_fetch, compress_uids, walk_bodystructure, pick_text_part, decode_part,
+)
+
+# multipart/mixed( multipart/alternative(text/plain qp, text/html b64), application/pdf anexo )
+BS = (
+    b'((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 20 1 NIL NIL NIL)'
+    b'("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "BASE64" 40 1 NIL NIL NIL) "ALTERNATIVE")'
+    b'("APPLICATION" "PDF" ("NAME" "a.pdf") NIL NIL "BASE64" 90000 NIL ("ATTACHMENT" ("FILENAME" "a.pdf")) NIL) "MIXED")'
+)
+HEADERS = b"Subject: =?utf-8?q?Reuni=C3=A3o?=\r\nFrom: Ana <ana@x.com>\r\n\r\n"
+
+
+def test_parse_fetch_and_bodystructure():
+    data = [
+        (b"1 (UID 7 BODYSTRUCTURE " + BS + b" BODY[HEADER.FIELDS (SUBJECT FROM)] {%d}" % len(HEADERS), HEADERS),
+        b")",
+    ]
+    [(seq, item)] = parse_fetch(data)
+    assert seq == 1 and item["UID"] == b"7"
+    assert item["BODY[HEADER.FIELDS (SUBJECT FROM)]"] == HEADERS
+
+    parts = walk_bodystructure(item["BODYSTRUCTURE"])
+    assert [(p.section, p.ctype) for p in parts] == [
+        ("1.1", "text/plain"), ("1.2", "text/html"), ("2", "application/pdf"),
+    ]
+    assert parts[2].disposition == "attachment" and parts[2].filename == "a.pdf"
+    assert pick_text_part(parts).section == "1.1"
+
+
+def test_compress_uids_and_truncated_base64():
+    assert compress_uids([9, 1, 2, 3, 7, 10]) == "1:3,7,9:10"
+    raw = base64.b64encode("olá mundo".encode())
+    assert decode_part(raw[:-3], "base64", "utf-8").startswith("olá")
+
+
+class FakeConn:
+    """Conexão imaplib falsa: responde UID SEARCH/FETCH com dados no formato do imaplib."""
+
+    def __init__(self):
+        self.calls = []
+        self.untagged_responses = {}
+
+    def select(self, mailbox):
+        return "OK", [b"2"]
+
+    def uid(self, cmd, *args):
+        self.calls.append((cmd, args))
+        if cmd == "SEARCH":
+            return "OK", [b"7 8"]
+        if cmd == "FETCH" and "BODYSTRUCTURE" in args[1]:
+            simple = b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 5 1 NIL NIL NIL)'
+            return "OK", [
+                (b"1 (UID 7 BODYSTRUCTURE " + simple + b" BODY[HEADER.FIELDS (SUBJECT FROM)] {%d}" % len(HEADERS), HEADERS),
+                b")",
+                (b"2 (UID 8 BODYSTRUCTURE " + BS + b" BODY[HEADER.FIELDS (SUBJECT FROM)] {%d}" % len(HEADERS), HEADERS),
+                b")",
+            ]
+        if cmd == "FETCH" and "BODY.PEEK[1]<" in args[1]:
+            return "OK", [(b"1 (UID 7 BODY[1]<0> {5}", b"hello"), b")"]
+        if cmd == "FETCH" and "BODY.PEEK[1.1]<" in args[1]:
+            return "OK", [(b"2 (UID 8 BODY[1.1]<0> {10}", b"ol=C3=A1 a"), b")"]
+        return "OK", [None]
+
+
+def test_fetch_unread_batches_and_skips_attachments():
+    src = ImapEmailSource("h", "u", "p", fetch_batch=50, body_byte_cap=1024)
+    src.conn = FakeConn()
+
+    out = list(src.fetch_unread())
+
+    assert [uid for uid, _ in out] == ["7", "8"]
+    assert out[0][1].subject == "Reunião" and "ana@x.com" in out[0][1].sender
+    assert out[0][1].body == "hello" and out[1][1].body == "olá a"
+
+    fetches = [args for cmd, args in src.conn.calls if cmd == "FETCH"]
+    # 1 FETCH de estrutura para o lote + 1 por seção de texto; o PDF nunca é pedido
+    assert len(fetches) == 3
+    assert fetches[0][0] == "7:8"
+    assert all("<0.1024>" in a[1] for a in fetches[1:])
+    assert not any("[2]" in a[1] for a in fetches)
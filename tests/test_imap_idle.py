@@ -0,0 +1,119 @@
+import threading
+import time
+
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.email_sources.imap_adapter import ImapEmailSource
+from app.infrastructure.email_sources.imap_service import ImapService
+
+
+class MemoryLogRepo:
+    def __init__(self):
+        self.logs = []
+
+    def save(self, log):
+        self.logs.append(log)
+        return log
+
+    def save_many(self, logs):
+        self.logs.extend(logs)
+        return logs
+
+
+def _source(server) -> ImapEmailSource:
+    return ImapEmailSource("127.0.0.1", "u", "p", port=server.port, ssl=False)
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_idle_wakes_on_exists_and_times_out(fake_imap):
+    src = _source(fake_imap)
+    assert src.supports_idle()
+    assert list(src.fetch_unread()) == []
+
+    assert src.idle(timeout=0.2) is False
+
+    threading.Timer(0.2, fake_imap.append, args=("Oi", "corpo")).start()
+    t0 = time.monotonic()
+    assert src.idle(timeout=5) is True
+    assert time.monotonic() - t0 < 2
+
+    # conexão continua utilizável depois do DONE
+    [(uid, email)] = list(src.fetch_unread())
+    assert email.subject == "Oi" and email.body == "corpo"
+    src.disconnect()
+
+
+def test_exists_between_search_and_idle_is_not_lost(fake_imap):
+    src = _source(fake_imap)
+    list(src.fetch_unread())
+    fake_imap.append("Chegou no meio", "x")
+    src.mark_as_read(["999"])  # qualquer comando traz o EXISTS pendente
+    assert src.idle(timeout=5) is True
+    src.disconnect()
+
+
+def test_service_idle_mode_processes_new_mail_without_polling(fake_imap):
+    fake_imap.append("Pedido de suporte", "Preciso de ajuda com o sistema, erro no login")
+    repo = MemoryLogRepo()
+    svc = ImapService(_source(fake_imap), RuleBasedClassifier(), repo, "default", interval=60)
+    svc.start()
+    try:
+        assert _wait(lambda: len(repo.logs) == 1)
+        assert _wait(lambda: svc.mode == "idle")
+
+        fake_imap.append("Feliz natal", "Boas festas a todos")
+        assert _wait(lambda: len(repo.logs) == 2, timeout=3)  # muito abaixo do interval=60
+        assert _wait(lambda: len(fake_imap.commands_named("IDLE")) >= 2)
+    finally:
+        t0 = time.monotonic()
+        svc.stop()
+        assert time.monotonic() - t0 < 3
+    assert fake_imap.mailbox == []  # ambos movidos para as pastas de destino
+
+
+def test_service_falls_back_to_polling_without_idle(fake_imap_no_idle):
+    fake_imap_no_idle.append("Oi", "mensagem")
+    repo = MemoryLogRepo()
+    svc = ImapService(_source(fake_imap_no_idle), RuleBasedClassifier(), repo, "default", interval=0.2)
+    svc.start()
+    try:
+        assert _wait(lambda: len(repo.logs) == 1)
+        fake_imap_no_idle.append("Outra", "mensagem")
+        assert _wait(lambda: len(repo.logs) == 2)
+        assert svc.mode == "poll"
+        assert fake_imap_no_idle.commands_named("IDLE") == []
+    finally:
+        svc.stop()
+
+
+def test_exists_sent_with_the_idle_continuation_is_read_from_imaplib_buffer(fake_imap):
+    src = _source(fake_imap)
+    list(src.fetch_unread())
+    fake_imap.append("Junto do +", "x")  # o servidor manda "+ idling" e o EXISTS no mesmo pacote
+    t0 = time.monotonic()
+    assert src.idle(timeout=3) is True
+    assert time.monotonic() - t0 < 1
+    src.disconnect()
+
+
+def test_other_commands_interrupt_idle_instead_of_waiting_for_it(fake_imap):
+    src = _source(fake_imap)
+    list(src.fetch_unread())
+    result = []
+    t = threading.Thread(target=lambda: result.append(src.idle(timeout=30)))
+    t.start()
+    assert _wait(lambda: src._idling)
+
+    t0 = time.monotonic()
+    assert src.search_unseen() == []  # pede o DONE em vez de esperar o IDLE inteiro
+    assert time.monotonic() - t0 < 2
+    t.join(5)
+    assert result == [False]
+    src.disconnect()
@@ -0,0 +1,59 @@
+import pytest
+
+from app.infrastructure.email_sources.imap_adapter import ImapEmailSource
+from tests.fake_imap_server import FakeImapServer
+
+
+@pytest.fixture
+def fake_imap_move():
+    server = FakeImapServer(capabilities=("IMAP4rev1", "IDLE", "MOVE")).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake_imap_uidplus():
+    server = FakeImapServer(capabilities=("IMAP4rev1", "UIDPLUS")).start()
+    yield server
+    server.stop()
+
+
+def _deliver_and_fetch(server, n):
+    for i in range(n):
+        server.append(f"m{i}", "corpo")
+    src = ImapEmailSource("127.0.0.1", "u", "p", port=server.port, ssl=False)
+    uids = [uid for uid, _ in src.fetch_unread()]
+    server.commands.clear()
+    return src, uids
+
+
+def test_move_batch_uses_uid_move_and_creates_folder_once(fake_imap_move):
+    src, uids = _deliver_and_fetch(fake_imap_move, 5)
+
+    src.move_batch(uids[:3], "Produtivos")
+    src.move_batch(uids[3:], "Improdutivos")
+    src.move_batch([], "Produtivos")
+    fake_imap_move.append("m5", "corpo")
+    [(uid, _)] = list(src.fetch_unread())
+    src.move_batch([uid], "Produtivos")
+
+    assert fake_imap_move.mailbox == []
+    assert [m.subject for m in fake_imap_move.folders["Produtivos"]] == ["m0", "m1", "m2", "m5"]
+    assert all("\\Seen" in m.flags for m in fake_imap_move.folders["Produtivos"])
+    assert len(fake_imap_move.commands_named("UID MOVE")) == 3
+    assert len(fake_imap_move.commands_named("CREATE")) == 2  # uma vez por pasta
+    assert fake_imap_move.commands_named("UID MOVE")[0].startswith("UID MOVE 1:3 ")
+    src.disconnect()
+
+
+def test_move_batch_falls_back_to_copy_store_uid_expunge(fake_imap_uidplus):
+    src, uids = _deliver_and_fetch(fake_imap_uidplus, 4)
+
+    src.move_batch(uids, "Improdutivos")
+
+    assert fake_imap_uidplus.mailbox == []
+    assert len(fake_imap_uidplus.folders["Improdutivos"]) == 4
+    for cmd in ("UID COPY", "UID EXPUNGE"):
+        assert len(fake_imap_uidplus.commands_named(cmd)) == 1
+    assert fake_imap_uidplus.commands_named("EXPUNGE") == []  # nada de EXPUNGE global
+    src.disconnect()
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.email_sources.imap_adapter import ImapEmailSource
+from app.infrastructure.email_sources.imap_registry import ImapRegistry, account_key, mailbox_key
+from app.infrastructure.email_sources.imap_service import ImapService
+from app.interfaces.http import imap_router
+
+
+class MemoryLogRepo:
+    def __init__(self):
+        self.logs = []
+
+    def save(self, log):
+        self.logs.append(log)
+        return log
+
+    def save_many(self, logs):
+        self.logs.extend(logs)
+        return logs
+
+
+def _wait(cond, timeout=8.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _factory(server, mailbox, repo, interval, classifier=None):
+    def factory(executor, connection_slots, classify_workers):
+        src = ImapEmailSource("127.0.0.1", "u", "p", mailbox=mailbox, port=server.port, ssl=False)
+        return ImapService(src, classifier or RuleBasedClassifier(), repo, "default", interval=interval,
+                           executor=executor, connection_slots=connection_slots, classify_workers=classify_workers)
+    return factory
+
+
+def test_registry_runs_many_mailboxes_within_account_connection_limit(fake_imap):
+    boxes = ["INBOX", "Suporte", "Vendas"]
+    for i, box in enumerate(boxes):
+        fake_imap.append(f"Mensagem {i}", "Preciso de ajuda com o sistema", mailbox=box)
+
+    repo = MemoryLogRepo()
+    reg = ImapRegistry(max_workers=2, max_connections_per_account=2)
+    account = account_key("u", "127.0.0.1")
+    try:
+        for box in boxes:
+            reg.add(mailbox_key("u", "127.0.0.1", box), account, _factory(fake_imap, box, repo, 0.1))
+
+        assert _wait(lambda: len(repo.logs) == 3)
+        # 3 caixas, 2 conexões: ninguém fica preso em IDLE e o limite é respeitado
+        assert all(not reg.get(k).persistent for k in reg.keys())
+        assert fake_imap.peak_sessions <= 2
+
+        fake_imap.append("Nova", "Outra mensagem", mailbox="Vendas")
+        assert _wait(lambda: len(repo.logs) == 4)
+
+        assert _wait(lambda: reg.stats()["processed"] == 4)
+        st = reg.stats()
+        assert st["mailboxes"] == 3 and st["connections"][account]["limit"] == 2
+
+        # removendo uma caixa a conta volta a caber no limite: as restantes voltam a usar IDLE
+        assert reg.remove(mailbox_key("u", "127.0.0.1", "Vendas"))
+        assert _wait(lambda: all(reg.get(k).mode == "idle" for k in reg.keys()))
+        assert reg.stats()["processed"] == 4  # contadores da caixa removida são mantidos
+    finally:
+        reg.stop_all()
+
+
+class ThreadCountingClassifier(RuleBasedClassifier):
+    """Registra quantas threads de sincronização (pool + estágios) existem durante cada classificação."""
+
+    def __init__(self):
+        super().__init__()
+        self.peak = 0
+
+    def classify(self, *args, **kwargs):
+        alive = [t for t in threading.enumerate() if t.name.startswith(("imap-sync", "sync-"))]
+        self.peak = max(self.peak, len(alive))
+        return super().classify(*args, **kwargs)
+
+
+def test_sync_threads_stay_within_the_registry_bound(fake_imap):
+    boxes = ["INBOX", "Suporte", "Vendas"]
+    for box in boxes:
+        for i in range(3):
+            fake_imap.append(f"{box} {i}", "Preciso de ajuda com o sistema", mailbox=box)
+
+    repo, clf = MemoryLogRepo(), ThreadCountingClassifier()
+    reg = ImapRegistry(max_workers=2, max_connections_per_account=5, classify_workers=1)
+    try:
+        for box in boxes:
+            reg.add(mailbox_key("u", "127.0.0.1", box), "a", _factory(fake_imap, box, repo, 60, classifier=clf))
+        assert _wait(lambda: len(repo.logs) == 9)
+    finally:
+        reg.stop_all()
+
+    # 2 ciclos simultâneos × (thread do pool + 1 classificador + gravar + mover)
+    assert reg.stats()["max_sync_threads"] == 8
+    assert 0 < clf.peak <= 8
+
+
+def test_registry_rejects_duplicates_unless_replacing(fake_imap):
+    repo = MemoryLogRepo()
+    reg = ImapRegistry(max_workers=1, max_connections_per_account=5)
+    key = mailbox_key("u", "127.0.0.1", "INBOX")
+    try:
+        reg.add(key, "a", _factory(fake_imap, "INBOX", repo, 60))
+        with pytest.raises(KeyError):
+            reg.add(key, "a", _factory(fake_imap, "INBOX", repo, 60))
+        old = reg.get(key)
+        new = reg.add(key, "a", _factory(fake_imap, "INBOX", repo, 30), replace=True)
+        assert new is not old and not old.is_running and reg.status(key)["interval"] == 30
+    finally:
+        reg.stop_all()
+
+
+def test_status_endpoint_reflects_the_mailboxes(fake_imap, monkeypatch):
+    reg = ImapRegistry(max_workers=2, max_connections_per_account=5)
+    monkeypatch.setattr(imap_router, "registry", reg)
+    app = FastAPI()
+    app.include_router(imap_router.router)
+    client = TestClient(app)
+    repo = MemoryLogRepo()
+    try:
+        assert client.get("/imap/status").json() == {"status": "not configured"}
+        for box in ("INBOX", "Suporte"):
+            reg.add(mailbox_key("u", "127.0.0.1", box), "a", _factory(fake_imap, box, repo, 60))
+        assert client.get("/imap/status").json()["status"] == "running"
+
+        reg.get(mailbox_key("u", "127.0.0.1", "Suporte")).stop()
+        assert client.get("/imap/status").json()["status"] == "partial"
+        reg.get(mailbox_key("u", "127.0.0.1", "INBOX")).stop()
+        body = client.get("/imap/status").json()
+        assert body["status"] == "stopped" and {st["status"] for st in body["mailboxes"]} == {"stopped"}
+    finally:
+        reg.stop_all()
@@ -0,0 +1,26 @@
+from app.domain.entities import Email
+from app.infrastructure.nlp.keyword_index import KeywordIndex
+from app.infrastructure.profiles.profile_json import JsonProfileAdapter
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+
+
+def test_matches_single_and_multi_word_terms():
+    idx = KeywordIndex(["Nota Fiscal", "boleto", "troca de mensagens"])
+    hits = idx.match("Segue a nota fiscal e o BOLETO; houve troca de mensagens ontem.")
+    assert hits == {"nota fiscal", "boleto", "troca de mensagens"}
+
+
+def test_respects_word_boundaries():
+    idx = KeywordIndex(["nota fiscal", "nf"])
+    assert idx.match("notafiscal anotação nfe") == set()
+
+
+def test_profile_index_is_compiled_once_and_used_by_classifier():
+    profiles = JsonProfileAdapter()
+    idx = profiles.get_keyword_index("financeiro")
+    assert idx is profiles.get_keyword_index("financeiro")
+    assert "nota fiscal" in idx.terms
+
+    email = Email(subject="NF", body="Em anexo a nota fiscal referente ao serviço.")
+    res = RuleBasedClassifier().classify(email, [], priority=idx)
+    assert "nota fiscal" in res.extra["profile_hits"]
@@ -0,0 +1,26 @@
+from app.domain.entities import Email
+from app.application.analysis import analyze_email
+from app.infrastructure.nlp.lang_detect import detect_lang
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+
+
+def test_detect_lang_pt_en_es():
+    assert detect_lang("Olá, segue em anexo a nota fiscal do pedido. Você pode confirmar?") == "pt"
+    assert detect_lang("Hi, please find attached the invoice for the order. Can you confirm?") == "en"
+    assert detect_lang("Hola, adjunto la factura del pedido. ¿Puede confirmar?") == "es"
+
+
+def test_detect_lang_empty_defaults_to_pt():
+    assert detect_lang("") == "pt"
+
+
+def test_analysis_lang_is_reused_by_classifier():
+    email = Email(subject="Meeting", body="Can we schedule a meeting about the contract?")
+    analysis = analyze_email(SimpleTokenizer(lang="auto"), email)
+    assert analysis.lang == "en"
+
+    # o classificador usa o idioma do contexto em vez de detectar de novo
+    analysis.lang = "es"
+    res = RuleBasedClassifier().classify(email, analysis.tokens, analysis=analysis)
+    assert res.extra["lang"] == "es"
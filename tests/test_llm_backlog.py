@@ -0,0 +1,171 @@
+import json
+
+from sqlmodel import SQLModel, Session
+
+from app.application.llm_backlog import LlmBacklog
+from app.application.use_cases.sync_emails import SyncEmailsUseCase
+from app.domain.entities import Email, MailboxState
+from app.infrastructure.classifiers.batch_providers import LocalFileBatchProvider
+from app.infrastructure.classifiers.http_pool import HttpConnectionPool
+from app.infrastructure.classifiers.openai_llm import OpenAIClassifier
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.classifiers.smart_classifier import SmartClassifier
+from app.infrastructure.db import create_db_engine
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.repositories.sql_batch_job_repository import SqlBatchJobRepository
+from app.infrastructure.repositories.sql_checkpoint_repository import SqlCheckpointRepository
+
+
+class MailboxSource:
+    """Caixa em memória com a interface de UIDs do ImapEmailSource."""
+
+    def __init__(self, emails):
+        self.unseen = dict(emails)
+        self.moves = []
+
+    def mailbox_state(self):
+        return MailboxState(uidvalidity=7, uidnext=max(self.unseen, default=0) + 1)
+
+    def search_unseen(self):
+        return sorted(self.unseen)
+
+    def search_since(self, last_uid):
+        return [uid for uid in sorted(self.unseen) if uid > last_uid]
+
+    def fetch_uids(self, uids):
+        for uid in uids:
+            yield str(uid), self.unseen[uid]
+
+    def move_batch(self, msg_ids, folder):
+        self.moves.append((folder, sorted(msg_ids)))
+        for msg_id in msg_ids:
+            self.unseen.pop(int(msg_id))
+
+
+class Repo:
+    def __init__(self):
+        self.logs = []
+
+    def save_many(self, logs):
+        self.logs.extend(logs)
+        return logs
+
+
+class BrokenJobs:
+    """Repositório de jobs cujo save falha até `fixed` virar True."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.fixed = False
+
+    def save(self, job):
+        if not self.fixed:
+            raise RuntimeError("disk I/O error")
+        return self.inner.save(job)
+
+    def list_open(self, mailbox_key):
+        return self.inner.list_open(mailbox_key)
+
+
+def answer(body):
+    """Handler do provedor local: responde como o chat completions; falha num assunto específico."""
+    prompt = body["messages"][1]["content"]
+    if "Subject: quebrado" in prompt:
+        raise RuntimeError("rate limit")
+    args = {"category": "productive", "reason": "pedido do cliente", "reply": "Obrigado!"}
+    return {
+        "choices": [{"message": {"tool_calls": [{"function": {"arguments": json.dumps(args)}}]}}],
+        "usage": {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60},
+    }
+
+
+def test_backlog_defers_escalations_and_applies_them_in_bulk(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    eng = create_db_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    SQLModel.metadata.create_all(eng)
+    jobs = SqlBatchJobRepository(session_factory=lambda: Session(eng))
+
+    llm = OpenAIClassifier(pool=HttpConnectionPool("http://127.0.0.1:9", read_timeout=1))
+    smart = SmartClassifier(rule_based=RuleBasedClassifier(), llm=llm, min_conf=0.99)
+    provider = LocalFileBatchProvider(str(tmp_path / "provider"))
+    backlog = LlmBacklog(smart, provider, jobs, work_dir=str(tmp_path / "batches"), min_messages=3, poll_interval_s=0)
+
+    src = MailboxSource({
+        1: Email(subject="Dúvida", body="Podemos conversar sobre o contrato?"),
+        2: Email(subject="quebrado", body="Oi, tudo bem?"),
+        3: Email(subject="Promo", body="Promoção com desconto e cupom: https://a.b https://c.d"),
+        4: Email(subject="Reunião", body="Podemos marcar uma reunião amanhã?"),
+    })
+    repo = Repo()
+    uc = SyncEmailsUseCase(src, smart, repo, "default", SimpleTokenizer(lang="pt"), backlog=backlog)
+
+    # 1º ciclo: spam sai na hora; os três escalados vão para um único job, sem chamada ao LLM
+    uc.run()
+    assert src.moves == [("Improdutivos", ["3"])] and llm.pool.stats()["requests"] == 0
+    assert uc.stats()["deferred"] == 3
+    [job] = jobs.list_open("default")
+    assert job.status == "submitted" and job.uidvalidity == 7
+    assert [i["msg_id"] for i in job.items] == ["1", "2", "4"]
+
+    # job ainda em andamento: nada aplicado e os mesmos e-mails não entram em outro job
+    uc.run()
+    assert len(jobs.list_open("default")) == 1 and len(repo.logs) == 1
+
+    # provedor conclui: logs gravados e um move por pasta
+    provider.handler = answer
+    uc.run()
+    assert jobs.list_open("default") == []
+    assert src.moves[1:] == [("Produtivos", ["1", "4"]), ("Improdutivos", ["2"])]
+    by_subject = {log.subject: log for log in repo.logs}
+    assert by_subject["Dúvida"].extra["llm_offline"] and by_subject["Dúvida"].reason == "pedido do cliente"
+    assert by_subject["quebrado"].extra["llm_offline_error"] == "rate limit"  # ficou com o rule-based
+    assert uc.stats()["backlog_applied"] == 3 and not list((tmp_path / "batches").glob("*.jsonl"))
+
+
+def test_small_cycles_keep_the_online_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    eng = create_db_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    SQLModel.metadata.create_all(eng)
+    llm = OpenAIClassifier(pool=HttpConnectionPool("http://127.0.0.1:9", connect_timeout=0.5, read_timeout=1))
+    smart = SmartClassifier(rule_based=RuleBasedClassifier(), llm=llm, min_conf=0.99)
+    backlog = LlmBacklog(smart, LocalFileBatchProvider(str(tmp_path / "p")),
+                         SqlBatchJobRepository(session_factory=lambda: Session(eng)),
+                         work_dir=str(tmp_path / "b"), min_messages=10)
+
+    src = MailboxSource({1: Email(subject="Dúvida", body="Podemos conversar?")})
+    uc = SyncEmailsUseCase(src, smart, Repo(), "default", SimpleTokenizer(lang="pt"), backlog=backlog)
+    assert uc.run() == 1 and uc.stats()["deferred"] == 0
+    assert llm.pool.stats()["requests"] == 1  # tentou o LLM online (e caiu no rule-based)
+
+
+def test_deferred_messages_hold_the_checkpoint_until_their_job_is_saved(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    eng = create_db_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    SQLModel.metadata.create_all(eng)
+    jobs = BrokenJobs(SqlBatchJobRepository(session_factory=lambda: Session(eng)))
+    checkpoints = SqlCheckpointRepository(session_factory=lambda: Session(eng))
+
+    llm = OpenAIClassifier(pool=HttpConnectionPool("http://127.0.0.1:9", read_timeout=1))
+    smart = SmartClassifier(rule_based=RuleBasedClassifier(), llm=llm, min_conf=0.99)
+    backlog = LlmBacklog(smart, LocalFileBatchProvider(str(tmp_path / "provider")), jobs,
+                         work_dir=str(tmp_path / "batches"), min_messages=3, poll_interval_s=0)
+    src = MailboxSource({
+        1: Email(subject="Dúvida", body="Podemos conversar sobre o contrato?"),
+        2: Email(subject="Oi", body="Oi, tudo bem?"),
+        3: Email(subject="Promo", body="Promoção com desconto e cupom: https://a.b https://c.d"),
+        4: Email(subject="Reunião", body="Podemos marcar uma reunião amanhã?"),
+    })
+    uc = SyncEmailsUseCase(src, smart, Repo(), "default", SimpleTokenizer(lang="pt"), backlog=backlog,
+                           checkpoints=checkpoints, checkpoint_key="default")
+
+    # job não gravado: o spam foi movido, mas os adiados seguram o checkpoint
+    uc.run()
+    assert src.moves == [("Improdutivos", ["3"])] and jobs.list_open("default") == []
+    assert checkpoints.get("default").last_uid == 0
+
+    # ciclo seguinte busca os adiados de novo e, com o job gravado, o checkpoint avança
+    jobs.fixed = True
+    uc.run()
+    [job] = jobs.list_open("default")
+    assert [i["msg_id"] for i in job.items] == ["1", "2", "4"]
+    assert checkpoints.get("default").last_uid == 4
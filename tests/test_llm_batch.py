@@ -0,0 +1,101 @@
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.domain.entities import Category, Email
+from app.infrastructure.classifiers.http_pool import HttpConnectionPool
+from app.infrastructure.classifiers.openai_llm import OpenAIClassifier
+
+
+class FakeBatchHandler(BaseHTTPRequestHandler):
+    """Responde um item por '### E-mail index=N'; `broken` estraga os índices pedidos na 1ª resposta."""
+    protocol_version = "HTTP/1.1"
+    requests: list = []
+    broken: set = set()
+    garbage = False
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = payload["messages"][1]["content"]
+        indices = [int(i) for i in re.findall(r"### E-mail index=(\d+)", prompt)]
+        first = not FakeBatchHandler.requests
+        FakeBatchHandler.requests.append(len(indices))
+
+        results = []
+        for i in indices:
+            subject = re.findall(r"- Subject: (.*)", prompt)[i]
+            if first and i in FakeBatchHandler.broken:
+                if i % 2:
+                    continue  # item ausente
+                results.append({"index": i, "reason": "sem categoria"})  # malformado
+                continue
+            results.append({"index": i, "category": "productive", "reason": f"ok {subject}", "reply": "Claro!"})
+        args = {"oops": True} if FakeBatchHandler.garbage else {"results": results}
+        body = json.dumps({
+            "choices": [{"message": {"tool_calls": [{"function": {"arguments": json.dumps(args)}}]}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_batch_openai(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    FakeBatchHandler.requests, FakeBatchHandler.broken, FakeBatchHandler.garbage = [], set(), False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBatchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _classify_concurrently(url, n, **batch):
+    clf = OpenAIClassifier(pool=HttpConnectionPool(url, max_concurrency=4, read_timeout=5), **batch)
+    emails = [Email(subject=f"Pedido {i}", body=f"Podemos conversar sobre o pedido {i}?") for i in range(n)]
+    with ThreadPoolExecutor(max_workers=n) as ex:
+        return clf, list(ex.map(lambda e: clf.classify(e, []), emails))
+
+
+def test_concurrent_calls_share_one_request_and_map_back_by_index(fake_batch_openai):
+    clf, results = _classify_concurrently(fake_batch_openai, 4, batch_max_items=4, batch_max_wait_ms=5000)
+
+    assert FakeBatchHandler.requests == [4]
+    for i, res in enumerate(results):
+        assert res.category == Category.PRODUCTIVE and res.reason == f"ok Pedido {i}"
+        assert res.extra["llm_batch"] == {"size": 4, "sent": 4, "attempt": 1}
+        assert res.total_tokens == 30  # usage do request rateado entre os itens
+    assert clf.batcher.stats()["full"] == 1
+
+
+def test_usage_split_keeps_the_remainder():
+    shares = OpenAIClassifier._split_usage({"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120}, 3)
+    assert [s["prompt_tokens"] for s in shares] == [34, 33, 33]
+    assert [s["completion_tokens"] for s in shares] == [7, 7, 6]
+    assert [s["total_tokens"] for s in shares] == [41, 40, 39]
+
+
+def test_missing_and_malformed_items_are_retried_then_fall_back(fake_batch_openai):
+    FakeBatchHandler.broken = {1, 2}
+    _, results = _classify_concurrently(fake_batch_openai, 3, batch_max_items=3, batch_max_wait_ms=5000)
+    assert FakeBatchHandler.requests == [3, 2]  # só os dois com problema voltam
+    assert [r.extra["llm_batch"]["attempt"] for r in results] == [1, 2, 2]
+    assert all(r.reason.startswith("ok") for r in results)
+    # 1ª tentativa (120 tokens / 3) + 2ª (120 / 2) para os reenviados: nada se perde
+    assert [r.total_tokens for r in results] == [41, 100, 99]
+    assert sum(r.total_tokens for r in results) == 240
+
+    FakeBatchHandler.requests, FakeBatchHandler.garbage = [], True
+    _, results = _classify_concurrently(fake_batch_openai, 2, batch_max_items=8, batch_max_wait_ms=300)
+    assert FakeBatchHandler.requests == [2, 2]  # fechou pelo tempo; uma nova tentativa
+    assert all(r.used_model == "rule-based" for r in results)
@@ -0,0 +1,50 @@
+from app.domain.entities import Email
+from app.infrastructure.classifiers.http_pool import HttpConnectionPool
+from app.infrastructure.classifiers.llm_cache import LlmResultCache
+from app.infrastructure.classifiers.openai_llm import OpenAIClassifier
+from tests.test_openai_pool import fake_openai  # noqa: F401 (fixture)
+
+
+def _clf(url, cache):
+    return OpenAIClassifier(pool=HttpConnectionPool(url, max_concurrency=2, read_timeout=5), cache=cache)
+
+
+def test_near_identical_emails_hit_the_cache_and_are_marked(fake_openai, monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    db = str(tmp_path / "llm.db")
+    clf = _clf(fake_openai, LlmResultCache(db_path=db))
+
+    first = clf.classify(Email(subject="Chamado 1", body="Podemos conversar amanhã?"), [])
+    again = clf.classify(Email(subject=" Chamado 1", body="Podemos   conversar\namanhã?\n\nAtenciosamente,\nAna"), [])
+    other = clf.classify(Email(subject="Chamado 1", body="Podemos conversar amanhã?"), [], mood="formal")
+
+    assert clf.pool.stats()["requests"] == 2  # tom diferente é outra chave
+    assert "llm_cache" not in first.extra and first.total_tokens == 15
+    assert again.extra["llm_cache"] == {"hit": True, "tier": "memory", "saved_tokens": 15}
+    assert again.total_tokens is None and again.category == first.category
+    assert other.total_tokens == 15
+
+    # novo processo: memória vazia, resposta vem do SQLite
+    restarted = _clf(fake_openai, LlmResultCache(db_path=db))
+    res = restarted.classify(Email(subject="Chamado 1", body="Podemos conversar amanhã?"), [])
+    assert res.extra["llm_cache"]["tier"] == "sqlite" and restarted.pool.stats()["requests"] == 0
+    assert restarted.cache.stats()["tokens_saved"] == 15
+
+
+def test_sender_is_part_of_the_key(fake_openai, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    clf = _clf(fake_openai, LlmResultCache())
+    clf.classify(Email(subject="Pedido", body="Podemos conversar amanhã?", sender="ana@x.com"), [])
+    same = clf.classify(Email(subject="Pedido", body="Podemos conversar amanhã?", sender=" Ana@X.com"), [])
+    other = clf.classify(Email(subject="Pedido", body="Podemos conversar amanhã?", sender="bruno@y.com"), [])
+
+    assert same.extra["llm_cache"]["hit"] and "llm_cache" not in other.extra
+    assert clf.pool.stats()["requests"] == 2
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = LlmResultCache(db_path=str(tmp_path / "llm.db"), ttl_s=-1)
+    key = LlmResultCache.key("corpo", "s", "pt", [], None, "m")
+    cache.put(key, {"result": {}, "usage": {}})
+    assert cache.get(key) is None
+    assert LlmResultCache(max_entries=1).stats()["hit_rate"] is None
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from app.domain.entities import ClassificationLog
+from app.domain.errors import Overloaded
+from app.infrastructure.repositories.group_commit_log_repository import GroupCommitLogRepository
+
+
+class MemoryRepo:
+    """Grava em memória, atribui ids e registra o tamanho de cada save_many."""
+
+    def __init__(self, gate=None, fail=0):
+        self.logs = []
+        self.batches = []
+        self.gate = gate
+        self.fail = fail
+
+    def save_many(self, logs):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("database is locked")
+        for log in logs:
+            log.id = len(self.logs) + 1
+            self.logs.append(log)
+        self.batches.append(len(logs))
+        return logs
+
+    def list_recent(self, limit=50):
+        return self.logs[-limit:]
+
+
+def _writer(repo, **kw):
+    return GroupCommitLogRepository(lambda: repo, **kw)
+
+
+def _log(i):
+    return ClassificationLog(subject=f"s{i}", category="productive")
+
+
+def test_groups_logs_into_batches_and_flush_waits_for_them():
+    repo = MemoryRepo()
+    w = _writer(repo, max_batch=10, flush_interval=0.5)
+    futures = [w.submit(_log(i)) for i in range(25)]
+    w.flush(timeout=5)
+
+    assert repo.batches == [10, 10, 5]
+    assert [f.result(0).id for f in futures] == list(range(1, 26))
+    assert w.stats() == {"enqueued": 25, "written": 25, "batches": 3, "errors": 0, "queued": 0}
+    w.close()
+
+
+def test_close_drains_the_queue_and_rejects_new_logs():
+    repo = MemoryRepo()
+    w = _writer(repo, max_batch=100, flush_interval=30)
+    futures = [w.submit(_log(i)) for i in range(5)]
+    w.close()  # não espera o flush_interval: o _STOP fecha o lote
+
+    assert all(f.done() for f in futures) and len(repo.logs) == 5
+    with pytest.raises(RuntimeError):
+        w.submit(_log(99))
+    w.flush()  # depois do close não bloqueia
+
+
+def test_full_queue_raises_overloaded():
+    gate = threading.Event()
+    repo = MemoryRepo(gate=gate)
+    w = _writer(repo, max_batch=1, flush_interval=0, max_queue=2, put_timeout=0.05)
+    try:
+        with pytest.raises(Overloaded):
+            for i in range(10):
+                w.submit(_log(i))  # 1 no writer (travado) + 2 na fila, o 4º estoura
+        assert w.stats()["enqueued"] == 3
+    finally:
+        gate.set()
+        w.close()
+    assert len(repo.logs) == 3
+
+
+def test_writer_error_fails_the_batch_and_keeps_writing():
+    repo = MemoryRepo(fail=1)
+    w = _writer(repo, max_batch=10, flush_interval=0.2)
+    failed = [w.submit(_log(i)) for i in range(3)]
+    w.flush(timeout=5)
+    ok = w.submit(_log(3))
+    w.flush(timeout=5)
+
+    assert all(isinstance(f.exception(0), RuntimeError) for f in failed)
+    assert ok.result(0).id == 1
+    assert w.stats()["errors"] == 1 and w.stats()["written"] == 1
+    w.close()
+
+
+def test_log_submitted_while_closing_is_not_dropped():
+    repo = MemoryRepo()
+    w = _writer(repo, max_batch=10, flush_interval=0.01)
+    real_put, entered = w._queue.put, threading.Event()
+
+    def slow_put(item, *args, **kwargs):
+        if isinstance(item, tuple):  # log (não o _STOP): alarga a janela entre a checagem e o put
+            entered.set()
+            time.sleep(0.2)
+        return real_put(item, *args, **kwargs)
+
+    w._queue.put = slow_put
+    futures = []
+    producer = threading.Thread(target=lambda: futures.append(w.submit(_log(0))))
+    producer.start()
+    entered.wait(5)
+    w.close()  # chega no meio do put do produtor
+    producer.join()
+
+    [fut] = futures
+    assert fut.result(timeout=1).id == 1 and len(repo.logs) == 1
+
+
+def test_cancelled_future_does_not_kill_the_writer():
+    gate = threading.Event()
+    repo = MemoryRepo(gate=gate)
+    w = _writer(repo, max_batch=10, flush_interval=0.05)
+    cancelled = w.submit(_log(0))
+    assert cancelled.cancel()  # chamador desistiu antes do writer gravar
+    gate.set()
+    w.flush(timeout=5)
+
+    later = w.submit(_log(1))
+    assert later.result(timeout=5).id == 2  # writer segue vivo; o cancelado foi gravado mesmo assim
+    w.close()
@@ -0,0 +1,56 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.domain.entities import Email, Category
+from app.infrastructure.classifiers.http_pool import HttpConnectionPool
+from app.infrastructure.classifiers.openai_llm import OpenAIClassifier
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        args = {"category": "productive", "reason": "pedido de reunião", "reply": "Claro!"}
+        body = json.dumps({
+            "choices": [{"message": {"tool_calls": [{"function": {"arguments": json.dumps(args)}}]}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_openai():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_classifier_reuses_pooled_connection(fake_openai, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    pool = HttpConnectionPool(fake_openai, max_concurrency=2, read_timeout=5)
+    clf = OpenAIClassifier(pool=pool)
+
+    email = Email(subject="Reunião", body="Podemos conversar amanhã?")
+    for _ in range(3):
+        res = clf.classify(email, ["podemos", "conversar", "amanhã"])
+        assert res.category == Category.PRODUCTIVE
+        assert res.total_tokens == 15
+
+    stats = pool.stats()
+    assert stats["requests"] == 3
+    assert stats["connections_created"] == 1
+    assert stats["connections_reused"] == 2
+    pool.close()
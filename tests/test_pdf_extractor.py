@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.domain.errors import BadRequest
+from app.infrastructure.extractors import pdf_extractor
+from app.infrastructure.extractors.pdf_extractor import PdfExtractor
+
+
+def make_pdf(pages):
+    """PDF mínimo com uma linha de texto (Helvetica) por página."""
+    n = len(pages)
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(n))
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode())
+    font = 3 + 2 * n
+    for i, text in enumerate(pages):
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> >>".encode()
+        )
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(out)
+
+
+def test_extracts_in_process_pool_with_page_and_char_budget():
+    ext = PdfExtractor(max_pages=3, max_chars=10_000, workers=1)
+    try:
+        text = ext.extract(make_pdf([f"pagina {i}" for i in range(10)]))
+        assert "pagina 0" in text and "pagina 2" in text and "pagina 3" not in text
+    finally:
+        ext.close()
+
+
+def test_stops_early_once_enough_text_for_classification():
+    text, read = pdf_extractor._extract_pages(make_pdf(["x" * 50] * 20), 100, 120, 10)
+    assert read == 3 and len(text) == 120
+
+
+def test_limits_and_pool_errors_become_bad_request():
+    ext = PdfExtractor(max_bytes=100, workers=1)
+    try:
+        with pytest.raises(BadRequest, match="limite"):
+            ext.extract(b"%PDF" + b"0" * 200)
+        ext.max_bytes = 10_000
+        with pytest.raises(BadRequest):
+            ext.extract(b"isto nao e um pdf")
+        # pool continua utilizável depois de erro no filho
+        assert ext.extract(make_pdf(["ok"])) == "ok"
+    finally:
+        ext.close()
+
+
+def test_timeout_kills_only_the_stuck_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extractor, "_TIMEOUT_GRACE_S", 0)
+    fifo = str(tmp_path / "travado.pdf")
+    os.mkfifo(fifo)  # o filho trava no open() até o prazo estourar
+    ext = PdfExtractor(timeout_s=3, workers=2)
+    try:
+        assert ext.extract(make_pdf(["aquecido"])) == "aquecido"
+        errors = []
+
+        def stuck():
+            try:
+                ext.extract(SimpleNamespace(path=fifo, size=10))
+            except BadRequest as e:
+                errors.append(str(e))
+
+        t = threading.Thread(target=stuck)
+        t.start()
+        while ext._idle:  # o travado pegou o worker aquecido
+            time.sleep(0.01)
+        assert ext.extract(make_pdf(["em paralelo"])) == "em paralelo"
+        t.join(10)
+
+        assert errors and "Tempo limite" in errors[0]
+        [healthy] = ext._idle
+        assert healthy.proc.is_alive()  # o outro worker não foi derrubado junto
+        assert ext.extract(make_pdf(["depois"])) == "depois" and ext._idle == [healthy]
+    finally:
+        ext.close()
+
+
+def test_caller_can_shorten_the_deadline(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extractor, "_TIMEOUT_GRACE_S", 0)
+    fifo = str(tmp_path / "travado.pdf")
+    os.mkfifo(fifo)
+    ext = PdfExtractor(timeout_s=15, workers=1)
+    try:
+        t0 = time.monotonic()
+        with pytest.raises(BadRequest, match="Tempo limite"):
+            ext.extract(SimpleNamespace(path=fifo, size=10), timeout_s=0.5)
+        assert time.monotonic() - t0 < 5  # o processo foi encerrado no prazo do chamador, não em 15s
+    finally:
+        ext.close()
@@ -0,0 +1,46 @@
+from app.application.analysis import analyze_email
+from app.domain.entities import Email
+from app.infrastructure.classifiers.http_pool import HttpConnectionPool
+from app.infrastructure.classifiers.openai_llm import OpenAIClassifier
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.classifiers.smart_classifier import SmartClassifier
+from app.infrastructure.nlp.keyword_index import KeywordIndex
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from tests.test_openai_pool import fake_openai  # noqa: F401 (fixture)
+
+
+class CountingRuleBased(RuleBasedClassifier):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def classify(self, *args, **kwargs):
+        self.calls += 1
+        return super().classify(*args, **kwargs)
+
+
+class CountingIndex(KeywordIndex):
+    matches = 0
+
+    def match(self, text):
+        CountingIndex.matches += 1
+        return super().match(text)
+
+
+def test_escalation_runs_rules_and_profile_match_once(fake_openai, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    rule = CountingRuleBased()
+    llm = OpenAIClassifier(pool=HttpConnectionPool(fake_openai, max_concurrency=1, read_timeout=5))
+    llm.rule_based = rule  # só seria usado se o resultado não fosse repassado
+    smart = SmartClassifier(rule_based=rule, llm=llm, min_conf=0.99)
+
+    email = Email(subject="Contrato", body="Olá, segue o contrato para revisão.")
+    a = analyze_email(SimpleTokenizer(lang="pt"), email)
+    priority = CountingIndex(["contrato", "nota fiscal"])
+    res = smart.classify(email, a.tokens, priority=priority, analysis=a)
+
+    assert res.used_model.startswith("gpt") and llm.pool.stats()["requests"] == 1
+    assert rule.calls == 1 and CountingIndex.matches == 1
+    assert res.extra["rb_hits"] == ["contrato"] and res.extra["priority_boost"]
+    # prompt das prioridades montado uma vez por índice
+    assert llm._priority_prompt(priority) is llm._priority_prompt(priority)
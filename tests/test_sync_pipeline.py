@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from app.application.use_cases.sync_emails import SyncEmailsUseCase
+from app.domain.entities import Email, Category, ClassificationResult
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+
+
+class ListSource:
+    def __init__(self, n, fail_after=None):
+        self.n = n
+        self.fail_after = fail_after
+        self.moved = {}
+
+    def fetch_unread(self):
+        for i in range(self.n):
+            if self.fail_after is not None and i == self.fail_after:
+                raise ConnectionError("caiu")
+            yield str(i), Email(subject=f"s{i}", body=f"corpo {i}")
+
+    def move_to_folder(self, msg_id, folder):
+        self.moved[msg_id] = folder
+
+
+class SlowClassifier:
+    def __init__(self, delay, on_call=None):
+        self.delay = delay
+        self.on_call = on_call
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def classify(self, email, tokens, mood=None, priority=None, analysis=None):
+        with self.lock:
+            self.calls += 1
+            if self.on_call:
+                self.on_call(self.calls)
+        time.sleep(self.delay)
+        return ClassificationResult(category=Category.PRODUCTIVE, reason="r", suggested_reply="ok")
+
+
+class Repo:
+    def __init__(self):
+        self.logs = []
+
+    def save_many(self, logs):
+        self.logs.extend(logs)
+        return logs
+
+
+def _uc(source, classifier, repo, workers=4):
+    return SyncEmailsUseCase(source, classifier, repo, "default", SimpleTokenizer(lang="pt"),
+                             classify_workers=workers, queue_size=4)
+
+
+def test_pipeline_classifies_in_parallel_and_moves_everything():
+    src, repo = ListSource(20), Repo()
+    uc = _uc(src, SlowClassifier(0.05), repo, workers=4)
+
+    t0 = time.monotonic()
+    assert uc.run() == 20
+    assert time.monotonic() - t0 < 0.05 * 20 / 2  # bem abaixo do tempo serial
+
+    assert len(repo.logs) == 20 and len(src.moved) == 20
+    assert set(src.moved.values()) == {"Produtivos"}
+    st = uc.stats()
+    assert st["queues"] == {"classify": 0, "persist": 0, "move": 0}
+    assert st["fetched"] == st["classified"] == st["persisted"] == st["moved"] == 20
+
+
+def test_pipeline_stops_cleanly_on_stop_event():
+    stop = threading.Event()
+    src, repo = ListSource(200), Repo()
+    clf = SlowClassifier(0.01, on_call=lambda n: n == 5 and stop.set())
+    uc = _uc(src, clf, repo, workers=2)
+
+    uc.run(stop_event=stop)
+
+    # tudo o que foi classificado foi gravado e movido; o resto ficou intocado na caixa
+    assert len(repo.logs) == len(src.moved) == uc.stats()["classified"]
+    assert len(src.moved) < 20
+
+
+def test_pipeline_propagates_fetch_errors_after_draining():
+    src, repo = ListSource(10, fail_after=3), Repo()
+    uc = _uc(src, SlowClassifier(0), repo)
+    with pytest.raises(ConnectionError):
+        uc.run()
+    assert len(src.moved) == 3
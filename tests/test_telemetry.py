@@ -0,0 +1,63 @@
+from app.application.telemetry import PriceTable, StageTimer, record_classify
+from app.application.use_cases.classify_email import ClassifyEmailUseCase, FileFacade
+from app.domain.entities import Category, ClassificationResult
+from app.infrastructure.classifiers.rule_based import RuleBasedClassifier
+from app.infrastructure.nlp.tokenizer_simple import SimpleTokenizer
+from app.infrastructure.profiles.profile_json import JsonProfileAdapter
+from app.infrastructure.responders.simple_templates import SimpleResponder
+
+
+class MemoryRepo:
+    def __init__(self):
+        self.logs = []
+
+    def save(self, log):
+        self.logs.append(log)
+        return log
+
+
+def _llm_result(model, offline=False):
+    extra = {"llm": True, **({"llm_offline": True} if offline else {})}
+    return ClassificationResult(
+        category=Category.PRODUCTIVE, reason="ok", suggested_reply="", used_model=model,
+        prompt_tokens=1000, completion_tokens=200, total_tokens=1200, extra=extra,
+    )
+
+
+def test_price_table_uses_usage_prefix_match_and_batch_discount():
+    prices = PriceTable.from_json({"gpt-4o-mini": {"input": 1.0, "output": 2.0}, "meu-modelo": [3, 4]})
+    assert prices.cost_usd(_llm_result("gpt-4o-mini")) == 0.0014
+    assert prices.cost_usd(_llm_result("gpt-4o-mini-2024-07-18")) == 0.0014  # versão datada → prefixo
+    assert prices.cost_usd(_llm_result("gpt-4o-mini", offline=True)) == 0.0007
+    assert prices.cost_usd(_llm_result("meu-modelo")) == 0.0038
+    assert prices.cost_usd(_llm_result("desconhecido")) is None
+
+    rule_based = ClassificationResult(category=Category.PRODUCTIVE, reason="r", suggested_reply="", used_model="rule-based")
+    assert prices.cost_usd(rule_based) == 0.0
+
+
+def test_smart_split_is_recorded_per_stage():
+    timer = StageTimer()
+    res = _llm_result("gpt-4o-mini")
+    res.extra["stage_ms"] = {"rule_based": 1.5, "llm": 40.0}
+    extra = record_classify(timer, res, 42.0)
+    assert "stage_ms" not in extra and timer.stages == {"rule_based": 1.5, "llm": 40.0}
+
+
+def test_log_carries_provider_cost_latency_and_stage_timings():
+    repo = MemoryRepo()
+    uc = ClassifyEmailUseCase(
+        file_facade=FileFacade(None, None),
+        tokenizer=SimpleTokenizer(lang="auto"),
+        classifier=RuleBasedClassifier(),
+        responder=SimpleResponder(),
+        profiles=JsonProfileAdapter(),
+        log_repo=repo,
+    )
+    result = uc.execute_from_text("Reunião", "Podemos marcar uma reunião amanhã para revisar o contrato?")
+
+    [log] = repo.logs
+    assert log.provider == "local" and log.cost_usd == 0.0
+    assert isinstance(log.latency_ms, int) and log.latency_ms >= 0
+    assert set(log.extra["timings_ms"]) == {"tokenize", "lang", "rule_based", "responder"}
+    assert set(result.extra["timings_ms"]) == {"tokenize", "lang", "rule_based", "responder", "persist"}
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from app.application.uploads import SpooledUpload, detect_kind, spool_multipart
+from app.application.use_cases.classify_email import FileFacade
+from app.domain.errors import BadRequest, PayloadTooLarge
+from app.infrastructure.extractors.eml_extractor import EmlExtractor
+from app.infrastructure.extractors.pdf_extractor import PdfExtractor
+from app.infrastructure.extractors.txt_extractor import TxtExtractor
+from tests.test_pdf_extractor import make_pdf
+
+
+BOUNDARY = "b0undary"
+CTYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def multipart_body(*parts):
+    """parts: (nome, filename ou None, conteúdo)."""
+    out = b""
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        out += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + data + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode()
+
+
+class ChunkedBody:
+    """Imita request.stream(): blocos assíncronos, sem Content-Length."""
+
+    def __init__(self, data: bytes, chunk: int = 64 * 1024):
+        self.data = data
+        self.chunk = chunk
+        self.reads = 0
+
+    async def __aiter__(self):
+        for i in range(0, len(self.data), self.chunk):
+            self.reads += 1
+            yield self.data[i:i + self.chunk]
+
+
+def test_multipart_streams_file_to_disk_and_hashes_while_reading():
+    data = os.urandom(300_000)
+    body = ChunkedBody(multipart_body(("note", None, b"ignorado"), ("file", "fatura.pdf", data)))
+    filename, up = asyncio.run(spool_multipart(body, CTYPE, max_bytes=1_000_000, spool_bytes=100_000))
+    path = up.path
+    assert filename == "fatura.pdf" and path and os.path.exists(path)
+    assert up.size == len(data) and up.sha256 == hashlib.sha256(data).hexdigest()
+    with up.view() as mv:  # mmap do temporário
+        assert mv[:10] == data[:10] and len(mv) == len(data)
+    with up.open() as f:
+        assert f.read() == data
+    up.close()
+    assert not os.path.exists(path)
+
+
+def test_multipart_aborts_as_soon_as_limit_is_passed():
+    # arquivo grande ou campo de texto grande: o corpo não é recebido inteiro
+    for part in (("file", "a.txt", b"x" * 2_000_000), ("note", None, b"x" * 2_000_000)):
+        body = ChunkedBody(multipart_body(part))
+        with pytest.raises(PayloadTooLarge):
+            asyncio.run(spool_multipart(body, CTYPE, max_bytes=100_000, spool_bytes=10_000))
+        assert body.reads < 5
+
+
+def test_multipart_without_file_or_with_two_files():
+    filename, up = asyncio.run(spool_multipart(ChunkedBody(multipart_body(("note", None, b"oi"))), CTYPE, 1000, 1000))
+    assert filename is None and up.size == 0
+    two = multipart_body(("file", "a.txt", b"a"), ("outro", "b.txt", b"b"))
+    with pytest.raises(BadRequest):
+        asyncio.run(spool_multipart(ChunkedBody(two), CTYPE, 1000, 1000))
+    with pytest.raises(BadRequest):
+        asyncio.run(spool_multipart(ChunkedBody(b"lixo"), "multipart/form-data", 1000, 1000))
+
+
+def test_detect_kind_uses_magic_bytes():
+    assert detect_kind(b"%PDF-1.7 ...", "fatura.txt") == "pdf"
+    assert detect_kind(b"Received: from x\r\nSubject: oi\r\n", None) == "eml"
+    assert detect_kind(b"ola, tudo bem?", None) == "txt"
+    with pytest.raises(BadRequest):
+        detect_kind(b"<html>", "fake.pdf")
+    with pytest.raises(BadRequest):
+        detect_kind(b"PK\x03\x04\x00\x00", "doc.docx")
+
+
+def test_extractors_read_from_disk_spooled_upload():
+    facade = FileFacade(PdfExtractor(workers=0), TxtExtractor(), EmlExtractor())
+
+    pdf = SpooledUpload(spool_bytes=10)
+    pdf.write(make_pdf(["contrato assinado"]))
+    assert pdf.path  # foi para disco; o extrator lê pelo caminho
+    assert facade.from_upload("sem-extensao", pdf.finish()) == "contrato assinado"
+    pdf.close()
+
+    eml = SpooledUpload(spool_bytes=10)
+    eml.write(b"From: a@x.com\r\nSubject: oi\r\nContent-Type: text/plain\r\n\r\nCorpo do e-mail\r\n")
+    assert facade.from_upload("mensagem", eml.finish()) == "Corpo do e-mail"
+    eml.close()
+
+    assert facade.from_upload("nota.txt", "acentuação".encode("latin-1")) == "acentuação"